@@ -0,0 +1,291 @@
+"""Arrival processes generating the call arrival times of the event mode."""
+"""
+    Design:
+        - An arrival process is a generator of nondecreasing arrival times in seconds, produced lazily,
+          so a week long schedule is never materialised.
+        - CallCenterSimulation.set takes an arrival_process factory: a callable receiving the random.Random
+          of the arrival stream and returning a fresh generator, every run starting over.
+        - Homogeneous Poisson arrivals draw exponential gaps. Piecewise constant rates draw the gaps at the
+          rate of the current segment and restart at the next segment boundary (the process is memoryless).
+        - Replayed arrivals are read from recorded timestamps, one per line.
+        - Call detail records (CDR) replay recorded calls with their handle times, given to
+          CallCenterSimulation.set as call_detail_records. CSV and Parquet files are read in chunks of
+          rows, so a month of calls is replayed in constant memory.
+ """
+# Imports
+import csv
+import datetime
+import functools
+import itertools
+
+# Columns of a call detail record file holding the arrival time and the handle time, the first found is read
+ARRIVAL_TIME_COLUMNS = ("arrival_time",)
+HANDLE_TIME_COLUMNS = ("handle_time", "call_duration")
+# Default number of records read at a time
+DEFAULT_CHUNK_SIZE = 65536
+
+
+def poisson_arrivals(random_stream, rate, start_time=0.0):
+    """Generates the arrival times of a homogeneous Poisson process.
+
+    Args:
+        random_stream (random.Random): Stream the gaps are drawn from.
+        rate (float): Mean number of calls per second.
+        start_time (float): Time the process starts at.
+
+    Yields:
+        float: The arrival times.
+    """
+    if rate <= 0:
+        raise ValueError("rate must be greater than 0")
+    now = start_time
+    while True:
+        now += random_stream.expovariate(rate)
+        yield now
+
+
+def piecewise_poisson_arrivals(random_stream, schedule):
+    """Generates the arrival times of a Poisson process with a piecewise constant rate.
+
+    Args:
+        random_stream (random.Random): Stream the gaps are drawn from.
+        schedule (iterable): (start_time, rate) pairs with increasing start times, the rate in calls
+            per second holding until the next start time. The last rate holds forever, a rate of 0
+            is a period without calls. The pairs are consumed lazily.
+
+    Yields:
+        float: The arrival times.
+    """
+    segments = iter(schedule)
+    segment = next(segments, None)
+    if segment is None:
+        return
+    start_time, rate = segment
+    next_segment = next(segments, None)
+    now = start_time
+    while True:
+        end_time = next_segment[0] if next_segment is not None else None
+        if end_time is not None and end_time <= start_time:
+            raise ValueError("schedule start times must be increasing")
+        if rate < 0:
+            raise ValueError("schedule rates must be non-negative")
+        if rate > 0:
+            arrival_time = now + random_stream.expovariate(rate)
+        elif end_time is None:
+            return
+        else:
+            arrival_time = end_time
+        if end_time is None or arrival_time < end_time:
+            now = arrival_time
+            yield now
+            continue
+        # The gap runs past the segment, start over at the rate of the next one
+        now = start_time = end_time
+        rate = next_segment[1]
+        next_segment = next(segments, None)
+
+
+def replay_arrivals(random_stream, arrival_times):
+    """Replays recorded arrival times.
+
+    Args:
+        random_stream (random.Random): Unused, replays are deterministic.
+        arrival_times (iterable): Nondecreasing arrival times in seconds, consumed lazily.
+
+    Yields:
+        float: The arrival times.
+    """
+    previous_time = 0.0
+    for arrival_time in arrival_times:
+        if arrival_time < previous_time:
+            raise ValueError("replayed arrival times must be nondecreasing")
+        previous_time = arrival_time
+        yield arrival_time
+
+
+def read_rate_schedule(path):
+    """Reads a rate schedule lazily from a CSV file.
+
+    Each line holds a start time in seconds and a rate in calls per second. Empty lines and
+    lines starting with "#" are skipped.
+
+    Args:
+        path (str): Path of the schedule file.
+
+    Yields:
+        tuple: The (start_time, rate) pairs.
+    """
+    with open(path, newline="") as file:
+        for row in csv.reader(file):
+            if not row or row[0].lstrip().startswith("#"):
+                continue
+            yield float(row[0]), float(row[1])
+
+
+def read_arrival_times(path):
+    """Reads recorded arrival times lazily, the first column of each line of a CSV file.
+
+    Empty lines and lines starting with "#" are skipped.
+
+    Args:
+        path (str): Path of the arrival times file.
+
+    Yields:
+        float: The arrival times.
+    """
+    with open(path, newline="") as file:
+        for row in csv.reader(file):
+            if not row or row[0].lstrip().startswith("#"):
+                continue
+            yield float(row[0])
+
+
+def _record_seconds(value, origin):
+    """Converts a recorded timestamp, a datetime or an ISO 8601 string, to seconds from origin."""
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime.fromisoformat(value)
+    return (value - origin).total_seconds()
+
+
+def _record_origin(value):
+    """Returns the datetime the timestamps of a file are measured from, None for numeric arrival times."""
+    if isinstance(value, datetime.datetime):
+        return value
+    try:
+        float(value)
+        return None
+    except ValueError:
+        return datetime.datetime.fromisoformat(value)
+
+
+def _column_index(header, names, path):
+    """Returns the index of the first of names found in a header."""
+    for name in names:
+        if name in header:
+            return header.index(name)
+    raise ValueError(f"{path} has no {' or '.join(names)} column")
+
+
+def _csv_record_batches(path, chunk_size):
+    with open(path, newline="") as file:
+        rows = csv.reader(file)
+        header = [name.strip() for name in next(rows, [])]
+        arrival_index = _column_index(header, ARRIVAL_TIME_COLUMNS, path)
+        handle_index = _column_index(header, HANDLE_TIME_COLUMNS, path)
+        columns = max(arrival_index, handle_index) + 1
+        while True:
+            arrival_values, handle_values = [], []
+            rows_read = 0
+            for row in itertools.islice(rows, chunk_size):
+                rows_read += 1
+                if not row:
+                    continue
+                if len(row) < columns:
+                    raise ValueError(f"{path} line {rows.line_num} has {len(row)} columns, "
+                                     f"the arrival and handle times need {columns}")
+                arrival_values.append(row[arrival_index])
+                handle_values.append(row[handle_index])
+            if not rows_read:
+                return
+            yield arrival_values, handle_values
+
+
+def _parquet_record_batches(path, chunk_size):
+    # pyarrow is optional and slow to import, it is only loaded for Parquet records
+    try:
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Parquet call detail records require pyarrow, install it or convert them to CSV") from e
+    parquet_file = pyarrow.parquet.ParquetFile(path)
+    header = parquet_file.schema_arrow.names
+    columns = [header[_column_index(header, ARRIVAL_TIME_COLUMNS, path)],
+               header[_column_index(header, HANDLE_TIME_COLUMNS, path)]]
+    for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+        yield batch.column(0).to_pylist(), batch.column(1).to_pylist()
+
+
+def read_call_detail_records(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Reads recorded calls lazily from a CSV or Parquet (.parquet) file, chunk_size rows at a time.
+
+    The file has a header naming an arrival_time column and a handle_time column (call_duration, the
+    name used by the call traces, is accepted too); other columns such as the outcome are ignored.
+    Arrival times are seconds from the start of the run, or ISO 8601 timestamps measured from the first
+    record. An empty handle time, that of a call that was never answered, is drawn by the simulation.
+
+    Args:
+        path (str): Path of the records file.
+        chunk_size (int): Rows read at a time.
+
+    Yields:
+        tuple: The (arrival_time, handle_time) pairs in seconds, handle_time None when it is not recorded.
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be greater than 0")
+    batches = _parquet_record_batches(path, chunk_size) if path.endswith(".parquet") else _csv_record_batches(path, chunk_size)
+    origin = False
+    for arrival_values, handle_values in batches:
+        if origin is False and arrival_values:
+            origin = _record_origin(arrival_values[0])
+        for arrival_value, handle_value in zip(arrival_values, handle_values):
+            arrival_time = float(arrival_value) if origin is None else _record_seconds(arrival_value, origin)
+            if handle_value is None or handle_value == "":
+                yield arrival_time, None
+                continue
+            handle_time = float(handle_value)
+            if handle_time < 0:
+                raise ValueError("recorded handle times must be non-negative")
+            yield arrival_time, handle_time
+
+
+def replay_call_detail_records(random_stream, records):
+    """Replays recorded calls, checking that their arrival times are nondecreasing.
+
+    Args:
+        random_stream (random.Random): Unused, replays are deterministic.
+        records (iterable): (arrival_time, handle_time) pairs, consumed lazily.
+
+    Yields:
+        tuple: The (arrival_time, handle_time) pairs.
+    """
+    previous_time = float("-inf")
+    for record in records:
+        if record[0] < previous_time:
+            raise ValueError("recorded arrival times must be nondecreasing")
+        previous_time = record[0]
+        yield record
+
+
+def poisson_process(rate):
+    """Returns the arrival_process factory of a homogeneous Poisson process, see poisson_arrivals."""
+    if rate <= 0:
+        raise ValueError("rate must be greater than 0")
+    return functools.partial(poisson_arrivals, rate=rate)
+
+
+def _rate_schedule_arrivals(path, random_stream):
+    return piecewise_poisson_arrivals(random_stream, read_rate_schedule(path))
+
+
+def _replayed_arrivals(path, random_stream):
+    return replay_arrivals(random_stream, read_arrival_times(path))
+
+
+def rate_schedule_process(path):
+    """Returns the arrival_process factory of the rate schedule stored at path, read again on every run."""
+    return functools.partial(_rate_schedule_arrivals, path)
+
+
+def replay_process(path):
+    """Returns the arrival_process factory replaying the arrival times stored at path, read again on every run."""
+    return functools.partial(_replayed_arrivals, path)
+
+
+def _replayed_call_detail_records(path, chunk_size, random_stream):
+    return replay_call_detail_records(random_stream, read_call_detail_records(path, chunk_size))
+
+
+def call_detail_record_process(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Returns the call_detail_records factory replaying the calls recorded at path, read again on every run."""
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be greater than 0")
+    return functools.partial(_replayed_call_detail_records, path, chunk_size)
@@ -0,0 +1,260 @@
+"""Benchmark suite of the call center simulation with JSON results and baseline regression checks."""
+"""
+    Design:
+        - Micro benchmarks time the dispatch path (find_free_fresher_index, IdleAgentIndex, the assign_* methods)
+          and the statistics updates, as operations per second, best of a few repeats.
+        - Macro benchmarks run the event mode end to end as simulated calls per second, each size in a fresh
+          worker process so its peak RSS is measured on its own.
+        - The results are written as JSON and compared with a stored baseline: a throughput falling more than
+          the threshold below its baseline is a regression and fails the run.
+ """
+# Imports
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+from call_center_simulation import (CallCenterSimulation, CallStatistics, EmployeeState, IdleAgentIndex, NullEventSink,
+                                    Fresher, TechnicalLead, ProjectManager, find_free_fresher_index)
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - resource is Unix only
+    resource = None
+
+# Numbers of freshers of the benchmarks
+BENCHMARK_SIZES = (10, 100, 1000)
+# Relative throughput loss over the baseline that fails the run
+DEFAULT_THRESHOLD = 0.2
+# Timing repeats, the best one is kept
+REPEATS = 3
+
+
+def _best_rate(function, operations, repeats=REPEATS):
+    """Returns the best operations per second of a few calls of function.
+
+    Args:
+        function (callable): Runs the operations once.
+        operations (int): Number of operations run by one call of function.
+        repeats (int): Number of calls of function.
+
+    Returns:
+        float: Operations per second of the fastest call.
+    """
+    best_time = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        best_time = min(best_time, time.perf_counter() - start)
+    return operations / best_time if best_time > 0 else float("inf")
+
+
+def bench_find_free_fresher_index(number_of_freshers, operations=2000):
+    """Times find_free_fresher_index over a list with only the last fresher free, its worst case.
+
+    Returns:
+        float: Lookups per second.
+    """
+    freshers = [EmployeeState(f"fresher {i + 1}") for i in range(number_of_freshers)]
+    for fresher in freshers[:-1]:
+        fresher.busy = True
+
+    def run():
+        for _ in range(operations):
+            find_free_fresher_index(freshers)
+    return _best_rate(run, operations)
+
+
+def bench_idle_agent_index(number_of_freshers, operations=100000):
+    """Times an IdleAgentIndex acquire and release with every fresher idle.
+
+    Returns:
+        float: Acquire and release pairs per second.
+    """
+    idle_freshers = IdleAgentIndex(number_of_freshers)
+
+    def run():
+        for _ in range(operations):
+            idle_freshers.release(idle_freshers.acquire())
+    return _best_rate(run, operations)
+
+
+def bench_assign_calls(number_of_freshers, operations=300):
+    """Times the assign_freshers, assign_technical_lead and assign_project_manager methods.
+
+    The calls last 0 seconds, so the time is the dispatching work and the thread start.
+
+    Returns:
+        float: Assigned calls per second.
+    """
+    call_center_simulation = CallCenterSimulation(NullEventSink())
+    call_center_simulation.set(number_of_freshers, 1, (1, 1), (1, 1), (0, 0))
+
+    def run():
+        freshers = [Fresher() for _ in range(number_of_freshers)]
+        for i, fresher in enumerate(freshers):
+            fresher.set(f"fresher {i + 1}", (0, 0))
+        technical_lead = TechnicalLead()
+        technical_lead.set("technical lead", (0, 0))
+        project_manager = ProjectManager()
+        project_manager.set("project manager", (0, 0))
+        for call in range(operations):
+            if call % 3 == 0:
+                call_center_simulation.assign_freshers(freshers, call % number_of_freshers)
+                freshers[call % number_of_freshers].join()
+            elif call % 3 == 1:
+                technical_lead = call_center_simulation.assign_technical_lead(technical_lead)
+                technical_lead.join()
+            else:
+                project_manager = call_center_simulation.assign_project_manager(technical_lead, project_manager)
+                project_manager.join()
+    return _best_rate(run, operations)
+
+
+def bench_statistics_updates(number_of_freshers, operations=200000):
+    """Times CallStatistics.add_fresher_call, add_technical_lead_call and add_project_manager_call.
+
+    Returns:
+        float: Statistics updates per second.
+    """
+    call_statistics = CallStatistics(number_of_freshers)
+
+    def run():
+        for call in range(operations // 3):
+            call_statistics.add_fresher_call(call % number_of_freshers, 10)
+            call_statistics.add_technical_lead_call(10)
+            call_statistics.add_project_manager_call(10)
+    return _best_rate(run, operations // 3 * 3)
+
+
+def _peak_rss_kib():
+    """Returns the peak resident set size of this process in KiB, None without the resource module."""
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux KiB
+    return peak_rss // 1024 if sys.platform == "darwin" else peak_rss
+
+
+def bench_event_mode(number_of_freshers, run_time=3600):
+    """Runs the event mode end to end with NullEventSink, meant to run in a fresh process.
+
+    Returns:
+        tuple: Simulated calls per second and the peak RSS of the process in KiB.
+    """
+    call_center_simulation = CallCenterSimulation(NullEventSink())
+    call_center_simulation.set(number_of_freshers, run_time, (number_of_freshers // 2, number_of_freshers * 2), (1, 5), (5, 60), seed=0)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        call_center_simulation.run_simulation("event")
+        elapsed = time.perf_counter() - start
+    call_statistics = call_center_simulation.call_statistics
+    calls = call_statistics.answered_calls() + call_statistics.dropped_calls
+    return calls / elapsed, _peak_rss_kib()
+
+
+def run_benchmarks(sizes=BENCHMARK_SIZES, run_time=3600):
+    """Runs every benchmark at every size.
+
+    Args:
+        sizes (iterable): Numbers of freshers.
+        run_time (int): Simulated seconds of the end to end runs.
+
+    Returns:
+        dict: "metadata" about the machine and "results" mapping benchmark names to a dict with the
+            "value" and its "unit".
+    """
+    results = {}
+    for number_of_freshers in sizes:
+        micro_benchmarks = (
+            ("find_free_fresher_index", bench_find_free_fresher_index, "lookups/s"),
+            ("idle_agent_index", bench_idle_agent_index, "lookups/s"),
+            ("assign_calls", bench_assign_calls, "calls/s"),
+            ("statistics_updates", bench_statistics_updates, "updates/s"),
+        )
+        for name, benchmark, unit in micro_benchmarks:
+            results[f"{name}[{number_of_freshers}]"] = {"value": benchmark(number_of_freshers), "unit": unit}
+        # A fresh process per size, so the peak RSS is not the one of a larger run
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            calls_per_second, peak_rss = executor.submit(bench_event_mode, number_of_freshers, run_time).result()
+        results[f"event_mode[{number_of_freshers}]"] = {"value": calls_per_second, "unit": "calls/s"}
+        if peak_rss is not None:
+            results[f"event_mode_peak_rss[{number_of_freshers}]"] = {"value": peak_rss, "unit": "KiB"}
+    metadata = {"python": platform.python_version(), "implementation": platform.python_implementation(),
+                "machine": platform.machine(), "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    return {"metadata": metadata, "results": results}
+
+
+def compare_to_baseline(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Compares the throughputs of a run with a baseline.
+
+    Only the rates ("/s" units) are compared, the peak RSS is reported but depends too much on the machine.
+
+    Args:
+        results (dict): The run, as returned by run_benchmarks.
+        baseline (dict): A stored run.
+        threshold (float): Relative throughput loss tolerated.
+
+    Returns:
+        list: (name, value, baseline value, relative change) of every regression.
+    """
+    regressions = []
+    for name, result in results["results"].items():
+        baseline_result = baseline["results"].get(name)
+        if baseline_result is None or not result["unit"].endswith("/s") or baseline_result["value"] <= 0:
+            continue
+        change = result["value"] / baseline_result["value"] - 1
+        if change < -threshold:
+            regressions.append((name, result["value"], baseline_result["value"], change))
+    return regressions
+
+
+def print_results(results, baseline=None):
+    """Prints the results, with the change over the baseline when there is one."""
+    for name, result in results["results"].items():
+        line = f'{name}: {result["value"]:.1f} {result["unit"]}'
+        if baseline is not None and name in baseline["results"] and baseline["results"][name]["value"] > 0:
+            line += f' ({result["value"] / baseline["results"][name]["value"] - 1:+.1%} vs the baseline)'
+        print(line)
+
+
+def main():
+    """Runs the suite, writes the JSON results and fails on a regression over the baseline."""
+    parser = argparse.ArgumentParser(description="Call Center Simulation Benchmark Suite")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare the results with this JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results to the --baseline file instead of comparing")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Relative throughput loss that fails the run")
+    parser.add_argument("--sizes", type=int, nargs="+", default=BENCHMARK_SIZES, help="Numbers of freshers")
+    parser.add_argument("--run-time", type=int, default=3600, help="Simulated seconds of the end to end runs")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, args.run_time)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(results, file, indent=2)
+        print_results(results)
+        return 0
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    print_results(results, baseline)
+    if baseline is None:
+        return 0
+    regressions = compare_to_baseline(results, baseline, args.threshold)
+    for name, value, baseline_value, change in regressions:
+        print(f"Regression: {name} fell to {value:.1f} from {baseline_value:.1f} ({change:.1%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,24 +15,316 @@
         - Each employee has a method to simulate handling a call (run the tread).
  """
 # Imports
+import os
 import random
 import time
 import sys
+import asyncio
+import heapq
+import itertools
+import functools
 import logging
-from threading import Thread, Lock
+import csv
+import pickle
+from collections import deque
+from threading import Thread, Lock, Condition, local
+from array import array
+from queue import Queue
+from arrivals import poisson_process, rate_schedule_process, replay_process, call_detail_record_process
+from instrumentation import InstrumentedLock, Metrics, TimedEventSink
+from trace_export import OUTCOME_ANSWERED, OUTCOME_DROPPED, OUTCOME_ABANDONED, open_trace_writer
+from checkpoint import CheckpointWriter, read_last_checkpoint
+from monitor import MonitorServer, SimulationMonitor
+from schedules import AVAILABLE, OFF_SHIFT, read_shift_schedule
+from histograms import StreamingHistogram
 import argparse
 
 logging.basicConfig(level=logging.ERROR, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Simulation modes accepted by CallCenterSimulation.run_simulation
+SIMULATION_MODES = ("thread", "event", "pool", "async")
+
+# Version of the simulation engine, to be raised whenever a seed no longer reproduces the same statistics
+ENGINE_VERSION = 1
+
+# Limits on the number of freshers. Modes that start a thread per fresher or per call are held
+# to the lower one, the event and asyncio modes only keep a record per fresher.
+MAX_FRESHERS = 100000
+MAX_THREADED_FRESHERS = 1000
+
+# Freshers listed one line each by print_summary by default, larger teams are added up in one line
+MAX_LISTED_FRESHERS = 20
+
+# Longest run time of a generated run, and of a replay of call detail records whose size is bounded by the records
+MAX_RUN_TIME = 86400
+MAX_REPLAY_RUN_TIME = 31 * 86400
+
+# Event kinds of the event driven mode. Completions sort before waves and abandonments at the same instant,
+# the agent state changes of the shift schedules and the synchronization of a multi-site run before every other event
+EVENT_AGENT_STATE = -2
+EVENT_SITE_SYNC = -1
+EVENT_CALL_COMPLETED = 0
+EVENT_CALL_WAVE = 1
+EVENT_CALL_ABANDONED = 2
+EVENT_OVERFLOW_CALL = 3
+
+# Orders in which waiting calls are answered
+QUEUE_DISCIPLINES = ("fifo", "priority")
+MAX_QUEUE_CAPACITY = 1000000
+
+# Checkpoints of the event mode: default simulated seconds between two checkpoints, and the parameters
+# of set() saved with them
+DEFAULT_CHECKPOINT_INTERVAL = 300
+CHECKPOINT_ATTRIBUTES = ("number_of_freshers", "run_time", "min_max_calls_per_wave", "min_max_sleep_interval",
+                         "min_max_call_duration", "fresher_selection_policy", "queue_capacity", "patience",
+                         "queue_discipline", "call_priorities", "arrival_process", "call_detail_records", "shift_schedule", "custom_routing", "routing_tiers",
+                         "call_skills", "seed", "checkpoint_interval")
+
+# Policies used to pick a free fresher from an IdleAgentIndex
+IDLE_POLICIES = ("first_free", "longest_idle", "least_calls")
+
+# Roles used to tag the employee in a completion event
+FRESHER = "fresher"
+TECHNICAL_LEAD = "technical lead"
+PROJECT_MANAGER = "project manager"
+# The built-in roles, in escalation order
+ROLES = (FRESHER, TECHNICAL_LEAD, PROJECT_MANAGER)
+
+# Independent random streams of a simulation: wave sizes, wave intervals and the call durations of each role
+WAVE_STREAM = "wave"
+INTERVAL_STREAM = "interval"
+PATIENCE_STREAM = "patience"
+PRIORITY_STREAM = "priority"
+SKILL_STREAM = "skill"
+ARRIVAL_STREAM = "arrival"
+RANDOM_STREAMS = (WAVE_STREAM, INTERVAL_STREAM, FRESHER, TECHNICAL_LEAD, PROJECT_MANAGER, PATIENCE_STREAM, PRIORITY_STREAM, SKILL_STREAM, ARRIVAL_STREAM)
+
+def create_random_streams(seed=None, extra_streams=()):
+    """Creates the independent random streams of a simulation.
+
+    Each stream is a random.Random seeded from a master generator, so a seed reproduces
+    every stream while the streams stay independent of each other and of the global random
+    module. Drawing more durations for one role does not shift the draws of the others.
+
+    Args:
+        seed (int): Seed of the master generator, None to seed it from the OS.
+        extra_streams (iterable): Names of further streams, such as the call durations of
+            custom routing tiers. They are seeded after RANDOM_STREAMS.
+
+    Returns:
+        dict: random.Random instances mapped by stream name.
+    """
+    master = random.Random(seed)
+    names = RANDOM_STREAMS + tuple(name for name in extra_streams if name not in RANDOM_STREAMS)
+    return {name: random.Random(master.getrandbits(64)) for name in names}
+
+class EventSink:
+    """Receives the call events of a simulation.
+
+    The base class drops every event, so it is also the null sink. Subclasses either override
+    record, which receives every event as a name and its fields, or the single event methods.
+    """
+    def record(self, event, *fields):
+        """Records an event.
+
+        Args:
+            event (str): Name of the event.
+            *fields: The fields of the event.
+        """
+
+    def wave_arrived(self, loop_number, number_of_calls):
+        """A wave of calls arrived."""
+        self.record("wave_arrived", loop_number, number_of_calls)
+
+    def call_arrived(self, loop_number, call_number):
+        """A call of the wave is on top of the queue."""
+        self.record("call_arrived", loop_number, call_number)
+
+    def escalated(self, name, busy_name=None):
+        """A call is forwarded to name because busy_name is busy, or because all freshers are when busy_name is None."""
+        self.record("escalated", name, busy_name)
+
+    def assigned(self, name, call_duration):
+        """A call is answered by name."""
+        self.record("assigned", name, call_duration)
+
+    def rejected(self, name):
+        """A call is lost because name, the last employee tried, is busy."""
+        self.record("rejected", name)
+
+    def hung_up(self, name):
+        """name has hung up the call."""
+        self.record("hung_up", name)
+
+    def next_wave(self, time_interval):
+        """The next wave arrives in time_interval seconds."""
+        self.record("next_wave", time_interval)
+
+    def queued(self, loop_number, call_number, queue_length):
+        """A call waits in the queue, which now holds queue_length calls."""
+        self.record("queued", loop_number, call_number, queue_length)
+
+    def abandoned(self, loop_number, call_number, wait_time):
+        """A caller hung up after waiting wait_time seconds in the queue."""
+        self.record("abandoned", loop_number, call_number, wait_time)
+
+    def overflowed(self, loop_number, call_number):
+        """A call found all lines busy and is passed to another site of a multi-site run."""
+        self.record("overflowed", loop_number, call_number)
+
+    def availability_changed(self, name, state):
+        """name starts a shift, goes on or comes back from a break, or ends a shift, state being one of AVAILABILITY_STATES."""
+        self.record("availability_changed", name, state)
+
+    def flush(self):
+        """Writes out the buffered events, called at the end of a simulation."""
+
+    def close(self):
+        """Flushes and releases the resources of the sink."""
+        self.flush()
+
+class NullEventSink(EventSink):
+    """Event sink discarding every event, for runs that do not need per call output."""
+
+class ConsoleEventSink(EventSink):
+    """Event sink printing the human readable call log."""
+    def wave_arrived(self, loop_number, number_of_calls):
+        print("\n%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%\n")
+        print(f"Incoming calls: {number_of_calls}, loop: {loop_number}")
+        print("----------------------------------------------")
+
+    def call_arrived(self, loop_number, call_number):
+        print(f"Call {call_number} is on top of the queue.")
+        print("----------------------")
+
+    def escalated(self, name, busy_name=None):
+        if busy_name is None:
+            print(f"All freshers are busy, call is being forwarded to the {name}.")
+        else:
+            print(f"{busy_name} is busy, call is being forwarded to the {name}.")
+
+    def assigned(self, name, call_duration):
+        print(f"{name} is free and will answer the call.")
+        print(f"{name} took the call. The call will take {call_duration} seconds.")
+
+    def rejected(self, name):
+        print(f"{name} is busy.")
+        print("All lines are busy. Please try again later.")
+        print("----------------------------------------------")
+
+    def hung_up(self, name):
+        print(f"{name} has hung up the call.")
+
+    def next_wave(self, time_interval):
+        print(f"Waiting for {time_interval} seconds before initiating the next wave of calls.")
+        print("----------------------------------------------")
+
+    def queued(self, loop_number, call_number, queue_length):
+        print(f"All lines are busy, call {call_number} of loop {loop_number} is waiting in the queue ({queue_length} waiting).")
+
+    def abandoned(self, loop_number, call_number, wait_time):
+        print(f"Call {call_number} of loop {loop_number} hung up after waiting {wait_time} seconds.")
+
+    def overflowed(self, loop_number, call_number):
+        print(f"All lines are busy, call {call_number} of loop {loop_number} is passed to another site.")
+
+    def availability_changed(self, name, state):
+        print(f"{name} is {state}.")
+
+class BufferedEventSink(EventSink):
+    """Event sink keeping the events in memory as (event, *fields) tuples.
+
+    Attributes:
+        events (deque): The recorded events, the oldest being dropped past max_events.
+    """
+    def __init__(self, max_events=None):
+        self.events = deque(maxlen=max_events)
+
+    def record(self, event, *fields):
+        self.events.append((event,) + fields)
+
+class BatchedFileEventSink(EventSink):
+    """Event sink writing the events as CSV rows, in batches to keep the file writes off the call path.
+
+    Attributes:
+        batch_size (int): Number of events buffered before they are written.
+        lock (Lock): A thread lock instance, events are recorded from the employee threads.
+    """
+    def __init__(self, path, batch_size=1000):
+        self.batch_size = batch_size
+        self.lock = Lock()
+        self._batch = []
+        self._file = open(path, 'w', newline='')
+        self._writer = csv.writer(self._file)
+
+    def record(self, event, *fields):
+        with self.lock:
+            self._batch.append((event,) + fields)
+            if len(self._batch) >= self.batch_size:
+                self._write_batch()
+
+    def _write_batch(self):
+        """Writes the buffered events, the lock must be held."""
+        self._writer.writerows(self._batch)
+        self._batch = []
+
+    def flush(self):
+        with self.lock:
+            self._write_batch()
+            self._file.flush()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+class Clock:
+    """Time source of the real-time modes, optionally running faster than the wall clock.
+
+    The simulated clock is the wall clock scaled by speedup, so the thread, pool and async modes
+    keep their real concurrency while a simulated second only lasts 1 / speedup seconds.
+
+    Attributes:
+        speedup (float): Simulated seconds per wall clock second.
+    """
+    __slots__ = ('speedup',)
+
+    def __init__(self, speedup=1):
+        if not speedup > 0:
+            raise ValueError("speedup must be positive")
+        self.speedup = speedup
+
+    def wall_seconds(self, seconds):
+        """Returns the wall clock seconds lasting the given simulated seconds."""
+        return seconds / self.speedup if self.speedup != 1 else seconds
+
+    def time(self):
+        """Returns the simulated time in seconds, time.time() scaled by speedup."""
+        return time.time() * self.speedup
+
+    def sleep(self, seconds):
+        """Sleeps for the given simulated seconds."""
+        time.sleep(self.wall_seconds(seconds))
+
+# Clock of the simulations that are not given one
+REAL_TIME_CLOCK = Clock()
+
 class Employee(Thread):
     """Base class representing an employee in the call center.
 
     Attributes:
         lock (Lock): A thread lock instance to ensure thread safety when modifying shared data.
+        on_hang_up (callable): Optional callback invoked when the employee hangs up the call.
+        event_sink (EventSink): Receives the hang-up event.
+        random_stream (random.Random): Stream the call duration is drawn from.
+        clock (Clock): Clock the call lasts on.
     """
     def __init__(self):
         super().__init__()
         self.lock = Lock()
+        self.on_hang_up = None
+        self.event_sink = ConsoleEventSink()
+        self.random_stream = random
+        self.clock = REAL_TIME_CLOCK
 
     def _set_call_duration(self):
         """Private method to set call duration based on a minimum and maximum limit.
@@ -40,30 +332,36 @@ class Employee(Thread):
         Returns:
             int: Random number between the min and max call duration range.
         """
-        return random.randint(self.min_max_call_duration[0], self.min_max_call_duration[1])
+        return self.random_stream.randint(self.min_max_call_duration[0], self.min_max_call_duration[1])
 
-    def set(self, name, min_max_call_duration):
+    def set(self, name, min_max_call_duration, random_stream=None):
         """Sets the employee attributes.
 
         Args:
             name (str): The name of the employee.
             min_max_call_duration (tuple): The min and max duration of the calls this employee can handle.
+            random_stream (random.Random): Stream the call duration is drawn from, the random module by default.
         """
         self.name = name
         self.min_max_call_duration = min_max_call_duration
+        if random_stream is not None:
+            self.random_stream = random_stream
         self.call_duration = self._set_call_duration()
         self.was_called_before = False
 
     def run(self):
         """Run method that will be invoked when the thread is started. Simulates the employee handling the call."""
-        print(f"{self.name} took the call. The call will take {self.call_duration} seconds.")
-        time.sleep(self.call_duration)
-        print(f"{self.name} has hung up the call.")
-        self.lock.acquire()
         try:
-            self.was_called_before = True
+            self.clock.sleep(self.call_duration)
+            self.event_sink.hung_up(self.name)
         finally:
-            self.lock.release()
+            self.lock.acquire()
+            try:
+                self.was_called_before = True
+            finally:
+                self.lock.release()
+            if self.on_hang_up is not None:
+                self.on_hang_up()
 
 class Fresher(Employee):
     """Subclass of Employee representing a fresher employee in the call center."""
@@ -80,75 +378,1103 @@ class ProjectManager(Employee):
     def __init__(self):
         super().__init__()
 
+class EmployeeState:
+    """Lightweight record of an employee used by the worker pool mode.
+
+    Unlike Employee it is not a thread: the call is handled by a long-lived worker of a
+    WorkerPool, and the record only tells whether the employee is on a call.
+
+    Attributes:
+        name (str): The name of the employee.
+        busy (bool): True while the employee is on a call.
+    """
+    __slots__ = ('name', 'busy')
+
+    def __init__(self, name):
+        self.name = name
+        self.busy = False
+
+    def is_alive(self):
+        """Mirrors Thread.is_alive so the records can be used with find_free_fresher_index.
+
+        Returns:
+            bool: True if the employee is on a call.
+        """
+        return self.busy
+
+class WorkerPool:
+    """Fixed set of long-lived worker threads serving the calls of one role.
+
+    Calls are fed through a work queue, so no thread is created or torn down per call.
+
+    Attributes:
+        queue (Queue): Work queue of (employee, call_duration, on_hang_up) items.
+        workers (list): The worker threads.
+        event_sink (EventSink): Receives the hang-up events.
+        clock (Clock): Clock the calls last on.
+    """
+    def __init__(self, number_of_workers, event_sink=None, clock=None):
+        self.event_sink = event_sink if event_sink is not None else ConsoleEventSink()
+        self.clock = clock if clock is not None else REAL_TIME_CLOCK
+        self.queue = Queue()
+        self.workers = [Thread(target=self._work, daemon=True) for _ in range(number_of_workers)]
+        for worker in self.workers:
+            worker.start()
+
+    def submit(self, employee, call_duration, on_hang_up=None):
+        """Queue a call for the next free worker.
+
+        Args:
+            employee (EmployeeState): The employee answering the call, already marked busy.
+            call_duration (int): Duration of the call.
+            on_hang_up (callable): Optional callback invoked after the call.
+        """
+        self.queue.put((employee, call_duration, on_hang_up))
+
+    def _work(self):
+        """Worker loop: handles queued calls until it receives the None sentinel."""
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    break
+                employee, call_duration, on_hang_up = item
+                try:
+                    self.clock.sleep(call_duration)
+                    self.event_sink.hung_up(employee.name)
+                finally:
+                    employee.busy = False
+                    if on_hang_up is not None:
+                        on_hang_up()
+            finally:
+                self.queue.task_done()
+
+    def join(self):
+        """Blocks until every queued call has been handled."""
+        self.queue.join()
+
+    def shutdown(self):
+        """Stops the workers once the queued calls are handled."""
+        for _ in self.workers:
+            self.queue.put(None)
+        for worker in self.workers:
+            worker.join()
+
+class OutstandingCalls:
+    """Counter of the calls in progress, used to wait for the last hang-up without polling.
+
+    Attributes:
+        count (int): Number of calls in progress.
+        condition (Condition): Notified when the count drops to zero.
+    """
+    def __init__(self):
+        self.count = 0
+        self.condition = Condition()
+
+    def start(self):
+        """Registers a call that has been assigned to an employee."""
+        with self.condition:
+            self.count += 1
+
+    def finish(self):
+        """Registers a hang-up and wakes the waiters when it was the last call."""
+        with self.condition:
+            self.count -= 1
+            if self.count == 0:
+                self.condition.notify_all()
+
+    def wait(self, timeout=None):
+        """Blocks until no call is in progress.
+
+        Args:
+            timeout (float): Optional maximum number of seconds to wait.
+
+        Returns:
+            bool: True if every call is over, False if the timeout expired first.
+        """
+        with self.condition:
+            return self.condition.wait_for(lambda: self.count == 0, timeout)
+
+class IdleAgentIndex:
+    """Index of the idle agents of a role, updated on call start and call completion.
+
+    Only idle agents are stored, so picking one never scans the agent list:
+        - "first_free": a heap of indices, the lowest idle index is picked.
+        - "longest_idle": a deque in hang-up order, the agent idle the longest is picked.
+        - "least_calls": a heap of (calls handled, index), the least used agent is picked.
+
+    Agents made unavailable by set_available, on break or off shift, are deleted lazily: their entry
+    stays in the index and is skipped when acquire reaches it. The unavailable agents given at creation
+    are left out of the index.
+
+    Attributes:
+        policy (str): The selection policy, one of IDLE_POLICIES.
+        calls_handled (list): Number of calls taken by each agent.
+        lock (Lock): A thread lock instance, agents hang up on their own threads.
+    """
+    def __init__(self, number_of_agents, policy="first_free", unavailable=()):
+        if policy not in IDLE_POLICIES:
+            raise ValueError(f"policy must be one of {IDLE_POLICIES}")
+        self.policy = policy
+        self.calls_handled = [0] * number_of_agents
+        self.lock = Lock()
+        # Unavailable agents, and the number of entries to skip of each agent
+        self._away = set(unavailable)
+        self._dead = {}
+        self._dead_entries = 0
+        self._on_call = bytearray(number_of_agents)
+        # Increasing indices, already a heap
+        indices = [index for index in range(number_of_agents) if index not in self._away]
+        if policy == "longest_idle":
+            self._idle = deque(indices)
+        elif policy == "least_calls":
+            self._idle = [(0, index) for index in indices]
+        else:
+            self._idle = list(indices)
+
+    def __len__(self):
+        return len(self._idle) - self._dead_entries
+
+    def __getstate__(self):
+        # The lock is not picklable, checkpoints get a new one
+        state = self.__dict__.copy()
+        del state['lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = Lock()
+
+    def acquire(self):
+        """Takes an idle agent according to the policy and marks it busy.
+
+        Returns:
+            int: Index of the agent, -1 if every agent is busy.
+        """
+        with self.lock:
+            while self._idle:
+                if self.policy == "longest_idle":
+                    index = self._idle.popleft()
+                elif self.policy == "least_calls":
+                    index = heapq.heappop(self._idle)[1]
+                else:
+                    index = heapq.heappop(self._idle)
+                if self._dead and index in self._dead:
+                    # Entry left by an agent who became unavailable, its next entries are live
+                    self._dead_entries -= 1
+                    if self._dead[index] == 1:
+                        del self._dead[index]
+                    else:
+                        self._dead[index] -= 1
+                    continue
+                self._on_call[index] = 1
+                self.calls_handled[index] += 1
+                return index
+            return -1
+
+    def release(self, index):
+        """Marks an agent idle again once the call is over.
+
+        Args:
+            index (int): Index of the agent returned by acquire.
+        """
+        with self.lock:
+            self._on_call[index] = 0
+            if self._away and index in self._away:
+                return
+            self._push(index)
+
+    def _push(self, index):
+        if self.policy == "longest_idle":
+            self._idle.append(index)
+        elif self.policy == "least_calls":
+            heapq.heappush(self._idle, (self.calls_handled[index], index))
+        else:
+            heapq.heappush(self._idle, index)
+
+    def set_available(self, index, available):
+        """Makes an agent available or unavailable, for a shift or a break.
+
+        An unavailable agent is only marked away, in O(1): its entry is skipped by acquire, or it is not
+        put back when it hangs up if it was on a call. An idle agent available again gets a new entry, at
+        the back of the "longest_idle" deque, its idle time starting over.
+
+        Args:
+            index (int): Index of the agent.
+            available (bool): Whether the agent may take calls.
+        """
+        with self.lock:
+            if available:
+                if index not in self._away:
+                    return
+                self._away.discard(index)
+                if not self._on_call[index]:
+                    self._push(index)
+                return
+            if index in self._away:
+                return
+            self._away.add(index)
+            if not self._on_call[index]:
+                self._dead[index] = self._dead.get(index, 0) + 1
+                self._dead_entries += 1
+
+    def busy_flags(self):
+        """Returns a list telling for each agent whether it is on a call."""
+        with self.lock:
+            return [bool(on_call) for on_call in self._on_call]
+
+class RoutingTier:
+    """An escalation tier of interchangeable agents sharing the same skills.
+
+    Attributes:
+        name (str): Name of the tier.
+        size (int): Number of agents of the tier.
+        skills (frozenset): Skills of every agent of the tier.
+        numbered (bool): Whether the agents are named "<name> <i>", the only agent of a tier
+            being named after the tier by default.
+    """
+    __slots__ = ('name', 'size', 'skills', 'numbered')
+
+    def __init__(self, name, size, skills=(), numbered=None):
+        if size < 0:
+            raise ValueError("size must be non-negative")
+        self.name = name
+        self.size = size
+        self.skills = frozenset(skills)
+        self.numbered = size != 1 if numbered is None else numbered
+
+    def agent_names(self):
+        """Returns the names of the agents of the tier."""
+        if not self.numbered:
+            return [self.name] * self.size
+        return [f"{self.name} {i + 1}" for i in range(self.size)]
+
+def default_routing_tiers(number_of_freshers):
+    """Returns the tiers of the classic escalation: freshers, the technical lead, the project manager.
+
+    Args:
+        number_of_freshers (int): Number of freshers.
+
+    Returns:
+        list: The RoutingTier instances, in escalation order.
+    """
+    return [RoutingTier(FRESHER, number_of_freshers, numbered=True), RoutingTier(TECHNICAL_LEAD, 1), RoutingTier(PROJECT_MANAGER, 1)]
+
+class SkillRouter:
+    """Routes a call to the first tier, in escalation order, with an idle agent having every required skill.
+
+    The idle agents of each tier are kept in an IdleAgentIndex. The tiers able to take a set of
+    required skills are intersected from a per skill lookup the first time the set is seen and
+    cached, so a routing decision only walks the eligible tiers and pops an idle agent. The
+    unavailable agents of a tier, a set of indices mapped by the tier position, start out of its index.
+
+    Attributes:
+        tiers (list): The RoutingTier instances, in escalation order.
+        idle_agents (list): IdleAgentIndex of each tier.
+        agent_names (list): Names of the agents of each tier.
+    """
+    def __init__(self, tiers, policy="first_free", unavailable=None):
+        self.tiers = list(tiers)
+        if len({tier.name for tier in self.tiers}) != len(self.tiers):
+            raise ValueError("tier names must be unique")
+        unavailable = unavailable or {}
+        self.idle_agents = [IdleAgentIndex(tier.size, policy, unavailable.get(position, ())) for position, tier in enumerate(self.tiers)]
+        self.agent_names = [tier.agent_names() for tier in self.tiers]
+        self._tiers_by_skill = {}
+        for position, tier in enumerate(self.tiers):
+            for skill in tier.skills:
+                self._tiers_by_skill.setdefault(skill, set()).add(position)
+        self._eligible_tiers = {frozenset(): tuple(range(len(self.tiers)))}
+
+    def eligible_tiers(self, skills):
+        """Returns the positions of the tiers having every skill, in escalation order.
+
+        Args:
+            skills (frozenset): Skills required by the call.
+        """
+        try:
+            return self._eligible_tiers[skills]
+        except KeyError:
+            positions = set(range(len(self.tiers)))
+            for skill in skills:
+                positions &= self._tiers_by_skill.get(skill, set())
+            eligible_tiers = self._eligible_tiers[skills] = tuple(sorted(positions))
+            return eligible_tiers
+
+    def acquire(self, skills=frozenset()):
+        """Takes an idle agent able to answer a call and marks it busy.
+
+        Args:
+            skills (frozenset): Skills required by the call.
+
+        Returns:
+            tuple: Position of the tier and index of the agent in the tier, (-1, -1) if no
+                eligible agent is idle.
+        """
+        for position in self.eligible_tiers(skills):
+            idle_agents = self.idle_agents[position]
+            if len(idle_agents):
+                index = idle_agents.acquire()
+                if index > -1:
+                    return position, index
+        return -1, -1
+
+    def release(self, position, index):
+        """Marks an agent idle again once the call is over.
+
+        Args:
+            position (int): Position of the tier returned by acquire.
+            index (int): Index of the agent returned by acquire.
+        """
+        self.idle_agents[position].release(index)
+
 def find_free_fresher_index(freshers):
     """Find an available fresher employee in the call center.
 
     Args:
-        freshers (list): List of fresher employees.
+        freshers (list or IdleAgentIndex): List of fresher employees, or the index of the idle freshers.
 
     Returns:
         int: Index of the first available fresher, -1 if no freshers are available.
+            With an IdleAgentIndex the fresher is picked by its policy without scanning and marked busy.
     """
+    if isinstance(freshers, IdleAgentIndex):
+        return freshers.acquire()
     for index, fresher in enumerate(freshers):
         if not fresher.is_alive():
             return index
     return -1
 
+class CallQueue:
+    """Bounded queue of the calls waiting for an employee.
+
+    Calls are tuples starting with (call_id, arrival_time, loop_number, call_number). The waiting calls
+    are split by required skills, so a free employee looks at the head of each set of skills it has
+    rather than only at the head of the queue. Within a set, the "fifo" discipline keeps the calls in a
+    deque, the "priority" one in a heap of (priority, call_id), the lowest priority being answered first;
+    call ids increase with time, so the heads of the sets compare the same way. A caller who abandons is
+    only forgotten by the waiting dict, its entry is skipped when it reaches the head of its set.
+
+    Attributes:
+        capacity (int): Maximum number of waiting calls.
+        discipline (str): One of QUEUE_DISCIPLINES.
+        length_time (dict): Seconds spent at each queue length.
+    """
+    def __init__(self, capacity, discipline="fifo"):
+        if discipline not in QUEUE_DISCIPLINES:
+            raise ValueError(f"discipline must be one of {QUEUE_DISCIPLINES}")
+        self.capacity = capacity
+        self.discipline = discipline
+        self.length_time = {}
+        # Waiting calls mapped by required skills
+        self._entries = {}
+        self._waiting = {}
+        self._last_change = 0
+
+    def __len__(self):
+        return len(self._waiting)
+
+    def is_full(self):
+        """Returns True if no more calls can wait."""
+        return len(self._waiting) >= self.capacity
+
+    def _advance(self, now):
+        """Accounts the time spent at the current length up to now."""
+        length = len(self._waiting)
+        self.length_time[length] = self.length_time.get(length, 0) + now - self._last_change
+        self._last_change = now
+
+    def put(self, now, call, priority=0, skills=frozenset()):
+        """Adds a call to the queue, which must not be full.
+
+        Args:
+            now (float): The current time.
+            call (tuple): The waiting call.
+            priority (int): Priority class of the call, 0 being answered first.
+            skills (frozenset): Skills required by the call.
+        """
+        self._advance(now)
+        self._waiting[call[0]] = call
+        if self.discipline == "fifo":
+            entries = self._entries.get(skills)
+            if entries is None:
+                entries = self._entries[skills] = deque()
+            entries.append(call)
+        else:
+            heapq.heappush(self._entries.setdefault(skills, []), (priority, call[0], call))
+
+    def _head(self, entries):
+        """Drops the abandoned calls at the head of a set, returns its (priority, call_id) key or None."""
+        waiting = self._waiting
+        if self.discipline == "fifo":
+            while entries and entries[0][0] not in waiting:
+                entries.popleft()
+            return (0, entries[0][0]) if entries else None
+        while entries and entries[0][1] not in waiting:
+            heapq.heappop(entries)
+        return entries[0][:2] if entries else None
+
+    def get(self, now, skills=None):
+        """Takes the next waiting call an employee can answer.
+
+        Args:
+            now (float): The current time.
+            skills (frozenset): Skills of the employee, only calls requiring none but these are taken.
+                None takes the next call whatever its skills.
+
+        Returns:
+            tuple: The call, None if no such call is waiting.
+        """
+        first_entries = first_key = None
+        for required_skills, entries in self._entries.items():
+            if skills is not None and not required_skills <= skills:
+                continue
+            key = self._head(entries)
+            if key is not None and (first_key is None or key < first_key):
+                first_entries, first_key = entries, key
+        if first_entries is None:
+            return None
+        if self.discipline == "fifo":
+            call = first_entries.popleft()
+        else:
+            call = heapq.heappop(first_entries)[2]
+        self._advance(now)
+        del self._waiting[call[0]]
+        return call
+
+    def remove(self, now, call_id):
+        """Removes a call whose caller abandoned.
+
+        Args:
+            now (float): The current time.
+            call_id (int): The id of the call.
+
+        Returns:
+            tuple: The call, None if it was answered already.
+        """
+        if call_id not in self._waiting:
+            return None
+        self._advance(now)
+        return self._waiting.pop(call_id)
+
+    def close(self, now):
+        """Accounts the time spent at the current length up to the end of the run."""
+        self._advance(now)
+
+# Slots of the per role totals of a statistics shard
+_TECHNICAL_LEAD_COUNTER = 0
+_TECHNICAL_LEAD_CALL_DURATION = 1
+_PROJECT_MANAGER_COUNTER = 2
+_PROJECT_MANAGER_CALL_DURATION = 3
+_DROPPED_CALLS = 4
+_ANSWER_WAIT_TIME = 5
+_ABANDONED_CALLS = 6
+_ABANDONED_WAIT_TIME = 7
+
+# Default seconds of the intervals of the call distributions, and seconds within which a call meets the service level
+DEFAULT_DISTRIBUTION_INTERVAL = 900
+DEFAULT_SERVICE_LEVEL_THRESHOLD = 20
+
+# Role codes of the per call records
+ROLE_CODES = {FRESHER: 0, TECHNICAL_LEAD: 1, PROJECT_MANAGER: 2}
+DROPPED_ROLE_CODE = -1
+ABANDONED_ROLE_CODE = -2
+OTHER_TIER_ROLE_CODE = 3
+
+class _StatisticsShard:
+    """Counters of the calls recorded by one thread.
+
+    The counters are preallocated lists, which CPython updates faster than array('q'); the
+    per call records, which grow with the run, are compact arrays.
+
+    Attributes:
+        fresher_counter (list): Calls answered by each fresher.
+        fresher_call_duration (list): Seconds on the phone of each fresher.
+        totals (list): Technical lead, project manager, dropped and abandoned call totals, and wait times.
+        queue_length_time (dict): Seconds spent at each queue length.
+        tier_totals (dict): Calls and seconds on the phone of the custom routing tiers, mapped by tier name.
+        roles (array): Role code of each recorded call, None when calls are not recorded.
+        wait_times (array): Seconds each recorded call waited before it was answered.
+        handle_times (array): Seconds each recorded call lasted.
+        distributions (dict): Wait time and handle time StreamingHistogram pairs of the answered calls, mapped by
+            (role, interval), None when distributions are not recorded.
+        lost_distributions (dict): Wait time StreamingHistogram of the lost calls, mapped by (outcome, interval),
+            apart from the roles so a routing tier may have the name of an outcome.
+    """
+    __slots__ = ('fresher_counter', 'fresher_call_duration', 'totals', 'queue_length_time', 'tier_totals', 'roles', 'wait_times', 'handle_times',
+                 'distributions', 'lost_distributions')
+
+    def __init__(self, number_of_freshers, record_calls, record_distributions=False):
+        self.fresher_counter = [0] * number_of_freshers
+        self.fresher_call_duration = [0] * number_of_freshers
+        self.totals = [0] * 8
+        self.queue_length_time = {}
+        self.tier_totals = {}
+        self.roles = array('b') if record_calls else None
+        self.wait_times = array('d') if record_calls else None
+        self.handle_times = array('d') if record_calls else None
+        self.distributions = {} if record_distributions else None
+        self.lost_distributions = {} if record_distributions else None
+
+    def grow(self, number_of_freshers):
+        """Extends the fresher counters to number_of_freshers entries."""
+        missing = number_of_freshers - len(self.fresher_counter)
+        self.fresher_counter.extend([0] * missing)
+        self.fresher_call_duration.extend([0] * missing)
+
+    def record(self, role_code, wait_time, handle_time):
+        """Appends a call to the columnar call records."""
+        self.roles.append(role_code)
+        self.wait_times.append(wait_time)
+        self.handle_times.append(handle_time)
+
+    def observe(self, role, interval, wait_time, handle_time):
+        """Adds an answered call to the histograms of its role and interval."""
+        try:
+            histograms = self.distributions[role, interval]
+        except KeyError:
+            histograms = self.distributions[role, interval] = (StreamingHistogram(), StreamingHistogram())
+        histograms[0].add(wait_time)
+        histograms[1].add(handle_time)
+
+    def observe_lost(self, outcome, interval, wait_time):
+        """Adds a dropped or abandoned call to the histogram of its outcome and interval."""
+        try:
+            histogram = self.lost_distributions[outcome, interval]
+        except KeyError:
+            histogram = self.lost_distributions[outcome, interval] = StreamingHistogram()
+        histogram.add(wait_time)
+
 class CallStatistics:
     """Class for gathering call center statistics.
 
+    The counters live in preallocated shards, one per thread recording calls, so the threads
+    never wait for each other to update them. The shards are merged when the statistics are read.
+
     Attributes:
         fresher_statistics (dict): Dict of statistics mapped by fresher index. Contains counter and call duration.
         technical_lead_counter (int): Count of calls handled by the technical lead.
         technical_lead_call_duration (int): Total call duration handled by the technical lead.
         project_manager_counter (int): Count of calls handled by the project manager.
         project_manager_call_duration (int): Total call duration handled by the project manager.
+        dropped_calls (int): Count of calls lost because all lines were busy.
+        abandoned_calls (int): Count of callers who hung up while waiting in the queue.
+        record_calls (bool): Whether role, wait time and handle time are kept for every call.
+        record_distributions (bool): Whether the wait times and handle times are counted in streaming
+            histograms per role and per interval of arrival.
+        distribution_interval (float): Seconds of the intervals of the distributions.
+        elapsed (callable): Returns the seconds since the start of the run, set by the running simulation.
+            Every call is in the first interval when None.
+        tier_names (list): Names of the routing tiers in escalation order, None for the freshers, technical
+            lead and project manager of default_routing_tiers.
     """
-    def __init__(self):
-        self.fresher_statistics = {}
-        self.technical_lead_counter = 0
-        self.technical_lead_call_duration = 0
-        self.project_manager_counter = 0
-        self.project_manager_call_duration = 0
+    def __init__(self, number_of_freshers=0, record_calls=False, record_distributions=False,
+                 distribution_interval=DEFAULT_DISTRIBUTION_INTERVAL, tier_names=None):
+        if not distribution_interval > 0:
+            raise ValueError("distribution_interval must be positive")
+        self.number_of_freshers = number_of_freshers
+        self.record_calls = record_calls
+        self.record_distributions = record_distributions
+        self.distribution_interval = distribution_interval
+        self.tier_names = list(tier_names) if tier_names is not None else None
+        self.elapsed = None
+        self._shards = []
+        self._shards_lock = Lock()
+        self._local = local()
+
+    def __getstate__(self):
+        # The shards are kept, the lock, the thread local shard of the writer and the clock of the run are not picklable
+        state = self.__dict__.copy()
+        del state['_shards_lock'], state['_local']
+        state['elapsed'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._shards_lock = Lock()
+        self._local = local()
+        # The restoring thread carries on with the last shard, so a resumed event mode run adds up its
+        # floats in the same order as the uninterrupted run
+        if self._shards:
+            self._local.shard = self._shards[-1]
+
+    @classmethod
+    def merged(cls, call_statistics_list):
+        """Returns the statistics adding up several CallStatistics, such as the sites of a multi-site run.
+
+        The shards are shared with the merged statistics, not copied.
+
+        Args:
+            call_statistics_list (list): The CallStatistics instances.
 
-    def add_fresher_call(self, index, call_duration):
+        Returns:
+            CallStatistics: The combined statistics.
+        """
+        call_statistics_list = list(call_statistics_list)
+        distribution_intervals = {call_statistics.distribution_interval for call_statistics in call_statistics_list
+                                  if call_statistics.record_distributions}
+        if len(distribution_intervals) > 1:
+            raise ValueError("only distributions of the same interval can be merged")
+        tier_names = None
+        if any(call_statistics.tier_names is not None for call_statistics in call_statistics_list):
+            # The tiers of every site, in order of first appearance
+            tier_names = list(dict.fromkeys(
+                name for call_statistics in call_statistics_list
+                for name in (call_statistics.tier_names if call_statistics.tier_names is not None else ROLES)))
+        merged = cls(max([call_statistics.number_of_freshers for call_statistics in call_statistics_list], default=0),
+                     any(call_statistics.record_calls for call_statistics in call_statistics_list),
+                     bool(distribution_intervals), distribution_intervals.pop() if distribution_intervals else DEFAULT_DISTRIBUTION_INTERVAL,
+                     tier_names)
+        for call_statistics in call_statistics_list:
+            merged._shards.extend(call_statistics._shards)
+        return merged
+
+    def _new_shard(self):
+        """Creates the shard of the calling thread on its first update."""
+        shard = _StatisticsShard(self.number_of_freshers, self.record_calls, self.record_distributions)
+        with self._shards_lock:
+            self._shards.append(shard)
+        self._local.shard = shard
+        return shard
+
+    def _interval(self, wait_time):
+        """Returns the interval in which a call recorded now after waiting wait_time seconds arrived."""
+        if self.elapsed is None:
+            return 0
+        return max(int((self.elapsed() - wait_time) // self.distribution_interval), 0)
+
+    def add_fresher_call(self, index, call_duration, wait_time=0):
         """Add statistics for a fresher who handled a call.
 
         Args:
             index (int): Index of the fresher in the fresher list.
             call_duration (int): Duration of the call handled by the fresher.
+            wait_time (float): Seconds the call waited before it was answered.
         """
-        if index not in self.fresher_statistics:
-            self.fresher_statistics[index] = {'counter': 0, 'call_duration': 0}
-        self.fresher_statistics[index]['counter'] += 1
-        self.fresher_statistics[index]['call_duration'] += call_duration
-
-    def add_technical_lead_call(self, call_duration):
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        try:
+            shard.fresher_counter[index] += 1
+        except IndexError:
+            shard.grow(index + 1)
+            shard.fresher_counter[index] += 1
+        shard.fresher_call_duration[index] += call_duration
+        shard.totals[_ANSWER_WAIT_TIME] += wait_time
+        if shard.roles is not None:
+            shard.record(ROLE_CODES[FRESHER], wait_time, call_duration)
+        if shard.distributions is not None:
+            shard.observe(FRESHER, self._interval(wait_time), wait_time, call_duration)
+
+    def add_technical_lead_call(self, call_duration, wait_time=0):
         """Add statistics for a technical lead who handled a call.
 
         Args:
             call_duration (int): Duration of the call handled by the technical lead.
+            wait_time (float): Seconds the call waited before it was answered.
         """
-        self.technical_lead_counter += 1
-        self.technical_lead_call_duration += call_duration
-
-    def add_project_manager_call(self, call_duration):
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        shard.totals[_TECHNICAL_LEAD_COUNTER] += 1
+        shard.totals[_TECHNICAL_LEAD_CALL_DURATION] += call_duration
+        shard.totals[_ANSWER_WAIT_TIME] += wait_time
+        if shard.roles is not None:
+            shard.record(ROLE_CODES[TECHNICAL_LEAD], wait_time, call_duration)
+        if shard.distributions is not None:
+            shard.observe(TECHNICAL_LEAD, self._interval(wait_time), wait_time, call_duration)
+
+    def add_project_manager_call(self, call_duration, wait_time=0):
         """Add statistics for a project manager who handled a call.
 
         Args:
             call_duration (int): Duration of the call handled by the project manager.
+            wait_time (float): Seconds the call waited before it was answered.
+        """
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        shard.totals[_PROJECT_MANAGER_COUNTER] += 1
+        shard.totals[_PROJECT_MANAGER_CALL_DURATION] += call_duration
+        shard.totals[_ANSWER_WAIT_TIME] += wait_time
+        if shard.roles is not None:
+            shard.record(ROLE_CODES[PROJECT_MANAGER], wait_time, call_duration)
+        if shard.distributions is not None:
+            shard.observe(PROJECT_MANAGER, self._interval(wait_time), wait_time, call_duration)
+
+    def add_dropped_call(self, wait_time=0):
+        """Add statistics for a call lost because all lines were busy.
+
+        Args:
+            wait_time (float): Seconds the call waited before it was lost.
+        """
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        shard.totals[_DROPPED_CALLS] += 1
+        if shard.roles is not None:
+            shard.record(DROPPED_ROLE_CODE, wait_time, 0)
+        if shard.distributions is not None:
+            shard.observe_lost(OUTCOME_DROPPED, self._interval(wait_time), wait_time)
+
+    def add_tier_call(self, tier_name, call_duration, wait_time=0):
+        """Add statistics for an agent of a custom routing tier who handled a call.
+
+        Args:
+            tier_name (str): Name of the RoutingTier of the agent.
+            call_duration (int): Duration of the call handled by the agent.
+            wait_time (float): Seconds the call waited before it was answered.
+        """
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        try:
+            totals = shard.tier_totals[tier_name]
+        except KeyError:
+            totals = shard.tier_totals[tier_name] = [0, 0]
+        totals[0] += 1
+        totals[1] += call_duration
+        shard.totals[_ANSWER_WAIT_TIME] += wait_time
+        if shard.roles is not None:
+            shard.record(OTHER_TIER_ROLE_CODE, wait_time, call_duration)
+        if shard.distributions is not None:
+            shard.observe(tier_name, self._interval(wait_time), wait_time, call_duration)
+
+    def add_abandoned_call(self, wait_time):
+        """Add statistics for a caller who hung up while waiting in the queue.
+
+        Args:
+            wait_time (float): Seconds the caller waited before hanging up.
+        """
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        shard.totals[_ABANDONED_CALLS] += 1
+        shard.totals[_ABANDONED_WAIT_TIME] += wait_time
+        if shard.roles is not None:
+            shard.record(ABANDONED_ROLE_CODE, wait_time, 0)
+        if shard.distributions is not None:
+            shard.observe_lost(OUTCOME_ABANDONED, self._interval(wait_time), wait_time)
+
+    def add_queue_length_time(self, queue_length_time):
+        """Add the seconds the waiting queue spent at each length.
+
+        Args:
+            queue_length_time (dict): Seconds mapped by queue length, see CallQueue.length_time.
+        """
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        for length, seconds in queue_length_time.items():
+            shard.queue_length_time[length] = shard.queue_length_time.get(length, 0) + seconds
+
+    def _total(self, slot):
+        """Returns a per role total merged over the shards."""
+        return sum(shard.totals[slot] for shard in self._shards)
+
+    @property
+    def technical_lead_counter(self):
+        return self._total(_TECHNICAL_LEAD_COUNTER)
+
+    @property
+    def technical_lead_call_duration(self):
+        return self._total(_TECHNICAL_LEAD_CALL_DURATION)
+
+    @property
+    def project_manager_counter(self):
+        return self._total(_PROJECT_MANAGER_COUNTER)
+
+    @property
+    def project_manager_call_duration(self):
+        return self._total(_PROJECT_MANAGER_CALL_DURATION)
+
+    @property
+    def dropped_calls(self):
+        return self._total(_DROPPED_CALLS)
+
+    @property
+    def abandoned_calls(self):
+        return self._total(_ABANDONED_CALLS)
+
+    @property
+    def tier_statistics(self):
+        """Dict of the custom routing tier statistics mapped by tier name. Contains counter and call duration."""
+        merged = {}
+        for shard in self._shards:
+            for tier_name, (calls, seconds) in shard.tier_totals.items():
+                stats = merged.setdefault(tier_name, {'counter': 0, 'call_duration': 0})
+                stats['counter'] += calls
+                stats['call_duration'] += seconds
+        return merged
+
+    def answered_calls(self):
+        """Returns the number of calls answered by any employee."""
+        return (sum(self.fresher_counters()[0]) + self.technical_lead_counter
+                + self.project_manager_counter
+                + sum(stats['counter'] for stats in self.tier_statistics.values()))
+
+    def average_speed_of_answer(self):
+        """Returns the mean seconds an answered call waited, 0 without answered calls."""
+        answered_calls = self.answered_calls()
+        return self._total(_ANSWER_WAIT_TIME) / answered_calls if answered_calls else 0.0
+
+    def abandonment_rate(self):
+        """Returns the share of incoming calls whose caller hung up in the queue."""
+        total_calls = self.answered_calls() + self.dropped_calls + self.abandoned_calls
+        return self.abandoned_calls / total_calls if total_calls else 0.0
+
+    def queue_length_time(self):
+        """Returns the seconds spent at each queue length, merged over the shards."""
+        merged = {}
+        for shard in self._shards:
+            for length, seconds in shard.queue_length_time.items():
+                merged[length] = merged.get(length, 0) + seconds
+        return merged
+
+    def queue_length_percentile(self, percentile):
+        """Returns a time weighted percentile of the queue length.
+
+        Args:
+            percentile (float): Percentile between 0 and 100.
+
+        Returns:
+            int: The smallest length the queue did not exceed for that share of the time.
+        """
+        if not 0 <= percentile <= 100:
+            raise ValueError("percentile must be between 0 and 100")
+        queue_length_time = self.queue_length_time()
+        total_time = sum(queue_length_time.values())
+        if total_time <= 0:
+            return 0
+        elapsed = 0
+        for length in sorted(queue_length_time):
+            elapsed += queue_length_time[length]
+            if elapsed >= total_time * percentile / 100:
+                return length
+        return max(queue_length_time)
+
+    def fresher_counters(self):
+        """Returns the fresher counters merged over the shards.
+
+        Returns:
+            tuple: Lists of the calls answered and of the seconds on the phone, indexed by fresher.
+        """
+        size = max([self.number_of_freshers] + [len(shard.fresher_counter) for shard in self._shards])
+        counter = [0] * size
+        call_duration = [0] * size
+        for shard in self._shards:
+            for index, (calls, seconds) in enumerate(zip(shard.fresher_counter, shard.fresher_call_duration)):
+                counter[index] += calls
+                call_duration[index] += seconds
+        return counter, call_duration
+
+    @property
+    def fresher_statistics(self):
+        counter, call_duration = self.fresher_counters()
+        return {index: {'counter': counter[index], 'call_duration': call_duration[index]} for index in range(len(counter))}
+
+    def call_records(self):
+        """Returns the per call records merged over the shards.
+
+        Returns:
+            dict: 'role', 'wait_time' and 'handle_time' columns, the role being one of ROLE_CODES
+                OTHER_TIER_ROLE_CODE, DROPPED_ROLE_CODE or ABANDONED_ROLE_CODE. The columns are empty when calls are not recorded.
+        """
+        records = {'role': array('b'), 'wait_time': array('d'), 'handle_time': array('d')}
+        for shard in self._shards:
+            if shard.roles is not None:
+                records['role'].extend(shard.roles)
+                records['wait_time'].extend(shard.wait_times)
+                records['handle_time'].extend(shard.handle_times)
+        return records
+
+    def _record_arrays(self):
+        """Returns the roles, wait times and handle times arrays of every shard recording calls."""
+        return [record for shard in self._shards if shard.roles is not None
+                for record in (shard.roles, shard.wait_times, shard.handle_times)]
+
+    def record_lengths(self):
+        """Returns the length of each array returned by detach_records."""
+        return [len(record) for record in self._record_arrays()]
+
+    def detach_records(self):
+        """Takes the per call records out of the shards, so the statistics pickle without them.
+
+        The shards get empty arrays until attach_records puts the records back.
+
+        Returns:
+            list: The roles, wait times and handle times arrays of every shard recording calls.
+        """
+        records = self._record_arrays()
+        for shard in self._shards:
+            if shard.roles is not None:
+                shard.roles, shard.wait_times, shard.handle_times = array('b'), array('d'), array('d')
+        return records
+
+    def attach_records(self, records):
+        """Puts back the records returned by detach_records, or read from a checkpoint file."""
+        records = iter(records)
+        for shard in self._shards:
+            if shard.roles is not None:
+                shard.roles, shard.wait_times, shard.handle_times = next(records), next(records), next(records)
+
+    def distributions(self):
+        """Returns the histograms of the answered calls merged over the shards.
+
+        Returns:
+            dict: (wait time, handle time) StreamingHistogram pairs mapped by (role, interval), the role being a
+                routing tier name and the interval the index of the distribution_interval of arrival. Empty when
+                distributions are not recorded.
+        """
+        merged = {}
+        for shard in self._shards:
+            for key, (wait_times, handle_times) in (shard.distributions or {}).items():
+                if key not in merged:
+                    merged[key] = (StreamingHistogram(), StreamingHistogram())
+                merged[key][0].merge(wait_times)
+                merged[key][1].merge(handle_times)
+        return merged
+
+    def lost_distributions(self):
+        """Returns the wait time histograms of the lost calls merged over the shards.
+
+        Returns:
+            dict: StreamingHistogram mapped by (outcome, interval), the outcome being OUTCOME_DROPPED or
+                OUTCOME_ABANDONED. Empty when distributions are not recorded.
         """
-        self.project_manager_counter += 1
-        self.project_manager_call_duration += call_duration
+        merged = {}
+        for shard in self._shards:
+            for key, wait_times in (shard.lost_distributions or {}).items():
+                merged.setdefault(key, StreamingHistogram()).merge(wait_times)
+        return merged
+
+    def _merged_histogram(self, slot, role):
+        """Returns the wait time (slot 0) or handle time (slot 1) histogram of a role over every interval,
+        of every answered call when role is None."""
+        histogram = StreamingHistogram()
+        for (call_role, _), histograms in self.distributions().items():
+            if role is None or call_role == role:
+                histogram.merge(histograms[slot])
+        return histogram
+
+    def wait_time_percentile(self, percentile, role=None):
+        """Returns a percentile of the seconds the answered calls of a role waited, of every role when None."""
+        return self._merged_histogram(0, role).percentile(percentile)
+
+    def call_duration_percentile(self, percentile, role=None):
+        """Returns a percentile of the call durations of a role, of every role when None."""
+        return self._merged_histogram(1, role).percentile(percentile)
+
+    def interval_statistics(self, service_level_threshold=DEFAULT_SERVICE_LEVEL_THRESHOLD):
+        """Returns the service of every interval of the distributions, by interval of arrival.
+
+        Args:
+            service_level_threshold (float): Seconds within which a call must be answered to meet the service level.
 
-    def print_summary(self):
-        """Prints a summary of the call center statistics."""
+        Returns:
+            list: One dict per interval with calls, in time order: its 'start' in seconds, the 'offered',
+                'answered', 'dropped' and 'abandoned' calls, the 'service_level' (share of the offered calls
+                answered within the threshold) and the 'wait_time_p95' of the answered calls.
+        """
+        intervals = {}
+        for (_, interval), (wait_times, _) in self.distributions().items():
+            if interval not in intervals:
+                intervals[interval] = {OUTCOME_DROPPED: 0, OUTCOME_ABANDONED: 0, 'answered': StreamingHistogram()}
+            intervals[interval]['answered'].merge(wait_times)
+        for (outcome, interval), wait_times in self.lost_distributions().items():
+            if interval not in intervals:
+                intervals[interval] = {OUTCOME_DROPPED: 0, OUTCOME_ABANDONED: 0, 'answered': StreamingHistogram()}
+            intervals[interval][outcome] += wait_times.count
+        statistics = []
+        for interval, counts in sorted(intervals.items()):
+            answered = counts['answered']
+            offered = answered.count + counts[OUTCOME_DROPPED] + counts[OUTCOME_ABANDONED]
+            statistics.append({
+                'start': interval * self.distribution_interval,
+                'offered': offered,
+                'answered': answered.count,
+                'dropped': counts[OUTCOME_DROPPED],
+                'abandoned': counts[OUTCOME_ABANDONED],
+                'service_level': answered.count_at_most(service_level_threshold) / offered if offered else 0.0,
+                'wait_time_p95': answered.percentile(95),
+            })
+        return statistics
+
+    def summary(self):
+        """Returns a compact summary of the call center statistics, cheap to pickle.
+
+        Returns:
+            dict: Call counts and seconds on the phone per role, the freshers being added up, and the dropped calls.
+        """
+        counter, call_duration = self.fresher_counters()
+        return {
+            'fresher_counter': sum(counter),
+            'fresher_call_duration': sum(call_duration),
+            'technical_lead_counter': self.technical_lead_counter,
+            'technical_lead_call_duration': self.technical_lead_call_duration,
+            'project_manager_counter': self.project_manager_counter,
+            'project_manager_call_duration': self.project_manager_call_duration,
+            'dropped_calls': self.dropped_calls,
+            'abandoned_calls': self.abandoned_calls,
+            'average_speed_of_answer': self.average_speed_of_answer(),
+        }
+
+    def print_summary(self, per_agent=None):
+        """Prints a summary of the call center statistics.
+
+        Args:
+            per_agent (bool): Whether to print a line per fresher rather than their total. By default the
+                freshers are listed when there are at most MAX_LISTED_FRESHERS of them.
+        """
         print("----------------------------------------------")
         print('Summary:')
-        for i, stats in sorted(self.fresher_statistics.items()):
-            print(f'fresher {i + 1}: answered {stats["counter"]} calls and spent {stats["call_duration"]} seconds on the phone.')
-        print(f'Technical lead: answered {self.technical_lead_counter} calls and spent {self.technical_lead_call_duration} seconds on the phone.')
-        print(f'Project manager: answered {self.project_manager_counter} calls and spent {self.project_manager_call_duration} seconds on the phone.')
+        tier_statistics = self.tier_statistics
+        # Only the configured tiers are listed, custom tiers replace the built-in roles
+        for tier_name in self.tier_names if self.tier_names is not None else ROLES:
+            if tier_name == FRESHER:
+                counter, call_duration = self.fresher_counters()
+                if per_agent is None:
+                    per_agent = len(counter) <= MAX_LISTED_FRESHERS
+                if per_agent:
+                    for i, (calls, seconds) in enumerate(zip(counter, call_duration)):
+                        print(f'fresher {i + 1}: answered {calls} calls and spent {seconds} seconds on the phone.')
+                else:
+                    print(f'{len(counter)} freshers: answered {sum(counter)} calls and spent {sum(call_duration)} seconds on the phone.')
+            elif tier_name == TECHNICAL_LEAD:
+                print(f'Technical lead: answered {self.technical_lead_counter} calls and spent {self.technical_lead_call_duration} seconds on the phone.')
+            elif tier_name == PROJECT_MANAGER:
+                print(f'Project manager: answered {self.project_manager_counter} calls and spent {self.project_manager_call_duration} seconds on the phone.')
+            else:
+                stats = tier_statistics.get(tier_name, {'counter': 0, 'call_duration': 0})
+                print(f'{tier_name}: answered {stats["counter"]} calls and spent {stats["call_duration"]} seconds on the phone.')
+        if self.dropped_calls:
+            print(f'Dropped calls: {self.dropped_calls} calls found all lines busy.')
+        if self.queue_length_time():
+            print(f'Queue: average speed of answer {self.average_speed_of_answer():.2f} seconds, '
+                  f'{self.abandoned_calls} abandoned calls ({self.abandonment_rate():.1%}), '
+                  f'95th percentile length {self.queue_length_percentile(95)}.')
+        if self.record_distributions:
+            roles = {}
+            for (role, _), histograms in self.distributions().items():
+                role_histograms = roles.setdefault(role, (StreamingHistogram(), StreamingHistogram()))
+                role_histograms[0].merge(histograms[0])
+                role_histograms[1].merge(histograms[1])
+            for role in sorted(roles, key=lambda role: (ROLE_CODES.get(role, len(ROLE_CODES)), role)):
+                wait_times, handle_times = roles[role]
+                print(f'{role}: call duration p50 {handle_times.percentile(50):.1f}, p95 {handle_times.percentile(95):.1f}, '
+                      f'p99 {handle_times.percentile(99):.1f} seconds; wait time p50 {wait_times.percentile(50):.1f}, '
+                      f'p95 {wait_times.percentile(95):.1f}, p99 {wait_times.percentile(99):.1f} seconds.')
+            for interval in self.interval_statistics():
+                print(f'Interval from {interval["start"]:g} s: {interval["offered"]} calls, {interval["answered"]} answered, '
+                      f'service level {interval["service_level"]:.1%} within {DEFAULT_SERVICE_LEVEL_THRESHOLD} s, '
+                      f'wait time p95 {interval["wait_time_p95"]:.1f} seconds.')
 
 class CallCenterSimulation:
     """Class representing the call center simulation.
@@ -156,12 +1482,60 @@ class CallCenterSimulation:
     Attributes:
         call_statistics (CallStatistics): Instance to keep track of the call statistics.
         lock (Lock): A thread lock instance to ensure thread safety when modifying shared data.
+        outstanding_calls (OutstandingCalls): Calls in progress in the thread mode.
+        event_sink (EventSink): Receives the call events, printed to the console by default.
+        call_trace (CallTraceWriter): Receives one row per call in the event mode, None to skip the trace.
+        metrics (Metrics): Receives the phase timers, lock contention and thread counts, None to run uninstrumented.
+        monitor (SimulationMonitor): Receives snapshots of the running simulation, None to publish none.
+        clock (Clock): Clock of the thread, pool and async modes, the wall clock by default. The event mode
+            runs on its own virtual clock.
+        site_link (SiteLink): Link of a site of a multi-site run to the other sites, see the multisite module.
+            None for a single call center.
     """
-    def __init__(self):
+    def __init__(self, event_sink=None, call_trace=None, metrics=None, monitor=None, clock=None):
+        self.event_sink = event_sink if event_sink is not None else ConsoleEventSink()
+        self.call_trace = call_trace
         self.call_statistics = CallStatistics()
         self.lock = Lock()  # Create a lock instance
+        self.outstanding_calls = OutstandingCalls()
+        self.monitor = monitor
+        self.clock = clock if clock is not None else REAL_TIME_CLOCK
+        self.site_link = None
+        self.metrics = metrics
+        if metrics is not None:
+            self._instrument(metrics)
 
-    def set(self, number_of_freshers, run_time, min_max_calls_per_wave, min_max_sleep_interval, min_max_call_duration):
+    def _instrument(self, metrics):
+        """Replaces the lock, the event sink and the dispatch methods by instrumented wrappers.
+
+        Args:
+            metrics (Metrics): Receives the measurements.
+        """
+        self.lock = InstrumentedLock(self.lock, metrics, "simulation")
+        self.event_sink = TimedEventSink(self.event_sink, metrics)
+        for method in ("assign_freshers", "assign_technical_lead", "assign_project_manager", "termination_message",
+                       "_find_free_fresher_index", "_dispatch_pooled_call"):
+            setattr(self, method, metrics.timed(method.lstrip("_"), getattr(self, method)))
+        process_call_wave = metrics.timed("process_call_wave", self._process_call_wave)
+
+        def sampled_process_call_wave(*args):
+            # Sampled once the calls of the wave have started their threads
+            try:
+                return process_call_wave(*args)
+            finally:
+                metrics.sample_threads()
+        self._process_call_wave = sampled_process_call_wave
+
+    def _instrument_employee(self, employee):
+        """Replaces the lock of an employee thread by an instrumented wrapper."""
+        if not isinstance(employee.lock, InstrumentedLock):
+            employee.lock = InstrumentedLock(employee.lock, self.metrics, "employee")
+
+    def set(self, number_of_freshers, run_time, min_max_calls_per_wave, min_max_sleep_interval, min_max_call_duration, fresher_selection_policy="first_free", record_calls=False, seed=None,
+            queue_capacity=0, patience=None, queue_discipline="fifo", call_priorities=None,
+            routing_tiers=None, call_skills=None, arrival_process=None, call_detail_records=None, shift_schedule=None,
+            checkpoint_path=None, checkpoint_interval=DEFAULT_CHECKPOINT_INTERVAL, record_distributions=False,
+            distribution_interval=DEFAULT_DISTRIBUTION_INTERVAL):
         """Set the parameters of the simulation.
 
         Args:
@@ -170,100 +1544,280 @@ class CallCenterSimulation:
             min_max_calls_per_wave (tuple): Min and max number of calls per wave.
             min_max_sleep_interval (tuple): Min and max sleep interval between call waves.
             min_max_call_duration (tuple): Min and max duration of calls.
+            fresher_selection_policy (str): How a free fresher is picked, one of IDLE_POLICIES.
+            record_calls (bool): Keep role, wait time and handle time of every call in the statistics.
+            seed (int): Seed of the random streams, None for a different run every time.
+            queue_capacity (int): Calls that may wait for a free employee, 0 drops them at once. Event mode only.
+            patience (float or callable): Mean seconds a caller waits in the queue before hanging up
+                (exponentially distributed), or a callable drawing it from a random.Random. None never abandons.
+            queue_discipline (str): Order in which waiting calls are answered, one of QUEUE_DISCIPLINES.
+            call_priorities (list): Weights of the priority classes of the calls, class 0 being answered
+                first. Used by the "priority" discipline, every call has class 0 when None.
+            routing_tiers (list): RoutingTier instances in escalation order, replacing the freshers,
+                technical lead and project manager of default_routing_tiers. Event mode only.
+            call_skills (list): (skills, weight) pairs from which the skills required by each call are
+                drawn. Every call can be answered by any tier when None. Event mode only.
+            arrival_process (callable): Replaces the call waves by single calls arriving at the times
+                generated by arrival_process(random_stream), see the arrivals module. Event mode only.
+            call_detail_records (callable): Replaces the call waves by recorded calls: call_detail_records(random_stream)
+                returns an iterator of (arrival_time, handle_time) pairs, a handle_time of None being drawn,
+                see arrivals.call_detail_record_process. The run time may then reach MAX_REPLAY_RUN_TIME. Event mode only.
+            shift_schedule (ShiftSchedule): Shifts and breaks of the agents of the routing tiers, the agents
+                without shifts being always available. Event mode only.
+            checkpoint_path (str): Write a checkpoint of the run to this file every checkpoint_interval
+                simulated seconds, see resume_simulation. Event mode only.
+            checkpoint_interval (float): Simulated seconds between two checkpoints.
+            record_distributions (bool): Count the wait times and call durations in streaming histograms per
+                role and per interval, for their percentiles and the service level of every interval.
+            distribution_interval (float): Seconds of the intervals of the distributions.
         """
         # Security Enhancement: Validate inputs to prevent Resource Exhaustion (DoS risk)
-        if not (0 <= number_of_freshers <= 1000):
-            raise ValueError("number_of_freshers must be between 0 and 1000")
-        if run_time < 0 or run_time > 86400:  # Max 1 day simulation
-            raise ValueError("run_time must be between 0 and 86400")
+        if not (0 <= number_of_freshers <= MAX_FRESHERS):
+            raise ValueError(f"number_of_freshers must be between 0 and {MAX_FRESHERS}")
+        max_run_time = MAX_REPLAY_RUN_TIME if call_detail_records is not None else MAX_RUN_TIME
+        if run_time < 0 or run_time > max_run_time:
+            raise ValueError(f"run_time must be between 0 and {max_run_time}")
         if not (0 <= min_max_calls_per_wave[0] <= min_max_calls_per_wave[1] and min_max_calls_per_wave[1] <= 10000):
             raise ValueError("Invalid min_max_calls_per_wave range")
         if not (0 <= min_max_sleep_interval[0] <= min_max_sleep_interval[1]):
             raise ValueError("Invalid min_max_sleep_interval range")
         if not (0 <= min_max_call_duration[0] <= min_max_call_duration[1]):
             raise ValueError("Invalid min_max_call_duration range")
+        if fresher_selection_policy not in IDLE_POLICIES:
+            raise ValueError(f"fresher_selection_policy must be one of {IDLE_POLICIES}")
+        if seed is not None and not isinstance(seed, int):
+            raise ValueError("seed must be an integer or None")
+        if not (0 <= queue_capacity <= MAX_QUEUE_CAPACITY):
+            raise ValueError(f"queue_capacity must be between 0 and {MAX_QUEUE_CAPACITY}")
+        if patience is not None and not callable(patience) and not patience > 0:
+            raise ValueError("patience must be a positive number, a callable or None")
+        if queue_discipline not in QUEUE_DISCIPLINES:
+            raise ValueError(f"queue_discipline must be one of {QUEUE_DISCIPLINES}")
+        if call_priorities is not None and (not call_priorities or min(call_priorities) < 0 or sum(call_priorities) <= 0):
+            raise ValueError("call_priorities must be non negative weights with a positive sum")
+        if routing_tiers is not None:
+            if not routing_tiers or sum(tier.size for tier in routing_tiers) > MAX_FRESHERS:
+                raise ValueError(f"routing_tiers must hold between 1 and {MAX_FRESHERS} agents")
+            if len({tier.name for tier in routing_tiers}) != len(routing_tiers):
+                raise ValueError("routing tier names must be unique")
+        if call_skills is not None and (not call_skills or min(weight for _, weight in call_skills) < 0
+                                        or sum(weight for _, weight in call_skills) <= 0):
+            raise ValueError("call_skills must be (skills, weight) pairs with non negative weights and a positive sum")
+        if not checkpoint_interval > 0:
+            raise ValueError("checkpoint_interval must be positive")
+        if not distribution_interval > 0:
+            raise ValueError("distribution_interval must be positive")
 
         self.number_of_freshers = number_of_freshers
         self.run_time = run_time
         self.min_max_calls_per_wave = min_max_calls_per_wave
         self.min_max_sleep_interval = min_max_sleep_interval
         self.min_max_call_duration = min_max_call_duration
-        self.call_statistics = CallStatistics(number_of_freshers)
-
-    def assign_project_manager(self, technical_lead, project_manager):
+        self.fresher_selection_policy = fresher_selection_policy
+        self.queue_capacity = queue_capacity
+        self.patience = patience
+        self.queue_discipline = queue_discipline
+        self.call_priorities = call_priorities
+        if arrival_process is not None and not callable(arrival_process):
+            raise ValueError("arrival_process must be a callable returning an iterator of arrival times")
+        self.arrival_process = arrival_process
+        if call_detail_records is not None and not callable(call_detail_records):
+            raise ValueError("call_detail_records must be a callable returning an iterator of (arrival_time, handle_time) pairs")
+        if call_detail_records is not None and arrival_process is not None:
+            raise ValueError("arrival_process and call_detail_records both replace the call waves, give only one")
+        self.call_detail_records = call_detail_records
+        self.shift_schedule = shift_schedule
+        self.custom_routing = routing_tiers is not None or call_skills is not None
+        self.routing_tiers = list(routing_tiers) if routing_tiers is not None else default_routing_tiers(number_of_freshers)
+        self.call_skills = [(frozenset(skills), weight) for skills, weight in call_skills] if call_skills is not None else None
+        if shift_schedule is not None:
+            # Refuse shifts of agents the routing tiers do not have
+            shift_schedule.transitions(self.routing_tiers)
+        self.seed = seed
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
+        if checkpoint_path is not None:
+            # Fail now rather than at the first checkpoint, e.g. on a lambda patience
+            try:
+                pickle.dumps(self._checkpoint_configuration())
+            except (pickle.PicklingError, TypeError, AttributeError) as error:
+                raise ValueError(f"the parameters of a checkpointed run must be picklable: {error}") from None
+        self.random_streams = self._create_random_streams()
+        self.call_statistics = CallStatistics(number_of_freshers, record_calls, record_distributions, distribution_interval,
+                                              [tier.name for tier in routing_tiers] if routing_tiers is not None else None)
+
+    def _checkpoint_configuration(self):
+        """Returns the parameters given to set() that a checkpoint restores."""
+        return {name: getattr(self, name) for name in CHECKPOINT_ATTRIBUTES}
+
+    def _draw_calls_per_wave(self):
+        """Draws the number of calls of a wave from the wave stream."""
+        return self.random_streams[WAVE_STREAM].randint(self.min_max_calls_per_wave[0], self.min_max_calls_per_wave[1])
+
+    def _draw_sleep_interval(self):
+        """Draws the interval before the next wave from the interval stream."""
+        return self.random_streams[INTERVAL_STREAM].randint(self.min_max_sleep_interval[0], self.min_max_sleep_interval[1])
+
+    def _create_random_streams(self):
+        """Creates the random streams of a run, with a call duration stream per routing tier."""
+        return create_random_streams(self.seed, [tier.name for tier in self.routing_tiers])
+
+    def _arrivals(self):
+        """Returns an iterator of the (arrival_time, call_duration) pairs of the arrival process or of the
+        call detail records, a call_duration of None being drawn when the call is answered."""
+        random_stream = self.random_streams[ARRIVAL_STREAM]
+        if self.call_detail_records is not None:
+            return iter(self.call_detail_records(random_stream))
+        return zip(self.arrival_process(random_stream), itertools.repeat(None))
+
+    def _agent_transitions(self):
+        """Returns the state transitions of the scheduled agents, mapped by (tier position, agent index)."""
+        if self.shift_schedule is None:
+            return {}
+        return self.shift_schedule.transitions(self.routing_tiers)
+
+    def _draw_call_skills(self):
+        """Draws the skills required by a call from the skill stream."""
+        if self.call_skills is None:
+            return frozenset()
+        return self.random_streams[SKILL_STREAM].choices(self.call_skills, [weight for _, weight in self.call_skills])[0][0]
+
+    def _record_answered_call(self, tier_name, index, call_duration, wait_time):
+        """Adds an answered call to the statistics of its role, or of its custom routing tier."""
+        if tier_name == FRESHER:
+            self.call_statistics.add_fresher_call(index, call_duration, wait_time)
+        elif tier_name == TECHNICAL_LEAD:
+            self.call_statistics.add_technical_lead_call(call_duration, wait_time)
+        elif tier_name == PROJECT_MANAGER:
+            self.call_statistics.add_project_manager_call(call_duration, wait_time)
+        else:
+            self.call_statistics.add_tier_call(tier_name, call_duration, wait_time)
+
+    def _draw_patience(self):
+        """Draws the seconds a queued caller waits before hanging up from the patience stream."""
+        if callable(self.patience):
+            return self.patience(self.random_streams[PATIENCE_STREAM])
+        return self.random_streams[PATIENCE_STREAM].expovariate(1 / self.patience)
+
+    def _draw_call_priority(self):
+        """Draws the priority class of a queued call from the priority stream."""
+        if self.queue_discipline != "priority" or self.call_priorities is None:
+            return 0
+        return self.random_streams[PRIORITY_STREAM].choices(range(len(self.call_priorities)), self.call_priorities)[0]
+
+    def _draw_call_duration(self, role):
+        """Draws the duration of a call from the stream of the role answering it."""
+        return self.random_streams[role].randint(self.min_max_call_duration[0], self.min_max_call_duration[1])
+
+    def assign_project_manager(self, technical_lead, project_manager, on_hang_up=None):
         """Assign a call to the project manager.
 
         Args:
             technical_lead (TechnicalLead): The technical lead instance.
             project_manager (projectManager): The project manager instance.
+            on_hang_up (callable): Optional callback invoked when the project manager hangs up, or when the thread cannot be started.
 
         Returns:
             ProjectManager: The project manager instance.
         """
-        print(f"{technical_lead.name} is busy, call is being forwarded to the {project_manager.name}.")
-        print(f"{project_manager.name} is free and will answer the call.")
         self.lock.acquire()
         try:
+            self.event_sink.escalated(project_manager.name, technical_lead.name)
             if project_manager.was_called_before:
                 project_manager = ProjectManager()
-            project_manager.set("project manager", self.min_max_call_duration)
+            project_manager.set("project manager", self.min_max_call_duration, self.random_streams[PROJECT_MANAGER])
+            project_manager.on_hang_up = on_hang_up
+            project_manager.event_sink = self.event_sink
+            project_manager.clock = self.clock
+            if self.metrics is not None:
+                self._instrument_employee(project_manager)
+            self.event_sink.assigned(project_manager.name, project_manager.call_duration)
             project_manager.start()
-            self.call_statistics.add_project_manager_call(project_manager.call_duration)
+        except Exception:
+            # The thread was not started and will never hang up, so the call is closed here
+            if on_hang_up is not None:
+                on_hang_up()
+            raise
         finally:
             self.lock.release()
+        # The statistics go to the shard of this thread, outside the lock
+        self.call_statistics.add_project_manager_call(project_manager.call_duration)
 
         return project_manager
 
-    def assign_technical_lead(self, technical_lead):
+    def assign_technical_lead(self, technical_lead, on_hang_up=None):
         """Assign a call to the technical lead.
 
         Args:
             technical_lead (TechnicalLead): The technical lead instance.
+            on_hang_up (callable): Optional callback invoked when the technical lead hangs up, or when the thread cannot be started.
 
         Returns:
             TechnicalLead: The technical lead instance.
         """
-        print(f"All freshers are busy, call is being forwarded to the {technical_lead.name}.")
-        print(f"{technical_lead.name} is free and will answer the call.")
         self.lock.acquire()
         try:
+            self.event_sink.escalated(technical_lead.name)
             if technical_lead.was_called_before:
                 technical_lead = TechnicalLead()
-                technical_lead.set("technical lead", self.min_max_call_duration)
+                technical_lead.set("technical lead", self.min_max_call_duration, self.random_streams[TECHNICAL_LEAD])
+            technical_lead.on_hang_up = on_hang_up
+            technical_lead.event_sink = self.event_sink
+            technical_lead.clock = self.clock
+            if self.metrics is not None:
+                self._instrument_employee(technical_lead)
+            self.event_sink.assigned(technical_lead.name, technical_lead.call_duration)
             technical_lead.start()
-            self.call_statistics.add_technical_lead_call(technical_lead.call_duration)
+        except Exception:
+            # The thread was not started and will never hang up, so the call is closed here
+            if on_hang_up is not None:
+                on_hang_up()
+            raise
         finally:
             self.lock.release()
+        # The statistics go to the shard of this thread, outside the lock
+        self.call_statistics.add_technical_lead_call(technical_lead.call_duration)
 
         return technical_lead
 
-    def assign_freshers(self, freshers, idx):
+    def assign_freshers(self, freshers, idx, on_hang_up=None):
         """Assign a call to a fresher.
 
         Args:
             freshers (list): List of fresher instances.
             idx (int): Index of the fresher to assign the call.
+            on_hang_up (callable): Optional callback invoked when the fresher hangs up, or when the thread cannot be started.
         """
-        print(f"{freshers[idx].name} is {'busy' if freshers[idx].is_alive() else 'free'}.")
         self.lock.acquire()
         try:
             if freshers[idx].was_called_before:
                 freshers[idx] = Fresher()
-                freshers[idx].set(f"fresher {idx + 1}", self.min_max_call_duration)
-            freshers[idx].start()
-            self.call_statistics.add_fresher_call(idx, freshers[idx].call_duration)
+                freshers[idx].set(f"fresher {idx + 1}", self.min_max_call_duration, self.random_streams[FRESHER])
+            freshers[idx].on_hang_up = on_hang_up
+            freshers[idx].event_sink = self.event_sink
+            freshers[idx].clock = self.clock
+            if self.metrics is not None:
+                self._instrument_employee(freshers[idx])
+            self.event_sink.assigned(freshers[idx].name, freshers[idx].call_duration)
+            fresher = freshers[idx]
+            fresher.start()
+        except Exception:
+            # The thread was not started and will never hang up, so the call is closed here
+            if on_hang_up is not None:
+                on_hang_up()
+            raise
         finally:
             self.lock.release()
+        # The statistics go to the shard of this thread, outside the lock
+        self.call_statistics.add_fresher_call(idx, fresher.call_duration)
 
     def termination_message(self, project_manager):
-        """Print a termination message when all lines are busy.
+        """Report to the event sink that a call is lost because all lines are busy.
 
         Args:
             project_manager (projectManager): The project manager instance.
         """
-        print(f"{project_manager.name} is busy.")
-        print("All lines are busy. Please try again later.")
-        print("----------------------------------------------")
+        self.event_sink.rejected(project_manager.name)
 
     def _initialize_employees(self):
         """Initializes the freshers, technical lead, and project manager.
@@ -274,154 +1828,803 @@ class CallCenterSimulation:
         freshers = []
         for i in range(self.number_of_freshers):
             fresher = Fresher()
-            fresher.set(f"fresher {i + 1}", self.min_max_call_duration)
+            fresher.set(f"fresher {i + 1}", self.min_max_call_duration, self.random_streams[FRESHER])
             freshers.append(fresher)
         technical_lead = TechnicalLead()
-        technical_lead.set("technical lead", self.min_max_call_duration)
+        technical_lead.set("technical lead", self.min_max_call_duration, self.random_streams[TECHNICAL_LEAD])
         project_manager = ProjectManager()
-        project_manager.set("project manager", self.min_max_call_duration)
+        project_manager.set("project manager", self.min_max_call_duration, self.random_streams[PROJECT_MANAGER])
         return freshers, technical_lead, project_manager
 
-    def _process_call_wave(self, loop_number, freshers, fresher_counter, technical_lead, project_manager):
+    def _publish_snapshot(self, clock, tiers, queue_length=0, final=False, agent_states=None):
+        """Publishes a snapshot of the running simulation to the monitor.
+
+        The snapshot is built from fresh objects, so the monitor readers never see it change.
+
+        Args:
+            clock (float): Simulated seconds in the event mode, seconds since the start otherwise.
+            tiers (list): (role, agent names, busy flags) of every group of agents.
+            queue_length (int): Calls waiting for an employee.
+            final (bool): Whether the run is over.
+            agent_states (dict): Availability states of the scheduled agents, mapped by (group position,
+                agent index). The other agents are available.
+        """
+        agent_states = agent_states or {}
+        agents = [{"name": name, "role": role, "busy": busy, "state": agent_states.get((position, index), AVAILABLE)}
+                  for position, (role, names, busy_flags) in enumerate(tiers)
+                  for index, (name, busy) in enumerate(zip(names, busy_flags))]
+        busy_agents = sum(agent["busy"] for agent in agents)
+        idle_agents = sum(not agent["busy"] and agent["state"] == AVAILABLE for agent in agents)
+        self.monitor.publish({
+            "clock": clock,
+            "agents": agents,
+            "busy_agents": busy_agents,
+            "idle_agents": idle_agents,
+            "unavailable_agents": len(agents) - busy_agents - idle_agents,
+            "queue_length": queue_length,
+            "statistics": self.call_statistics.summary(),
+        }, final)
+
+    def _process_call_wave(self, loop_number, freshers, idle_freshers, technical_lead, project_manager):
         """Processes a single wave of calls.
 
         Args:
             loop_number (int): The current loop iteration number.
             freshers (list): List of fresher instances.
-            fresher_counter (list): List of counts for calls handled by each fresher.
+            idle_freshers (IdleAgentIndex): Index of the idle freshers.
             technical_lead (TechnicalLead): The technical lead instance.
             project_manager (ProjectManager): The project manager instance.
 
         Returns:
             tuple: The updated technical lead and project manager instances.
         """
-        number_of_calls = random.randint(self.min_max_calls_per_wave[0], self.min_max_calls_per_wave[1])
-        print("\n%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%\n")
-        print(f"Incoming calls: {number_of_calls}, loop: {loop_number}")
-        print("----------------------------------------------")
+        number_of_calls = self._draw_calls_per_wave()
+        self.event_sink.wave_arrived(loop_number, number_of_calls)
         # Process individual calls
         for call in range(number_of_calls):
-            # Find indices of free freshers, -1 if none
-            idx = find_free_fresher_index([not fresher.is_alive() for fresher in freshers])
-            print(f"Call {call + 1} is on top of the queue.")
-            print("----------------------")
+            # Take a free fresher from the idle index, -1 if none
+            idx = self._find_free_fresher_index(idle_freshers)
+            self.event_sink.call_arrived(loop_number, call + 1)
 
             if idx > -1:
                 # If any of the freshers ia available then assign the call to that fresher
                 # If the employee was in a call before then the thread should be re-initialized
-                self.assign_freshers(freshers, fresher_counter, idx)
+                self._assign_call(self.assign_freshers, functools.partial(self._fresher_hung_up, idle_freshers, idx), freshers, idx)
             else:
                 # If all freshers are busy then assign the call to the technical lead
                 if not technical_lead.is_alive():
                     # If the employee was in a call before then the thread should be re-initialized
-                    technical_lead = self.assign_technical_lead(technical_lead)
+                    technical_lead = self._assign_call(self.assign_technical_lead, self.outstanding_calls.finish, technical_lead)
                 else:
                     # If the technical lead is busy then assign the call to the project manager
                     if not project_manager.is_alive():
                         # If the employee was in a call before then the thread should be re-initialized
-                        project_manager = self.assign_project_manager(technical_lead, project_manager)
+                        project_manager = self._assign_call(self.assign_project_manager, self.outstanding_calls.finish,
+                                                            technical_lead, project_manager)
                     else:
+                        self.call_statistics.add_dropped_call()
                         self.termination_message(project_manager)
         return technical_lead, project_manager
 
+    def _assign_call(self, assign, on_hang_up, *args):
+        """Counts a call in progress and assigns it with assign(*args, on_hang_up).
+
+        An employee whose thread could not be started never hangs up, so the assign_* methods close
+        the call with on_hang_up when they raise before the thread started, and _finish_remaining_calls
+        does not wait for it. Once the thread started, only the thread hangs up.
+
+        Args:
+            assign (callable): One of the assign_* methods.
+            on_hang_up (callable): Callback closing the call.
+            *args: The arguments of assign before the callback.
+
+        Returns:
+            object: What assign returns.
+        """
+        self.outstanding_calls.start()
+        return assign(*args, on_hang_up)
+
+    def _find_free_fresher_index(self, idle_freshers):
+        """Takes a free fresher with find_free_fresher_index, a separate step so it can be timed."""
+        return find_free_fresher_index(idle_freshers)
+
+    def _fresher_hung_up(self, idle_freshers, idx):
+        """Hang-up callback of a fresher thread: frees the fresher and closes the call.
+
+        Args:
+            idle_freshers (IdleAgentIndex): Index of the idle freshers.
+            idx (int): Index of the fresher.
+        """
+        idle_freshers.release(idx)
+        self.outstanding_calls.finish()
+
     def _finish_remaining_calls(self, freshers, technical_lead, project_manager):
         """Waits for all remaining calls to finish by joining threads.
 
+        Returns as soon as the last call hangs up: the hang-up callbacks count the calls down
+        and notify the waiting thread, so there is no safety margin and no polling.
+
         Args:
             freshers (list): List of fresher instances.
             technical_lead (TechnicalLead): The technical lead instance.
             project_manager (ProjectManager): The project manager instance.
         """
-        # Safty time margin to finish up the remaining calls
-        time.sleep(self.min_max_call_duration[1]+10)
+        self.outstanding_calls.wait()
 
-        # Finish up the remaining calls by joining all threads
-        while True:
-            for fresher in freshers:
-                if not(fresher.is_alive()) and fresher.was_called_before:
-                    fresher.join(timeout=2)
-            if not(technical_lead.is_alive()) and technical_lead.was_called_before:
-                    technical_lead.join(timeout=2)
-            if not(project_manager.is_alive()) and project_manager.was_called_before:
-                    project_manager.join(timeout=2)
-
-            if not(technical_lead.is_alive()) and not(project_manager.is_alive()) and all([not(fresher.is_alive()) for fresher in freshers]):
-                break
-
-    def run_simulation(self):
-        """Runs the call center simulation."""
+        # The hang-up callback is the last step of a call, joining the started threads is immediate
+        for employee in freshers + [technical_lead, project_manager]:
+            if employee.was_called_before:
+                employee.join()
+
+    def _run_threaded(self):
+        """Runs the call waves in real time, every call being handled by its own employee thread."""
         freshers, technical_lead, project_manager = self._initialize_employees()
+        idle_freshers = IdleAgentIndex(self.number_of_freshers, self.fresher_selection_policy)
 
-        # Run the simulation
-        end_time = time.time() + self.run_time
+        fresher_names = [fresher.name for fresher in freshers]
 
-        # Exception handling
+        clock = self.clock
+
+        def publish_snapshot(final=False):
+            self._publish_snapshot(clock.time() - start_time, [
+                (FRESHER, fresher_names, idle_freshers.busy_flags()),
+                (TECHNICAL_LEAD, [technical_lead.name], [technical_lead.is_alive()]),
+                (PROJECT_MANAGER, [project_manager.name], [project_manager.is_alive()]),
+            ], final=final)
+
+        # Run the simulation
+        start_time = clock.time()
+        self.call_statistics.elapsed = lambda: clock.time() - start_time
+        end_time = start_time + self.run_time
         loop_number = 1
+        while clock.time() < end_time:
+            # Process call waves
+            technical_lead, project_manager = self._process_call_wave(loop_number, freshers, idle_freshers, technical_lead, project_manager)
+            if self.monitor is not None and self.monitor.due():
+                publish_snapshot()
+
+            # Wait for the next call wave
+            time_interval = self._draw_sleep_interval()
+            self.event_sink.next_wave(time_interval)
+
+            clock.sleep(time_interval)
+            loop_number += 1
+
+        self._finish_remaining_calls(freshers, technical_lead, project_manager)
+        if self.monitor is not None:
+            publish_snapshot(final=True)
+
+    def _run_event_driven(self, engine_state=None):
+        """Runs the call waves on a virtual clock instead of sleeping in real time.
+
+        Call waves and call completions are kept in a heap ordered by simulated time, so the
+        run only costs the dispatching work. Calls are routed by a SkillRouter over the
+        routing tiers, by default the freshers, the technical lead and the project manager;
+        a completion scheduled at the same instant as a wave frees its employee before the
+        wave is dispatched. With the default tiers the escalation and the statistics are the
+        same as in the threaded mode.
+
+        With a queue_capacity, a call that finds all lines busy waits in a CallQueue instead of
+        being dropped, and the next employee who hangs up answers it. A caller with a patience
+        abandons when it runs out before the call is answered.
+
+        With a checkpoint_path, the state of the engine is appended to the checkpoint file before
+        the first event of every checkpoint_interval simulated seconds.
+
+        With an arrival_process or call_detail_records, every arrival is a wave of a single call, and a
+        recorded call keeps its handle time whoever answers it.
+
+        With a shift_schedule, the next state change of every scheduled agent waits in the event heap.
+        It takes the agent out of or puts it back in the idle index of its tier, and an agent back on
+        shift or from a break answers the next waiting call.
+
+        With a site_link, the run is a site of a multi-site run: a call that would be dropped is
+        passed to another site instead, and at every synchronization event the site sends the calls
+        it passed on and receives the calls the other sites passed to it.
+
+        Args:
+            engine_state (dict): The "engine" entry of a checkpoint to continue from, None to start a run.
+        """
+        event_sink = self.event_sink
+        call_trace = self.call_trace
+        arrival_times = None
+        agent_transitions = self._agent_transitions()
+        if engine_state is None:
+            self.simulated_time = 0
+            # A scheduled agent is off shift until its first shift starts, it is left out of the router
+            unavailable = {}
+            for position, index in agent_transitions:
+                unavailable.setdefault(position, set()).add(index)
+            router = SkillRouter(self.routing_tiers, self.fresher_selection_policy, unavailable)
+            call_queue = CallQueue(self.queue_capacity, self.queue_discipline) if self.queue_capacity > 0 else None
+            call_ids = itertools.count()
+            sequence = itertools.count()
+            events = []
+            arrivals_consumed = 0
+            arrival_stream_state = None
+            if self.arrival_process is not None or self.call_detail_records is not None:
+                # Every arrival is a wave of a single call, carrying its recorded duration
+                arrival_stream_state = self.random_streams[ARRIVAL_STREAM].getstate()
+                arrival_times = self._arrivals()
+                arrival = next(arrival_times, None)
+                arrivals_consumed += 1
+                if arrival is not None and arrival[0] < self.run_time:
+                    heapq.heappush(events, (arrival[0], EVENT_CALL_WAVE, next(sequence), (1, arrival[1])))
+            elif self.run_time > 0:
+                heapq.heappush(events, (0, EVENT_CALL_WAVE, next(sequence), 1))
+            if self.site_link is not None:
+                heapq.heappush(events, (self.site_link.first_sync_time, EVENT_SITE_SYNC, next(sequence), None))
+            agent_states = {}
+            # Agents of each tier on shift or with a shift still to come
+            remaining_agents = [tier.size for tier in self.routing_tiers]
+            for (position, index), transitions in agent_transitions.items():
+                agent_states[position, index] = OFF_SHIFT
+                if transitions[0][0] < self.run_time:
+                    heapq.heappush(events, (transitions[0][0], EVENT_AGENT_STATE, next(sequence), (position, index, 0)))
+                else:
+                    remaining_agents[position] -= 1
+        else:
+            router = engine_state["router"]
+            call_queue = engine_state["call_queue"]
+            call_ids = itertools.count(engine_state["call_ids"])
+            sequence = itertools.count(engine_state["sequence"])
+            events = engine_state["events"]
+            arrivals_consumed = engine_state["arrivals_consumed"]
+            arrival_stream_state = engine_state["arrival_stream_state"]
+            agent_states = engine_state["agent_states"]
+            remaining_agents = engine_state["remaining_agents"]
+            if self.arrival_process is not None or self.call_detail_records is not None:
+                # Generators cannot be pickled: replay the consumed arrivals from the stream state of the start
+                self.random_streams[ARRIVAL_STREAM].setstate(arrival_stream_state)
+                arrival_times = self._arrivals()
+                for _ in itertools.islice(arrival_times, arrivals_consumed):
+                    pass
+        tiers = router.tiers
+        self.call_statistics.elapsed = lambda: self.simulated_time
+        monitor = self.monitor
+        site_link = self.site_link
+        overflow_calls = site_link.overflow_calls if site_link is not None else None
+
+        def publish_snapshot(final=False):
+            self._publish_snapshot(self.simulated_time, [
+                (tier.name, router.agent_names[position], router.idle_agents[position].busy_flags())
+                for position, tier in enumerate(tiers)], len(call_queue) if call_queue else 0, final, agent_states)
+
+        checkpoint_writer = None
+        next_checkpoint_time = float("inf")
+        if self.checkpoint_path is not None:
+            checkpoint_writer = CheckpointWriter(self.checkpoint_path, truncate=engine_state is None,
+                                                 records_written=self.call_statistics.record_lengths())
+            next_checkpoint_time = self.checkpoint_interval if engine_state is None else engine_state["next_checkpoint_time"]
+
+        def answer(now, wait_time, skills, loop_number, call_number, call_duration=None):
+            """Hands a call to the first eligible idle employee, returns False if none is idle.
+
+            The call lasts call_duration, drawn from the stream of the tier answering it when None.
+            """
+            position, index = router.acquire(skills)
+            if position < 0:
+                return False
+            tier_name = tiers[position].name
+            if call_duration is None:
+                call_duration = self._draw_call_duration(tier_name)
+            self._record_answered_call(tier_name, index, call_duration, wait_time)
+            if position > 0:
+                # Escalated past busy tiers, reported as in the threaded mode
+                event_sink.escalated(tier_name, None if position == 1 and tiers[0].name == FRESHER else tiers[position - 1].name)
+            event_sink.assigned(router.agent_names[position][index], call_duration)
+            if call_trace is not None:
+                call_trace.add(now - wait_time, loop_number, call_number, OUTCOME_ANSWERED, tier_name,
+                               router.agent_names[position][index], wait_time, call_duration, position)
+            heapq.heappush(events, (now + call_duration, EVENT_CALL_COMPLETED, next(sequence), (position, index)))
+            return True
+
+        def answer_waiting_call(now, position):
+            """Answers the first waiting call an employee of the tier can take, after one became idle."""
+            if not len(router.idle_agents[position]):
+                # Left at the end of the call
+                return
+            call = call_queue.get(now, tiers[position].skills)
+            if call is not None:
+                answer(now, now - call[1], call[4], call[2], call[3], call[6])
+
+        def drop(now, skills, loop_number, call_number, arrival_time=None):
+            """Loses a call that found all lines busy and could not wait, or still waiting at the end of the run."""
+            if arrival_time is None:
+                arrival_time = now
+            self.call_statistics.add_dropped_call(now - arrival_time)
+            event_sink.rejected(tiers[-1].name)
+            if call_trace is not None:
+                call_trace.add(arrival_time, loop_number, call_number, OUTCOME_DROPPED, wait_time=now - arrival_time,
+                               escalations=len(router.eligible_tiers(skills)))
+
+        def can_wait(skills):
+            """Returns whether a call that found all lines busy may wait in the queue.
+
+            A call no tier has the skills for, or whose tiers have no agent on shift or with a shift to
+            come, would wait forever, it is lost instead.
+            """
+            return call_queue is not None and not call_queue.is_full() and any(
+                remaining_agents[position] for position in router.eligible_tiers(skills))
+
+        def wait_in_queue(now, arrival_time, skills, loop_number, call_number, call_duration):
+            """Puts a call that found all lines busy in the queue, with its abandonment if callers are impatient."""
+            priority = self._draw_call_priority()
+            call = (next(call_ids), arrival_time, loop_number, call_number, skills, priority, call_duration)
+            call_queue.put(now, call, priority, skills)
+            event_sink.queued(loop_number, call_number, len(call_queue))
+            if self.patience is not None:
+                heapq.heappush(events, (now + self._draw_patience(), EVENT_CALL_ABANDONED, next(sequence), call[0]))
+
+        while events:
+            if events[0][0] >= next_checkpoint_time:
+                # Restart the counters at their next value, so the checkpoint holds it without consuming it
+                next_call_id, next_sequence = next(call_ids), next(sequence)
+                call_ids, sequence = itertools.count(next_call_id), itertools.count(next_sequence)
+                next_checkpoint_time = events[0][0] + self.checkpoint_interval
+                # The per call records only go to the file once, as the calls recorded since the last checkpoint
+                records = self.call_statistics.detach_records()
+                try:
+                    checkpoint_writer.write(self._checkpoint({
+                        "router": router, "call_queue": call_queue, "events": events, "call_ids": next_call_id,
+                        "sequence": next_sequence, "arrivals_consumed": arrivals_consumed,
+                        "arrival_stream_state": arrival_stream_state, "next_checkpoint_time": next_checkpoint_time,
+                        "agent_states": agent_states, "remaining_agents": remaining_agents,
+                    }), records)
+                finally:
+                    self.call_statistics.attach_records(records)
+            now, kind, _, payload = heapq.heappop(events)
+            self.simulated_time = now
+
+            if kind == EVENT_CALL_COMPLETED:
+                position, index = payload
+                router.release(position, index)
+                event_sink.hung_up(router.agent_names[position][index])
+                # The employee who hung up answers the next waiting call
+                if call_queue:
+                    answer_waiting_call(now, position)
+                continue
+
+            if kind == EVENT_AGENT_STATE:
+                position, index, transition_number = payload
+                transitions = agent_transitions[position, index]
+                state = transitions[transition_number][1]
+                agent_states[position, index] = state
+                router.idle_agents[position].set_available(index, state == AVAILABLE)
+                event_sink.availability_changed(router.agent_names[position][index], state)
+                transition_number += 1
+                if transition_number < len(transitions) and transitions[transition_number][0] < self.run_time:
+                    heapq.heappush(events, (transitions[transition_number][0], EVENT_AGENT_STATE, next(sequence),
+                                            (position, index, transition_number)))
+                elif state != AVAILABLE:
+                    # Gone for the rest of the run
+                    remaining_agents[position] -= 1
+                # An agent back at work answers the next waiting call
+                if state == AVAILABLE and call_queue:
+                    answer_waiting_call(now, position)
+                continue
+
+            if kind == EVENT_CALL_ABANDONED:
+                call = call_queue.remove(now, payload)
+                if call is not None:
+                    self.call_statistics.add_abandoned_call(now - call[1])
+                    event_sink.abandoned(call[2], call[3], now - call[1])
+                    if call_trace is not None:
+                        call_trace.add(call[1], call[2], call[3], OUTCOME_ABANDONED, wait_time=now - call[1],
+                                       escalations=len(router.eligible_tiers(call[4])))
+                continue
+
+            if kind == EVENT_OVERFLOW_CALL:
+                # A call another site could not answer, it is not passed on again
+                arrival_time, loop_number, call_number, skills, call_duration = payload
+                event_sink.call_arrived(loop_number, call_number)
+                if not answer(now, now - arrival_time, skills, loop_number, call_number, call_duration):
+                    if can_wait(skills):
+                        wait_in_queue(now, arrival_time, skills, loop_number, call_number, call_duration)
+                    else:
+                        drop(now, skills, loop_number, call_number)
+                continue
+
+            if kind == EVENT_SITE_SYNC:
+                # Trade the overflow calls of the window with the other sites
+                incoming_calls, next_sync_time = site_link.synchronize(now, events[0][0] if events else None)
+                for delivery_time, call in incoming_calls:
+                    heapq.heappush(events, (delivery_time, EVENT_OVERFLOW_CALL, next(sequence), call))
+                if next_sync_time is not None:
+                    heapq.heappush(events, (next_sync_time, EVENT_SITE_SYNC, next(sequence), None))
+                continue
+
+            if monitor is not None and monitor.due():
+                publish_snapshot()
+
+            # Process the call wave
+            if arrival_times is None:
+                loop_number, call_duration = payload, None
+                number_of_calls = self._draw_calls_per_wave()
+            else:
+                loop_number, call_duration = payload
+                number_of_calls = 1
+            event_sink.wave_arrived(loop_number, number_of_calls)
+            for call_number in range(1, number_of_calls + 1):
+                event_sink.call_arrived(loop_number, call_number)
+                skills = self._draw_call_skills()
+                if answer(now, 0, skills, loop_number, call_number, call_duration):
+                    continue
+                if not can_wait(skills):
+                    if overflow_calls is not None:
+                        # All lines are busy or no tier has the skills, another site gets the call
+                        overflow_calls.append((now, loop_number, call_number, skills, call_duration))
+                        event_sink.overflowed(loop_number, call_number)
+                        continue
+                    # All lines are busy, the call is lost
+                    drop(now, skills, loop_number, call_number)
+                    continue
+                wait_in_queue(now, now, skills, loop_number, call_number, call_duration)
+
+            # Schedule the next call wave
+            if arrival_times is None:
+                time_interval = self._draw_sleep_interval()
+                next_payload = loop_number + 1
+            else:
+                arrival = next(arrival_times, None)
+                arrivals_consumed += 1
+                if arrival is None:
+                    continue
+                if arrival[0] < now:
+                    raise ValueError("arrival times must be nondecreasing")
+                time_interval = arrival[0] - now
+                next_payload = (loop_number + 1, arrival[1])
+            event_sink.next_wave(time_interval)
+            if now + time_interval < self.run_time:
+                heapq.heappush(events, (now + time_interval, EVENT_CALL_WAVE, next(sequence), next_payload))
+
+        if checkpoint_writer is not None:
+            checkpoint_writer.close()
+        if call_queue is not None:
+            # Calls still waiting once every agent has left are lost when the call center closes
+            call = call_queue.get(self.simulated_time)
+            while call is not None:
+                drop(self.simulated_time, call[4], call[2], call[3], call[1])
+                call = call_queue.get(self.simulated_time)
+            call_queue.close(self.simulated_time)
+            self.call_statistics.add_queue_length_time(call_queue.length_time)
+        if monitor is not None:
+            publish_snapshot(final=True)
+
+    def _checkpoint(self, engine_state):
+        """Returns a checkpoint of the run: the parameters, the random streams, the statistics and the engine state."""
+        return {
+            "engine_version": ENGINE_VERSION,
+            "configuration": self._checkpoint_configuration(),
+            "random_streams": self.random_streams,
+            "call_statistics": self.call_statistics,
+            "simulated_time": self.simulated_time,
+            "engine": engine_state,
+        }
+
+    def _dispatch_pooled_call(self, freshers, idle_freshers, technical_lead, project_manager, pools):
+        """Hands a single call to the worker pool of the first free employee.
+
+        Args:
+            freshers (list): List of fresher records.
+            idle_freshers (IdleAgentIndex): Index of the idle freshers.
+            technical_lead (EmployeeState): The technical lead record.
+            project_manager (EmployeeState): The project manager record.
+            pools (dict): Worker pools mapped by role.
+        """
+        idx = self._find_free_fresher_index(idle_freshers)
+        on_hang_up = None
+        if idx > -1:
+            employee, role = freshers[idx], FRESHER
+            on_hang_up = functools.partial(idle_freshers.release, idx)
+        elif not technical_lead.busy:
+            employee, role = technical_lead, TECHNICAL_LEAD
+            self.event_sink.escalated(technical_lead.name)
+        elif not project_manager.busy:
+            employee, role = project_manager, PROJECT_MANAGER
+            self.event_sink.escalated(project_manager.name, technical_lead.name)
+        else:
+            self.call_statistics.add_dropped_call()
+            self.termination_message(project_manager)
+            return
+
+        employee.busy = True
+        call_duration = self._draw_call_duration(role)
+        self.event_sink.assigned(employee.name, call_duration)
+        if role == FRESHER:
+            self.call_statistics.add_fresher_call(idx, call_duration)
+        elif role == TECHNICAL_LEAD:
+            self.call_statistics.add_technical_lead_call(call_duration)
+        else:
+            self.call_statistics.add_project_manager_call(call_duration)
+        pools[role].submit(employee, call_duration, on_hang_up)
+
+    def _run_worker_pool(self):
+        """Runs the call waves in real time on persistent worker threads.
+
+        Each role has a pool with one worker per employee, started once and fed by a work
+        queue. The employees are EmployeeState records, so no thread is started per call.
+        """
+        freshers = [EmployeeState(f"fresher {i + 1}") for i in range(self.number_of_freshers)]
+        idle_freshers = IdleAgentIndex(self.number_of_freshers, self.fresher_selection_policy)
+        technical_lead = EmployeeState("technical lead")
+        project_manager = EmployeeState("project manager")
+        clock = self.clock
+        pools = {
+            FRESHER: WorkerPool(self.number_of_freshers, self.event_sink, clock),
+            TECHNICAL_LEAD: WorkerPool(1, self.event_sink, clock),
+            PROJECT_MANAGER: WorkerPool(1, self.event_sink, clock),
+        }
+
+        fresher_names = [fresher.name for fresher in freshers]
+
+        def publish_snapshot(final=False):
+            self._publish_snapshot(clock.time() - start_time, [
+                (FRESHER, fresher_names, idle_freshers.busy_flags()),
+                (TECHNICAL_LEAD, [technical_lead.name], [technical_lead.busy]),
+                (PROJECT_MANAGER, [project_manager.name], [project_manager.busy]),
+            ], final=final)
+
         try:
-            while True:
-                if time.time() >= end_time:
-                    break
-                # Process call waves
-                number_of_calls = random.randint(self.min_max_calls_per_wave[0], self.min_max_calls_per_wave[1])
-                print("\n%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%\n")
-                print(f"Incoming calls: {number_of_calls}, loop: {loop_number}")
-                print("----------------------------------------------")
-                # Process individual calls
+            start_time = clock.time()
+            self.call_statistics.elapsed = lambda: clock.time() - start_time
+            end_time = start_time + self.run_time
+            loop_number = 1
+            while clock.time() < end_time:
+                number_of_calls = self._draw_calls_per_wave()
+                self.event_sink.wave_arrived(loop_number, number_of_calls)
                 for call in range(number_of_calls):
-                    # Find indices of free freshers, -1 if none
-                    idx = find_free_fresher_index(freshers)
-                    print(f"Call {call + 1} is on top of the queue.")
-                    print("----------------------")
-
-                    if idx > -1:
-                        # If any of the freshers ia available then assign the call to that fresher
-                        # If the employee was in a call before then the thread should be re-initialized 
-                        self.assign_freshers(freshers, idx)
-                    else:
-                        # If all freshers are busy then assign the call to the technical lead
-                        if not technical_lead.is_alive():
-                            # If the employee was in a call before then the thread should be re-initialized 
-                            technical_lead = self.assign_technical_lead(technical_lead)
-                        else:
-                            # If the technical lead is busy then assign the call to the project manager
-                            if not project_manager.is_alive():
-                                # If the employee was in a call before then the thread should be re-initialized 
-                                project_manager = self.assign_project_manager(technical_lead, project_manager)
-                            else:
-                                self.termination_message(project_manager)
+                    self.event_sink.call_arrived(loop_number, call + 1)
+                    self._dispatch_pooled_call(freshers, idle_freshers, technical_lead, project_manager, pools)
+                if self.monitor is not None and self.monitor.due():
+                    publish_snapshot()
 
                 # Wait for the next call wave
-                time_interval = random.randint(self.min_max_sleep_interval[0], self.min_max_sleep_interval[1])
-                print(f"Waiting for {time_interval} seconds before initiating the next wave of calls.")
-                print("----------------------------------------------")
-
-                time.sleep(time_interval)
+                time_interval = self._draw_sleep_interval()
+                self.event_sink.next_wave(time_interval)
+                clock.sleep(time_interval)
                 loop_number += 1
 
-            
-            # Safty time margin to finish up the remaining calls
-            time.sleep(self.min_max_call_duration[1]+10)
-            
-            # Finish up the remaining calls by joining all threads
-            while True:
-                for fresher in freshers:
-                    if not(fresher.is_alive()) and fresher.was_called_before:
-                        fresher.join(timeout=2)
-                if not(technical_lead.is_alive()) and technical_lead.was_called_before:
-                        technical_lead.join(timeout=2)
-                if not(project_manager.is_alive()) and project_manager.was_called_before:
-                        project_manager.join(timeout=2)
-                
-                if not(technical_lead.is_alive()) and not(project_manager.is_alive()) and all(not(fresher.is_alive()) for fresher in freshers):
-                    break
+            # Finish up the remaining calls
+            for pool in pools.values():
+                pool.join()
+            if self.monitor is not None:
+                publish_snapshot(final=True)
+        finally:
+            for pool in pools.values():
+                pool.shutdown()
+
+    async def _handle_call_async(self, name, call_duration, on_hang_up):
+        """Coroutine handling a single call of the asyncio mode.
+
+        Args:
+            name (str): The name of the employee answering the call.
+            call_duration (int): Duration of the call.
+            on_hang_up (callable): Callback invoked when the call is over, even if the coroutine is cancelled or raises.
+        """
+        try:
+            await asyncio.sleep(self.clock.wall_seconds(call_duration))
+            self.event_sink.hung_up(name)
+        finally:
+            on_hang_up()
+
+    async def _run_asyncio(self):
+        """Runs the call waves in real time on a single asyncio event loop.
+
+        Every call is a coroutine awaiting its duration, so the number of concurrent calls is
+        not bounded by the OS thread limit. Freshers are tracked by an IdleAgentIndex and the
+        technical lead and project manager by busy flags, as in the event mode.
+        """
+        loop = asyncio.get_running_loop()
+        idle_freshers = IdleAgentIndex(self.number_of_freshers, self.fresher_selection_policy)
+        fresher_names = [f"fresher {i + 1}" for i in range(self.number_of_freshers)]
+        busy = {TECHNICAL_LEAD: False, PROJECT_MANAGER: False}
+        event_sink = self.event_sink
+        calls = set()
+
+        def hang_up(role):
+            busy[role] = False
+
+        def publish_snapshot(final=False):
+            self._publish_snapshot((loop.time() - start_time) * self.clock.speedup, [
+                (FRESHER, fresher_names, idle_freshers.busy_flags()),
+                (TECHNICAL_LEAD, [TECHNICAL_LEAD], [busy[TECHNICAL_LEAD]]),
+                (PROJECT_MANAGER, [PROJECT_MANAGER], [busy[PROJECT_MANAGER]]),
+            ], final=final)
+
+        start_time = loop.time()
+        self.call_statistics.elapsed = lambda: (loop.time() - start_time) * self.clock.speedup
+        end_time = start_time + self.clock.wall_seconds(self.run_time)
+        loop_number = 1
+        while loop.time() < end_time:
+            number_of_calls = self._draw_calls_per_wave()
+            event_sink.wave_arrived(loop_number, number_of_calls)
+            for call in range(number_of_calls):
+                event_sink.call_arrived(loop_number, call + 1)
+                idx = idle_freshers.acquire()
+                if idx > -1:
+                    call_duration = self._draw_call_duration(FRESHER)
+                    self.call_statistics.add_fresher_call(idx, call_duration)
+                    name = fresher_names[idx]
+                    on_hang_up = functools.partial(idle_freshers.release, idx)
+                elif not busy[TECHNICAL_LEAD]:
+                    busy[TECHNICAL_LEAD] = True
+                    call_duration = self._draw_call_duration(TECHNICAL_LEAD)
+                    self.call_statistics.add_technical_lead_call(call_duration)
+                    name = TECHNICAL_LEAD
+                    event_sink.escalated(TECHNICAL_LEAD)
+                    on_hang_up = functools.partial(hang_up, TECHNICAL_LEAD)
+                elif not busy[PROJECT_MANAGER]:
+                    busy[PROJECT_MANAGER] = True
+                    call_duration = self._draw_call_duration(PROJECT_MANAGER)
+                    self.call_statistics.add_project_manager_call(call_duration)
+                    name = PROJECT_MANAGER
+                    event_sink.escalated(PROJECT_MANAGER, TECHNICAL_LEAD)
+                    on_hang_up = functools.partial(hang_up, PROJECT_MANAGER)
+                else:
+                    # All lines are busy, the call is lost
+                    self.call_statistics.add_dropped_call()
+                    event_sink.rejected(PROJECT_MANAGER)
+                    continue
+                event_sink.assigned(name, call_duration)
+                call = asyncio.ensure_future(self._handle_call_async(name, call_duration, on_hang_up))
+                calls.add(call)
+                call.add_done_callback(calls.discard)
+            if self.monitor is not None and self.monitor.due():
+                publish_snapshot()
+
+            # Wait for the next call wave
+            time_interval = self._draw_sleep_interval()
+            event_sink.next_wave(time_interval)
+            await asyncio.sleep(self.clock.wall_seconds(time_interval))
+            loop_number += 1
+
+        # Finish up the remaining calls
+        if calls:
+            await asyncio.gather(*calls)
+        if self.monitor is not None:
+            publish_snapshot(final=True)
+
+    def _check_mode_options(self, mode):
+        """Refuses a mode, or parameters of set() that the mode does not model.
+
+        Args:
+            mode (str): One of SIMULATION_MODES.
+        """
+        if mode not in SIMULATION_MODES:
+            raise ValueError(f"mode must be one of {SIMULATION_MODES}")
+        # A zero interval never advances the virtual clock
+        if mode == "event" and self.run_time > 0 and self.min_max_sleep_interval[1] == 0 and self.arrival_process is None \
+                and self.call_detail_records is None:
+            raise ValueError("event mode requires a positive max sleep interval")
+        if mode in ("thread", "pool") and self.number_of_freshers > MAX_THREADED_FRESHERS:
+            raise ValueError(f"{mode} mode supports at most {MAX_THREADED_FRESHERS} freshers")
+        if mode == "event":
+            return
+        if self.queue_capacity > 0:
+            raise ValueError("the waiting queue is only modelled by the event mode")
+        if self.custom_routing:
+            raise ValueError("skill based routing is only modelled by the event mode")
+        if self.arrival_process is not None:
+            raise ValueError("arrival processes are only modelled by the event mode")
+        if self.call_detail_records is not None:
+            raise ValueError("call detail records are only replayed by the event mode")
+        if self.shift_schedule is not None:
+            raise ValueError("shift schedules are only followed by the event mode")
+        if self.call_trace is not None:
+            raise ValueError("the call trace is only written by the event mode")
+        if self.checkpoint_path is not None:
+            raise ValueError("checkpoints are only taken by the event mode")
+
+    def _abort(self):
+        """Logs the exception being handled and exits, the statistics of the run being incomplete."""
+        logging.error("Exception occurred during the call center simulation", exc_info=True)
+        print("An unexpected error occurred during the call center simulation. Please check the logs.")
+        sys.exit(1)
+
+    async def run_simulation_async(self):
+        """Runs the call center simulation on the running asyncio event loop.
+
+        Returns:
+            bool: True if the simulation finished.
+        """
+        self._check_mode_options("async")
+        # Every run starts the random streams over, a seeded run is reproducible
+        self.random_streams = self._create_random_streams()
+        try:
+            await self._run_asyncio()
+            self.event_sink.flush()
+
+            # Print call statistics
+            self.call_statistics.print_summary()
+
+        except Exception:
+            self._abort()
+        return True
+
+    def run_simulation(self, mode="thread"):
+        """Runs the call center simulation.
+
+        Args:
+            mode (str): "thread" handles every call on an employee thread in real time,
+                "event" replays the same call waves on a virtual clock and finishes as soon as
+                the events are processed, "pool" handles the calls in real time on persistent
+                worker threads instead of one thread per call, "async" handles every call as a
+                coroutine on an asyncio event loop (see run_simulation_async).
+
+        Returns:
+            bool: True if the simulation finished.
+        """
+        self._check_mode_options(mode)
+
+        # Every run starts the random streams over, a seeded run is reproducible
+        self.random_streams = self._create_random_streams()
+
+        # Exception handling
+        try:
+            if mode == "event":
+                self._run_event_driven()
+            elif mode == "pool":
+                self._run_worker_pool()
+            elif mode == "async":
+                asyncio.run(self._run_asyncio())
+            else:
+                self._run_threaded()
+            self.event_sink.flush()
+            if self.call_trace is not None:
+                self.call_trace.flush()
+
+            # Print call statistics
+            self.call_statistics.print_summary()
+
+        except Exception:
+            self._abort()
+        return True
+
+    def resume_simulation(self, checkpoint_path):
+        """Continues an event mode run from the last complete checkpoint of a file.
+
+        The parameters, random streams and statistics are restored from the checkpoint, so the run
+        ends with the statistics an uninterrupted run would have. The event sink and the call trace
+        of this simulation only receive the events after the checkpoint. Further checkpoints are
+        appended to the same file.
+
+        Args:
+            checkpoint_path (str): The checkpoint file written by a run with a checkpoint_path.
+
+        Returns:
+            bool: True if the simulation finished.
+        """
+        checkpoint, records = read_last_checkpoint(checkpoint_path)
+        if checkpoint["engine_version"] != ENGINE_VERSION:
+            raise ValueError(f"the checkpoint was written by engine version {checkpoint['engine_version']}, "
+                             f"this is version {ENGINE_VERSION}")
+        # The parameters go through set() and the mode checks again, a damaged checkpoint is refused here
+        configuration = dict(checkpoint["configuration"])
+        if not configuration.pop("custom_routing", True):
+            configuration["routing_tiers"] = None
+        try:
+            self.set(checkpoint_path=checkpoint_path, **configuration)
+        except TypeError as error:
+            raise ValueError(f"{checkpoint_path} does not hold the parameters of a run: {error}") from None
+        self._check_mode_options("event")
+        self.random_streams = checkpoint["random_streams"]
+        self.call_statistics = checkpoint["call_statistics"]
+        self.call_statistics.attach_records(records)
+        self.simulated_time = checkpoint["simulated_time"]
+
+        # Exception handling
+        try:
+            self._run_event_driven(checkpoint["engine"])
+            self.event_sink.flush()
+            if self.call_trace is not None:
+                self.call_trace.flush()
 
             # Print call statistics
             self.call_statistics.print_summary()
 
-        except Exception as e:
-            logging.error("Exception occurred during the call center simulation", exc_info=True)
-            print("An unexpected error occurred during the call center simulation. Please check the logs.")
-            sys.exit(1)
+        except Exception:
+            self._abort()
         return True
 
 def main():
@@ -439,6 +2642,29 @@ def main():
         parser.add_argument("max_sleep_interval", type=int, help="Maximum sleep interval between waves")
         parser.add_argument("min_call_duration", type=int, help="Minimum call duration")
         parser.add_argument("max_call_duration", type=int, help="Maximum call duration")
+        parser.add_argument("--fresher-selection-policy", choices=IDLE_POLICIES, default="first_free", help="How a free fresher is picked")
+        parser.add_argument("--seed", type=int, default=None, help="Seed of the random streams, for reproducible runs")
+        parser.add_argument("--quiet", action="store_true", help="Do not print the per call log")
+        parser.add_argument("--event-log", help="Write the call events to this CSV file instead of printing them")
+        parser.add_argument("--mode", choices=SIMULATION_MODES, default="thread", help="Run the calls on a thread per call, on a virtual clock, on a pool of worker threads or as asyncio coroutines")
+        parser.add_argument("--queue-capacity", type=int, default=0, help="Calls that may wait for a free employee (event mode)")
+        parser.add_argument("--patience", type=float, default=None, help="Mean seconds a queued caller waits before hanging up")
+        arrival_group = parser.add_mutually_exclusive_group()
+        arrival_group.add_argument("--arrival-rate", type=float, help="Poisson arrivals with this many calls per second instead of waves (event mode)")
+        arrival_group.add_argument("--rate-schedule", help="Poisson arrivals following the start_time,rate lines of this CSV file (event mode)")
+        arrival_group.add_argument("--arrival-replay", help="Replay the arrival times listed in this file (event mode)")
+        arrival_group.add_argument("--cdr", help="Replay the calls and handle times recorded in this CSV or .parquet file (event mode)")
+        parser.add_argument("--shifts", help="Follow the tier,agent,start,end[,break_start,break_end...] shifts of this CSV file (event mode)")
+        parser.add_argument("--distributions", action="store_true", help="Print the percentiles of the call durations and wait times, and the service level of every interval")
+        parser.add_argument("--distribution-interval", type=float, default=DEFAULT_DISTRIBUTION_INTERVAL, help="Seconds of the intervals of --distributions")
+        parser.add_argument("--metrics", help="Write the instrumentation metrics to this .json or Prometheus text file")
+        parser.add_argument("--trace", help="Write one row per call to this CSV or .parquet file (event mode)")
+        parser.add_argument("--queue-discipline", choices=QUEUE_DISCIPLINES, default="fifo", help="Order in which waiting calls are answered")
+        parser.add_argument("--checkpoint", help="Append checkpoints of the run to this file (event mode)")
+        parser.add_argument("--checkpoint-interval", type=float, default=DEFAULT_CHECKPOINT_INTERVAL, help="Simulated seconds between two checkpoints")
+        parser.add_argument("--resume", action="store_true", help="Continue from the last checkpoint of the --checkpoint file if it exists")
+        parser.add_argument("--speedup", type=float, default=1, help="Simulated seconds per real second in the thread, pool and async modes")
+        parser.add_argument("--monitor-port", type=int, help="Serve live snapshots on http://127.0.0.1:PORT/snapshot and /events, 0 picks a free port")
 
         # Parse the arguments
         args = parser.parse_args()
@@ -461,6 +2687,10 @@ def main():
             parser.error("min_sleep_interval cannot be greater than max_sleep_interval")
         if args.min_call_duration > args.max_call_duration:
             parser.error("min_call_duration cannot be greater than max_call_duration")
+        if args.resume and not args.checkpoint:
+            parser.error("--resume requires --checkpoint")
+        if args.speedup <= 0:
+            parser.error("speedup must be positive")
 
         # Set the parameters of the call center simulation
         number_of_freshers = args.number_of_freshers
@@ -473,14 +2703,55 @@ def main():
         max_call_duration = args.max_call_duration
 
         # Create and set up the call center simulation
-        call_center_simulation = CallCenterSimulation()
+        event_sink = None
+        if args.event_log:
+            event_sink = BatchedFileEventSink(args.event_log)
+        elif args.quiet:
+            event_sink = NullEventSink()
+        arrival_process = None
+        if args.arrival_rate is not None:
+            arrival_process = poisson_process(args.arrival_rate)
+        elif args.rate_schedule:
+            arrival_process = rate_schedule_process(args.rate_schedule)
+        elif args.arrival_replay:
+            arrival_process = replay_process(args.arrival_replay)
+        call_detail_records = call_detail_record_process(args.cdr) if args.cdr else None
+        call_trace = None
+        if args.trace:
+            call_trace = open_trace_writer(args.trace)
+        metrics = Metrics() if args.metrics else None
+        monitor = None
+        monitor_server = None
+        if args.monitor_port is not None:
+            monitor = SimulationMonitor()
+            monitor_server = MonitorServer(monitor, args.monitor_port).start()
+            print(f"Monitoring on {monitor_server.url}/snapshot and {monitor_server.url}/events")
+        call_center_simulation = CallCenterSimulation(event_sink, call_trace, metrics, monitor, Clock(args.speedup))
         min_max_calls_per_wave = (min_calls_per_wave, max_calls_per_wave)
         min_max_sleep_interval = (min_sleep_interval, max_sleep_interval)
         min_max_call_duration = (min_call_duration, max_call_duration)
-        call_center_simulation.set(number_of_freshers, run_time, min_max_calls_per_wave, min_max_sleep_interval, min_max_call_duration)
+        call_center_simulation.set(number_of_freshers, run_time, min_max_calls_per_wave, min_max_sleep_interval, min_max_call_duration, args.fresher_selection_policy, seed=args.seed,
+                                   queue_capacity=args.queue_capacity, patience=args.patience, queue_discipline=args.queue_discipline,
+                                   arrival_process=arrival_process, call_detail_records=call_detail_records,
+                                   shift_schedule=read_shift_schedule(args.shifts) if args.shifts else None,
+                                   checkpoint_path=args.checkpoint,
+                                   checkpoint_interval=args.checkpoint_interval, record_distributions=args.distributions,
+                                   distribution_interval=args.distribution_interval)
 
         # Run the simulation
-        call_center_simulation.run_simulation()
+        try:
+            if args.resume and os.path.exists(args.checkpoint):
+                call_center_simulation.resume_simulation(args.checkpoint)
+            else:
+                call_center_simulation.run_simulation(args.mode)
+        finally:
+            call_center_simulation.event_sink.close()
+            if call_trace is not None:
+                call_trace.close()
+            if metrics is not None:
+                metrics.write(args.metrics)
+            if monitor_server is not None:
+                monitor_server.close()
 
     except KeyboardInterrupt:
         print("\nSimulation interrupted.")
@@ -0,0 +1,118 @@
+"""Append-only checkpoint files of the event mode."""
+"""
+    Design:
+        - A checkpoint file is a sequence of frames. A frame is a 16 byte header, the big-endian lengths of its
+          two parts, followed by the pickled new records and the pickled checkpoint.
+        - Records are append-only sequences, such as the per call arrays of CallStatistics, which would make every
+          checkpoint grow with the run. A frame only holds what was appended to them since the previous frame, so
+          each record is written once, and the checkpoint part keeps the size of the state of the run: the agents,
+          the pending events, the queue and the intervals of the distributions.
+        - A frame is appended and flushed without rewriting the earlier ones.
+        - Reading concatenates the records of the complete frames and unpickles only the checkpoint of the last
+          one, the others being skipped with their length. A frame cut short by a crash is ignored.
+ """
+# Imports
+import os
+import pickle
+import struct
+
+# Lengths of the records and of the checkpoint of a frame
+FRAME_HEADER = struct.Struct(">QQ")
+
+
+class CheckpointWriter:
+    """Appends checkpoints to a file.
+
+    Attributes:
+        path (str): Path of the checkpoint file.
+        checkpoints_written (int): Number of checkpoints appended by this writer.
+        records_written (list): Length of each record already in the file.
+    """
+    def __init__(self, path, truncate=True, records_written=()):
+        self.path = path
+        self.checkpoints_written = 0
+        self.records_written = list(records_written)
+        if truncate:
+            self._file = open(path, "wb")
+        else:
+            # Drop a frame cut short by a crash, the new frames must follow a complete one
+            self._file = open(path, "r+b")
+            self._file.truncate(_complete_frames(self._file, read_records=False)[2])
+            self._file.seek(0, os.SEEK_END)
+
+    def write(self, checkpoint, records=()):
+        """Appends a checkpoint and what was appended to the records since the previous one.
+
+        Args:
+            checkpoint (object): The picklable checkpoint, not holding the records.
+            records (list): Append-only sequences supporting slices and extend, such as arrays, in the same
+                order at every checkpoint.
+        """
+        records_written = self.records_written + [0] * (len(records) - len(self.records_written))
+        new_records = [record[length:] for record, length in zip(records, records_written)]
+        records_data = pickle.dumps(new_records, protocol=pickle.HIGHEST_PROTOCOL)
+        data = pickle.dumps(checkpoint, protocol=pickle.HIGHEST_PROTOCOL)
+        self._file.write(FRAME_HEADER.pack(len(records_data), len(data)))
+        self._file.write(records_data)
+        self._file.write(data)
+        self._file.flush()
+        self.records_written = [len(record) for record in records]
+        self.checkpoints_written += 1
+
+    def close(self):
+        """Closes the file."""
+        self._file.close()
+
+
+def _complete_frames(file, read_records=True):
+    """Walks the complete frames of a checkpoint file.
+
+    Args:
+        file (file): The checkpoint file, opened for reading.
+        read_records (bool): Whether to unpickle and concatenate the records.
+
+    Returns:
+        tuple: The records, the offset and length of the checkpoint of the last complete frame (-1 and 0
+            without complete frame), and the offset of the end of the last complete frame.
+    """
+    file_size = file.seek(0, os.SEEK_END)
+    records = []
+    checkpoint_offset, checkpoint_length = -1, 0
+    offset = 0
+    while True:
+        file.seek(offset)
+        header = file.read(FRAME_HEADER.size)
+        if len(header) < FRAME_HEADER.size:
+            break
+        records_length, frame_checkpoint_length = FRAME_HEADER.unpack(header)
+        end = offset + FRAME_HEADER.size + records_length + frame_checkpoint_length
+        if end > file_size:
+            break
+        if read_records:
+            for position, new_record in enumerate(pickle.loads(file.read(records_length))):
+                if position < len(records):
+                    records[position].extend(new_record)
+                else:
+                    records.append(new_record)
+        checkpoint_offset, checkpoint_length = end - frame_checkpoint_length, frame_checkpoint_length
+        offset = end
+    return records, (checkpoint_offset, checkpoint_length), offset
+
+
+def read_last_checkpoint(path):
+    """Returns the last complete checkpoint of a file and its records, only unpickling that checkpoint.
+
+    Args:
+        path (str): Path of the checkpoint file.
+
+    Returns:
+        tuple: The checkpoint, and the records as written up to it.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"no checkpoint file at {path}")
+    with open(path, "rb") as file:
+        records, (checkpoint_offset, checkpoint_length), _ = _complete_frames(file)
+        if checkpoint_offset < 0:
+            raise ValueError(f"{path} holds no complete checkpoint")
+        file.seek(checkpoint_offset)
+        return pickle.loads(file.read(checkpoint_length)), records
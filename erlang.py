@@ -0,0 +1,193 @@
+"""Analytic Erlang B/C estimates of the call center, answering capacity questions without simulating."""
+"""
+    Design:
+        - The parameters of CallCenterSimulation.set give the arrival rate (mean calls per wave over the
+          mean interval between waves) and the mean call duration, hence the offered load in Erlangs.
+        - A call is lost only when the freshers, the technical lead and the project manager are all busy,
+          so the call center is a loss system of number_of_freshers + 2 servers: Erlang B gives the share of
+          calls finding all lines busy, Erlang C the share that would wait and the mean wait with a queue.
+        - Erlang B decreases with the number of servers, so the minimum staffing is bracketed by doubling
+          and found by bisection.
+        - The formulas assume Poisson arrivals. The waves of the simulator are burstier, so the simulated
+          blocking is higher; cross_check runs the event mode to measure the gap.
+ """
+# Imports
+import os
+import argparse
+import contextlib
+from call_center_simulation import CallCenterSimulation, NullEventSink, MAX_FRESHERS
+
+# Overflow employees behind the freshers: the technical lead and the project manager
+OVERFLOW_SERVERS = 2
+
+
+def erlang_b(servers, offered_load):
+    """Returns the probability that a call finds all servers busy in an Erlang loss system.
+
+    Uses the recursion B(n) = A B(n - 1) / (n + A B(n - 1)), stable for any number of servers.
+
+    Args:
+        servers (int): Number of servers.
+        offered_load (float): Offered load in Erlangs.
+
+    Returns:
+        float: The blocking probability.
+    """
+    if servers < 0 or offered_load < 0:
+        raise ValueError("servers and offered_load must be non-negative")
+    blocking = 1.0
+    for server in range(1, servers + 1):
+        blocking = offered_load * blocking / (server + offered_load * blocking)
+    return blocking
+
+
+def erlang_c(servers, offered_load):
+    """Returns the probability that a call waits in an Erlang delay system with an unbounded queue.
+
+    Args:
+        servers (int): Number of servers.
+        offered_load (float): Offered load in Erlangs.
+
+    Returns:
+        float: The waiting probability, 1 when the load is not below the number of servers.
+    """
+    if offered_load >= servers:
+        return 1.0
+    blocking = erlang_b(servers, offered_load)
+    return servers * blocking / (servers - offered_load * (1 - blocking))
+
+
+def average_speed_of_answer(servers, offered_load, mean_call_duration):
+    """Returns the mean wait of the calls of an Erlang delay system.
+
+    Args:
+        servers (int): Number of servers.
+        offered_load (float): Offered load in Erlangs.
+        mean_call_duration (float): Mean call duration in seconds.
+
+    Returns:
+        float: The mean wait in seconds, infinite when the load is not below the number of servers.
+    """
+    if offered_load >= servers:
+        return float("inf")
+    return erlang_c(servers, offered_load) * mean_call_duration / (servers - offered_load)
+
+
+def offered_load(call_center_simulation):
+    """Returns the traffic of a configured simulation.
+
+    Args:
+        call_center_simulation (CallCenterSimulation): Simulation whose parameters were given with set().
+
+    Returns:
+        tuple: The arrival rate in calls per second, the mean call duration in seconds and the offered
+            load in Erlangs.
+    """
+    mean_interval = sum(call_center_simulation.min_max_sleep_interval) / 2
+    if mean_interval <= 0:
+        raise ValueError("the analytic estimate requires a positive mean sleep interval")
+    arrival_rate = sum(call_center_simulation.min_max_calls_per_wave) / 2 / mean_interval
+    mean_call_duration = sum(call_center_simulation.min_max_call_duration) / 2
+    return arrival_rate, mean_call_duration, arrival_rate * mean_call_duration
+
+
+def estimate(call_center_simulation):
+    """Returns the Erlang estimates of a configured simulation.
+
+    Args:
+        call_center_simulation (CallCenterSimulation): Simulation whose parameters were given with set().
+
+    Returns:
+        dict: The 'arrival_rate', 'mean_call_duration', 'offered_load', 'servers', the 'blocking_probability'
+            (Erlang B, the share of dropped calls), the 'waiting_probability' (Erlang C) and the
+            'average_speed_of_answer' the calls would have with an unbounded queue.
+    """
+    arrival_rate, mean_call_duration, load = offered_load(call_center_simulation)
+    servers = call_center_simulation.number_of_freshers + OVERFLOW_SERVERS
+    return {
+        'arrival_rate': arrival_rate,
+        'mean_call_duration': mean_call_duration,
+        'offered_load': load,
+        'servers': servers,
+        'blocking_probability': erlang_b(servers, load),
+        'waiting_probability': erlang_c(servers, load),
+        'average_speed_of_answer': average_speed_of_answer(servers, load, mean_call_duration),
+    }
+
+
+def minimum_freshers(call_center_simulation, target_blocking=0.01, max_freshers=MAX_FRESHERS):
+    """Returns the fewest freshers keeping the share of dropped calls at or below a target.
+
+    Args:
+        call_center_simulation (CallCenterSimulation): Simulation whose traffic parameters were given with set(),
+            its number of freshers is ignored.
+        target_blocking (float): Highest acceptable blocking probability.
+        max_freshers (int): Largest staffing searched.
+
+    Returns:
+        int: The minimum number of freshers.
+    """
+    if not 0 < target_blocking <= 1:
+        raise ValueError("target_blocking must be in (0, 1]")
+    load = offered_load(call_center_simulation)[2]
+    # Double the staffing until it is enough, then bisect between the last two staffings
+    low, high = 0, 1
+    while erlang_b(high + OVERFLOW_SERVERS, load) > target_blocking:
+        if high >= max_freshers:
+            raise ValueError(f"more than {max_freshers} freshers are needed")
+        low, high = high + 1, min(high * 2, max_freshers)
+    while low < high:
+        middle = (low + high) // 2
+        if erlang_b(middle + OVERFLOW_SERVERS, load) <= target_blocking:
+            high = middle
+        else:
+            low = middle + 1
+    return low
+
+
+def cross_check(call_center_simulation, seed=0):
+    """Compares the Erlang B blocking with the share of dropped calls of an event mode run.
+
+    Args:
+        call_center_simulation (CallCenterSimulation): Simulation whose parameters were given with set().
+        seed (int): Seed of the simulated run.
+
+    Returns:
+        tuple: The analytic blocking probability and the simulated share of dropped calls.
+    """
+    simulation = CallCenterSimulation(NullEventSink())
+    simulation.set(call_center_simulation.number_of_freshers, call_center_simulation.run_time,
+                   call_center_simulation.min_max_calls_per_wave, call_center_simulation.min_max_sleep_interval,
+                   call_center_simulation.min_max_call_duration, seed=seed)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        simulation.run_simulation("event")
+    call_statistics = simulation.call_statistics
+    total_calls = call_statistics.answered_calls() + call_statistics.dropped_calls
+    simulated_blocking = call_statistics.dropped_calls / total_calls if total_calls else 0.0
+    return estimate(call_center_simulation)['blocking_probability'], simulated_blocking
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Call Center Erlang Estimates")
+    parser.add_argument("number_of_freshers", type=int, help="Number of freshers in the call center")
+    parser.add_argument("min_calls_per_wave", type=int, help="Minimum number of calls per wave")
+    parser.add_argument("max_calls_per_wave", type=int, help="Maximum number of calls per wave")
+    parser.add_argument("min_sleep_interval", type=int, help="Minimum sleep interval between waves")
+    parser.add_argument("max_sleep_interval", type=int, help="Maximum sleep interval between waves")
+    parser.add_argument("min_call_duration", type=int, help="Minimum call duration")
+    parser.add_argument("max_call_duration", type=int, help="Maximum call duration")
+    parser.add_argument("--target", type=float, default=0.01, help="Acceptable share of dropped calls")
+    parser.add_argument("--cross-check", type=int, metavar="RUN_TIME", help="Also simulate RUN_TIME seconds in the event mode")
+    args = parser.parse_args()
+
+    call_center_simulation = CallCenterSimulation(NullEventSink())
+    call_center_simulation.set(args.number_of_freshers, args.cross_check or 0,
+                               (args.min_calls_per_wave, args.max_calls_per_wave),
+                               (args.min_sleep_interval, args.max_sleep_interval),
+                               (args.min_call_duration, args.max_call_duration))
+    for key, value in estimate(call_center_simulation).items():
+        print(f"{key}: {value:.6g}")
+    print(f"minimum_freshers for {args.target:.2%} dropped calls: {minimum_freshers(call_center_simulation, args.target)}")
+    if args.cross_check:
+        analytic_blocking, simulated_blocking = cross_check(call_center_simulation)
+        print(f"cross check: analytic {analytic_blocking:.4f}, simulated {simulated_blocking:.4f}")
@@ -0,0 +1,136 @@
+"""Streaming histograms giving percentiles of call durations and wait times in bounded memory."""
+"""
+    Design:
+        - Values are counted in log-linear buckets, as in an HDR histogram: a value is converted to integer
+          ticks of resolution seconds, and the ticks beyond the first precision_bits bits are dropped, so
+          the bucket of a value is found with a shift in O(1) and its relative error is below
+          2 ** (1 - precision_bits).
+        - The counts are a dict keyed by the lower bound of each bucket, holding only the buckets in use.
+          Their number grows with the logarithm of the largest value, not with the number of values.
+        - Two histograms of the same precision are merged by adding their counts, so the histograms of
+          several threads or replications combine exactly.
+ """
+# Imports
+import math
+
+# Default precision: 11 bits, a relative error below 0.1%
+DEFAULT_PRECISION_BITS = 11
+# Default resolution in seconds, values below it count as 0
+DEFAULT_RESOLUTION = 0.001
+
+
+class StreamingHistogram:
+    """Counts of non-negative values in log-linear buckets.
+
+    Attributes:
+        precision_bits (int): Significant bits kept of the ticks of a value.
+        resolution (float): Seconds per tick.
+        counts (dict): Number of values in each bucket, mapped by the lower bound of the bucket in ticks.
+        count (int): Number of values added.
+        total (float): Sum of the values added.
+        minimum (float): Smallest value added, inf when empty.
+        maximum (float): Largest value added, 0 when empty.
+    """
+    __slots__ = ('precision_bits', 'resolution', 'counts', 'count', 'total', 'minimum', 'maximum', '_ticks_per_unit')
+
+    def __init__(self, precision_bits=DEFAULT_PRECISION_BITS, resolution=DEFAULT_RESOLUTION):
+        if precision_bits < 1:
+            raise ValueError("precision_bits must be at least 1")
+        if not resolution > 0:
+            raise ValueError("resolution must be positive")
+        self.precision_bits = precision_bits
+        self.resolution = resolution
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.minimum = float("inf")
+        self.maximum = 0
+        self._ticks_per_unit = 1 / resolution
+
+    def __len__(self):
+        return self.count
+
+    def _bucket(self, value):
+        """Returns the lower bound in ticks of the bucket of a value."""
+        ticks = int(value * self._ticks_per_unit)
+        shift = ticks.bit_length() - self.precision_bits
+        if shift > 0:
+            ticks = ticks >> shift << shift
+        return ticks
+
+    def add(self, value):
+        """Counts a value.
+
+        Args:
+            value (float): The value, negative values counting as 0.
+        """
+        if value < 0:
+            value = 0
+        # _bucket inlined, add is called for every call
+        bucket = int(value * self._ticks_per_unit)
+        shift = bucket.bit_length() - self.precision_bits
+        if shift > 0:
+            bucket = bucket >> shift << shift
+        counts = self.counts
+        counts[bucket] = counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total += value
+        if value < self.minimum:
+            self.minimum = value
+        if value > self.maximum:
+            self.maximum = value
+
+    def merge(self, other):
+        """Adds the values of another histogram of the same precision and resolution.
+
+        Args:
+            other (StreamingHistogram): The histogram to add, left unchanged.
+
+        Returns:
+            StreamingHistogram: This histogram.
+        """
+        if (other.precision_bits, other.resolution) != (self.precision_bits, self.resolution):
+            raise ValueError("only histograms of the same precision and resolution can be merged")
+        counts = self.counts
+        for bucket, count in other.counts.items():
+            counts[bucket] = counts.get(bucket, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        return self
+
+    def mean(self):
+        """Returns the mean of the values, 0 when empty."""
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percentile):
+        """Returns a percentile of the values, within the precision of the buckets.
+
+        Args:
+            percentile (float): Percentile between 0 and 100.
+
+        Returns:
+            float: The middle of the bucket holding the percentile, kept between the smallest and the
+                largest value, which is returned for the last rank. 0 when empty.
+        """
+        if not 0 <= percentile <= 100:
+            raise ValueError("percentile must be between 0 and 100")
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * percentile / 100))
+        if rank >= self.count:
+            return self.maximum
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                width = 1 << max(bucket.bit_length() - self.precision_bits, 0)
+                value = (bucket + (width - 1) / 2) * self.resolution
+                return min(max(value, self.minimum), self.maximum)
+        return self.maximum
+
+    def count_at_most(self, value):
+        """Returns the number of values not above a value, within the precision of the buckets."""
+        bucket = self._bucket(max(value, 0))
+        return sum(count for lower_bound, count in self.counts.items() if lower_bound <= bucket)
@@ -0,0 +1,222 @@
+"""Optional instrumentation of the call center simulation: phase timers, lock contention and thread counts."""
+"""
+    Design:
+        - A Metrics registry holds histograms with fixed buckets and gauges, exported as a JSON snapshot or in
+          the Prometheus text format.
+        - Nothing is instrumented by default. When a simulation is given a Metrics, it replaces its lock and the
+          locks of the employees it starts by InstrumentedLock wrappers, and its dispatch methods and event sink
+          by timed wrappers, so a simulation without metrics runs the plain code.
+ """
+# Imports
+import json
+import time
+import bisect
+import threading
+from threading import Lock
+
+# Upper bounds in seconds of the histogram buckets, the last one catches the rest
+HISTOGRAM_BUCKETS = (1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 1e-2, 5e-2, 0.1, 0.5, 1.0, 5.0, float("inf"))
+
+# Prefix of the exported metric names
+METRIC_PREFIX = "call_center_"
+
+
+class Histogram:
+    """Counts of observed durations per bucket, with their count and sum.
+
+    Attributes:
+        bucket_counts (list): Observations per bucket of HISTOGRAM_BUCKETS, not cumulative.
+        count (int): Number of observations.
+        sum (float): Sum of the observations in seconds.
+    """
+    def __init__(self):
+        self.bucket_counts = [0] * len(HISTOGRAM_BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = Lock()
+
+    def observe(self, seconds):
+        """Adds an observation.
+
+        Args:
+            seconds (float): The observed duration.
+        """
+        bucket = bisect.bisect_left(HISTOGRAM_BUCKETS, seconds)
+        with self._lock:
+            self.bucket_counts[bucket] += 1
+            self.count += 1
+            self.sum += seconds
+
+
+class Metrics:
+    """Registry of the histograms and gauges of a simulation.
+
+    Histograms and gauges are identified by a name and a tuple of (label, value) pairs.
+    """
+    def __init__(self):
+        self._histograms = {}
+        self._gauges = {}
+        self._lock = Lock()
+
+    def histogram(self, name, **labels):
+        """Returns the histogram of a name and labels, created on first use."""
+        key = (name, tuple(sorted(labels.items())))
+        try:
+            return self._histograms[key]
+        except KeyError:
+            with self._lock:
+                return self._histograms.setdefault(key, Histogram())
+
+    def set_gauge(self, name, value, **labels):
+        """Sets a gauge to value."""
+        self._gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def max_gauge(self, name, value, **labels):
+        """Raises a gauge to value if it is higher, for peaks."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = max(self._gauges.get(key, value), value)
+
+    def timed(self, phase, function):
+        """Wraps a function so its calls are observed by the phase_seconds histogram of phase.
+
+        Args:
+            phase (str): Label of the phase.
+            function (callable): The function to time.
+
+        Returns:
+            callable: The timed function.
+        """
+        histogram = self.histogram("phase_seconds", phase=phase)
+
+        def timed_function(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return timed_function
+
+    def sample_threads(self):
+        """Records the number of live threads and its peak."""
+        active_threads = threading.active_count()
+        self.set_gauge("threads", active_threads)
+        self.max_gauge("threads_peak", active_threads)
+
+    def snapshot(self):
+        """Returns the metrics as plain data.
+
+        Returns:
+            dict: "histograms" and "gauges" lists of dicts with the "name", the "labels" and the values,
+                the histogram buckets being cumulative counts keyed by their upper bound.
+        """
+        self.sample_threads()
+        histograms = []
+        for (name, labels), histogram in sorted(self._histograms.items()):
+            cumulative_count = 0
+            buckets = {}
+            for bound, bucket_count in zip(HISTOGRAM_BUCKETS, histogram.bucket_counts):
+                cumulative_count += bucket_count
+                buckets["+Inf" if bound == float("inf") else repr(bound)] = cumulative_count
+            histograms.append({"name": name, "labels": dict(labels), "count": histogram.count,
+                               "sum": histogram.sum, "buckets": buckets})
+        gauges = [{"name": name, "labels": dict(labels), "value": value}
+                  for (name, labels), value in sorted(self._gauges.items())]
+        return {"histograms": histograms, "gauges": gauges}
+
+    def to_prometheus(self):
+        """Returns the metrics in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+        typed_names = set()
+
+        def label_text(labels, **extra):
+            pairs = list(labels.items()) + list(extra.items())
+            return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}" if pairs else ""
+
+        for histogram in snapshot["histograms"]:
+            name = METRIC_PREFIX + histogram["name"]
+            if name not in typed_names:
+                lines.append(f"# TYPE {name} histogram")
+                typed_names.add(name)
+            for bound, cumulative_count in histogram["buckets"].items():
+                lines.append(f'{name}_bucket{label_text(histogram["labels"], le=bound)} {cumulative_count}')
+            lines.append(f'{name}_sum{label_text(histogram["labels"])} {histogram["sum"]}')
+            lines.append(f'{name}_count{label_text(histogram["labels"])} {histogram["count"]}')
+        for gauge in snapshot["gauges"]:
+            name = METRIC_PREFIX + gauge["name"]
+            if name not in typed_names:
+                lines.append(f"# TYPE {name} gauge")
+                typed_names.add(name)
+            lines.append(f'{name}{label_text(gauge["labels"])} {gauge["value"]}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Writes the metrics to path, as a JSON snapshot for a ".json" path, in the Prometheus text format otherwise."""
+        with open(path, "w") as file:
+            if path.endswith(".json"):
+                json.dump(self.snapshot(), file, indent=2)
+            else:
+                file.write(self.to_prometheus())
+
+
+class InstrumentedLock:
+    """Lock wrapper observing the time spent waiting for the lock and holding it.
+
+    Attributes:
+        name (str): Label of the lock in the lock_wait_seconds and lock_hold_seconds histograms.
+    """
+    def __init__(self, lock, metrics, name):
+        self.name = name
+        self._lock = lock
+        self._wait = metrics.histogram("lock_wait_seconds", lock=name)
+        self._hold = metrics.histogram("lock_hold_seconds", lock=name)
+        self._acquired_at = 0.0
+
+    def acquire(self, blocking=True, timeout=-1):
+        start = time.perf_counter()
+        acquired = self._lock.acquire(blocking, timeout)
+        if acquired:
+            # Only the holder writes the acquisition time
+            self._acquired_at = time.perf_counter()
+            self._wait.observe(self._acquired_at - start)
+        return acquired
+
+    def release(self):
+        held = time.perf_counter() - self._acquired_at
+        self._lock.release()
+        self._hold.observe(held)
+
+    def locked(self):
+        return self._lock.locked()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class TimedEventSink:
+    """Event sink wrapper timing every event method of the wrapped sink in the "event_sink" phase.
+
+    Other attributes, such as the events of a BufferedEventSink, are read from the wrapped sink.
+    """
+    def __init__(self, event_sink, metrics):
+        self.event_sink = event_sink
+        self._histogram = metrics.histogram("phase_seconds", phase="event_sink")
+
+    def __getattr__(self, name):
+        attribute = getattr(self.event_sink, name)
+        if not callable(attribute) or name in ("flush", "close"):
+            return attribute
+        histogram = self._histogram
+
+        def timed_method(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return attribute(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return timed_method
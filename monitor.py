@@ -0,0 +1,150 @@
+"""Live read-only monitoring of a running call center simulation over HTTP and server-sent events."""
+"""
+    Design:
+        - The dispatching thread of the simulation publishes snapshots of the agent states, the queue length
+          and the running CallStatistics, at most every publish_interval seconds of wall clock time.
+        - A snapshot is a new dict that is never modified once published, and publishing it only replaces the
+          monitor's reference (copy-on-write). Readers take no lock, so they never slow down the dispatch.
+        - MonitorServer serves the latest snapshot as JSON on /snapshot and streams every new one on /events
+          (server-sent events) from a stdlib ThreadingHTTPServer bound to a loopback address.
+ """
+# Imports
+import json
+import time
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Addresses the server may listen on, the monitor is local only
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "::1")
+
+
+class SimulationMonitor:
+    """Holds the latest snapshot published by a running simulation.
+
+    Attributes:
+        publish_interval (float): Minimum wall clock seconds between two published snapshots.
+        snapshot (dict): The latest snapshot, None before the first one. Never modified once published.
+        finished (bool): True once the simulation published its final snapshot.
+    """
+    def __init__(self, publish_interval=0.5):
+        if publish_interval < 0:
+            raise ValueError("publish_interval must be non-negative")
+        self.publish_interval = publish_interval
+        self.snapshot = None
+        self.finished = False
+        self._sequence = 0
+        self._next_publish_time = 0.0
+
+    def due(self):
+        """Returns True if the publish interval has elapsed since the last snapshot."""
+        return time.monotonic() >= self._next_publish_time
+
+    def publish(self, snapshot, final=False):
+        """Publishes a snapshot, replacing the previous one.
+
+        Args:
+            snapshot (dict): The new snapshot, which the caller must not modify afterwards.
+            final (bool): Whether this is the last snapshot of the run.
+        """
+        self._sequence += 1
+        snapshot["sequence"] = self._sequence
+        snapshot["finished"] = final
+        self._next_publish_time = time.monotonic() + self.publish_interval
+        # A single reference assignment, readers see either the old or the new snapshot
+        self.snapshot = snapshot
+        if final:
+            self.finished = True
+
+
+class _MonitorRequestHandler(BaseHTTPRequestHandler):
+    """Serves the snapshots of the monitor of its server."""
+
+    def log_message(self, format, *args):
+        # The simulation owns the console
+        pass
+
+    def do_GET(self):
+        if self.path == "/snapshot":
+            self._send_snapshot()
+        elif self.path == "/events":
+            self._stream_snapshots()
+        else:
+            self.send_error(404, "unknown path, use /snapshot or /events")
+
+    def _send_snapshot(self):
+        snapshot = self.server.monitor.snapshot
+        if snapshot is None:
+            self.send_error(503, "no snapshot published yet")
+            return
+        body = json.dumps(snapshot).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream_snapshots(self):
+        monitor = self.server.monitor
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        sent_sequence = 0
+        try:
+            while True:
+                # Read the closing flag first, so the final snapshot is sent before the server stops
+                closing = self.server.closing
+                snapshot = monitor.snapshot
+                if snapshot is not None and snapshot["sequence"] != sent_sequence:
+                    sent_sequence = snapshot["sequence"]
+                    self.wfile.write(f"event: snapshot\ndata: {json.dumps(snapshot)}\n\n".encode())
+                    self.wfile.flush()
+                    if snapshot["finished"]:
+                        self.wfile.write(b"event: end\ndata: {}\n\n")
+                        return
+                if closing:
+                    return
+                time.sleep(self.server.poll_interval)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client went away
+            return
+
+
+class MonitorServer(ThreadingHTTPServer):
+    """HTTP server of the snapshots of a SimulationMonitor, run on a daemon thread.
+
+    Closing the server waits for the open event streams to send the latest snapshot.
+
+    Attributes:
+        monitor (SimulationMonitor): The monitor whose snapshots are served.
+        poll_interval (float): Seconds between two checks for a new snapshot of an event stream, and for a shutdown.
+        url (str): Base URL of the server.
+    """
+    block_on_close = True
+
+    def __init__(self, monitor, port=0, host="127.0.0.1", poll_interval=0.1):
+        if host not in LOOPBACK_HOSTS:
+            raise ValueError(f"the monitor only listens on a loopback address, one of {LOOPBACK_HOSTS}")
+        if host == "::1":
+            self.address_family = socket.AF_INET6
+        super().__init__((host, port), _MonitorRequestHandler)
+        self.monitor = monitor
+        self.poll_interval = poll_interval
+        self.closing = False
+        self.url = f"http://{'[::1]' if host == '::1' else host}:{self.server_address[1]}"
+        self._thread = None
+
+    def start(self):
+        """Starts serving on a daemon thread."""
+        self._thread = threading.Thread(target=self.serve_forever, args=(self.poll_interval,), name="monitor-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        """Stops serving, ends the open event streams and waits for their threads."""
+        self.closing = True
+        if self._thread is not None:
+            self.shutdown()
+            self._thread.join()
+        self.server_close()
@@ -0,0 +1,116 @@
+"""Vectorized Monte Carlo runs of the call center simulation using NumPy."""
+"""
+    Design:
+        - All replications of a configuration are simulated in lockstep, one call wave at a time.
+        - The wave sizes, the gaps between waves and the call durations of a wave are drawn for every replication at once.
+        - Each replication keeps the time at which each fresher, the technical lead and the project manager hang up.
+        - The calls of a wave arrive together, so the free freshers take the first calls (lowest index first),
+          the technical lead and the project manager take one overflow call each and the rest are dropped.
+        - The results are the figures of CallStatistics, as arrays with one entry per replication.
+ """
+# Imports
+import numpy as np
+
+
+class MonteCarloResult:
+    """Per replication call statistics of a Monte Carlo run.
+
+    Attributes:
+        fresher_counter (ndarray): Calls answered by each fresher, shape (replications, freshers).
+        fresher_call_duration (ndarray): Seconds on the phone of each fresher, shape (replications, freshers).
+        technical_lead_counter (ndarray): Calls answered by the technical lead, shape (replications,).
+        technical_lead_call_duration (ndarray): Seconds on the phone of the technical lead, shape (replications,).
+        project_manager_counter (ndarray): Calls answered by the project manager, shape (replications,).
+        project_manager_call_duration (ndarray): Seconds on the phone of the project manager, shape (replications,).
+        dropped_calls (ndarray): Calls that found all lines busy, shape (replications,).
+    """
+    def __init__(self, number_of_replications, number_of_freshers):
+        self.fresher_counter = np.zeros((number_of_replications, number_of_freshers), dtype=np.int64)
+        self.fresher_call_duration = np.zeros((number_of_replications, number_of_freshers), dtype=np.int64)
+        self.technical_lead_counter = np.zeros(number_of_replications, dtype=np.int64)
+        self.technical_lead_call_duration = np.zeros(number_of_replications, dtype=np.int64)
+        self.project_manager_counter = np.zeros(number_of_replications, dtype=np.int64)
+        self.project_manager_call_duration = np.zeros(number_of_replications, dtype=np.int64)
+        self.dropped_calls = np.zeros(number_of_replications, dtype=np.int64)
+
+    def total_calls(self):
+        """Returns the number of incoming calls of each replication.
+
+        Returns:
+            ndarray: Answered plus dropped calls, shape (replications,).
+        """
+        return (self.fresher_counter.sum(axis=1) + self.technical_lead_counter
+                + self.project_manager_counter + self.dropped_calls)
+
+    def drop_rate(self):
+        """Returns the share of incoming calls that found all lines busy.
+
+        Returns:
+            ndarray: Dropped calls over incoming calls, 0 for a replication without calls.
+        """
+        total_calls = self.total_calls()
+        return np.divide(self.dropped_calls, total_calls, out=np.zeros(len(total_calls)), where=total_calls > 0)
+
+
+def run_monte_carlo(call_center_simulation, number_of_replications, seed=None):
+    """Runs many replications of a configured simulation with array operations.
+
+    Follows the event mode of CallCenterSimulation.run_simulation with the "first_free" fresher
+    selection: a call that hangs up at the instant of a wave frees its employee for that wave.
+
+    Args:
+        call_center_simulation (CallCenterSimulation): Simulation whose parameters were given with set().
+        number_of_replications (int): Number of independent replications.
+        seed (int): Optional seed of the NumPy random generator.
+
+    Returns:
+        MonteCarloResult: The call statistics of every replication.
+    """
+    if number_of_replications <= 0:
+        raise ValueError("number_of_replications must be greater than 0")
+    if call_center_simulation.run_time > 0 and call_center_simulation.min_max_sleep_interval[1] == 0:
+        raise ValueError("Monte Carlo runs require a positive max sleep interval")
+
+    rng = np.random.default_rng(seed)
+    number_of_freshers = call_center_simulation.number_of_freshers
+    min_calls, max_calls = call_center_simulation.min_max_calls_per_wave
+    min_interval, max_interval = call_center_simulation.min_max_sleep_interval
+    min_duration, max_duration = call_center_simulation.min_max_call_duration
+    result = MonteCarloResult(number_of_replications, number_of_freshers)
+
+    # Time at which each employee hangs up, 0 when free from the start
+    fresher_free_at = np.zeros((number_of_replications, number_of_freshers), dtype=np.int64)
+    technical_lead_free_at = np.zeros(number_of_replications, dtype=np.int64)
+    project_manager_free_at = np.zeros(number_of_replications, dtype=np.int64)
+    now = np.zeros(number_of_replications, dtype=np.int64)
+    running = now < call_center_simulation.run_time
+
+    while running.any():
+        number_of_calls = np.where(running, rng.integers(min_calls, max_calls + 1, number_of_replications), 0)
+
+        # The free freshers take the first calls of the wave, lowest index first
+        free = fresher_free_at <= now[:, None]
+        answered = free & (np.cumsum(free, axis=1) <= number_of_calls[:, None])
+        call_duration = rng.integers(min_duration, max_duration + 1, fresher_free_at.shape)
+        fresher_free_at = np.where(answered, now[:, None] + call_duration, fresher_free_at)
+        result.fresher_counter += answered
+        result.fresher_call_duration += np.where(answered, call_duration, 0)
+        overflow = number_of_calls - answered.sum(axis=1)
+
+        # The technical lead and the project manager take one overflow call each
+        for counter, call_duration_total, free_at in (
+                (result.technical_lead_counter, result.technical_lead_call_duration, technical_lead_free_at),
+                (result.project_manager_counter, result.project_manager_call_duration, project_manager_free_at)):
+            answered = (overflow > 0) & (free_at <= now)
+            call_duration = rng.integers(min_duration, max_duration + 1, number_of_replications)
+            free_at[answered] = now[answered] + call_duration[answered]
+            counter += answered
+            call_duration_total += np.where(answered, call_duration, 0)
+            overflow -= answered
+        result.dropped_calls += overflow
+
+        # Schedule the next call wave
+        now = now + rng.integers(min_interval, max_interval + 1, number_of_replications)
+        running &= now < call_center_simulation.run_time
+
+    return result
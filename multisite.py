@@ -0,0 +1,253 @@
+"""Multi-site simulation: call centers in separate processes passing their overflow calls to each other."""
+"""
+    Design:
+        - Every site is an event mode CallCenterSimulation running in its own process, linked to the hub in the
+          parent process by a multiprocessing pipe, so the sites of a nationwide model run on separate cores.
+        - The sites are synchronized conservatively in windows of sync_interval simulated seconds. A call
+          passed to another site arrives transfer_delay seconds later, never less than a window, so a site
+          never receives a call in its past.
+        - At the end of a window every site sends one batched message with the calls it could not answer and
+          the time of its next event. The hub routes the calls and answers with the calls for the site and the
+          end of the next window, skipping the windows in which no site has anything to do.
+        - A call is passed on once: a site that cannot answer a call of another site queues or drops it.
+        - Each site returns its CallStatistics, merged by the hub into the statistics of all sites.
+ """
+# Imports
+import os
+import sys
+import argparse
+import contextlib
+import multiprocessing
+from call_center_simulation import CallCenterSimulation, CallStatistics, NullEventSink
+
+# Default simulated seconds between two synchronizations of the sites
+DEFAULT_SYNC_INTERVAL = 5
+
+
+class Site:
+    """A call center of a multi-site run.
+
+    Attributes:
+        name (str): Name of the site, unique in the run.
+        parameters (tuple): Arguments of CallCenterSimulation.set.
+        options (dict): Keyword arguments of CallCenterSimulation.set, such as queue_capacity.
+        overflow_to (list): Names of the sites taking in turn the calls this site cannot answer,
+            None for every other site, an empty list to drop them.
+    """
+    __slots__ = ('name', 'parameters', 'options', 'overflow_to')
+
+    def __init__(self, name, parameters, options=None, overflow_to=None):
+        self.name = name
+        self.parameters = tuple(parameters)
+        self.options = dict(options or {})
+        self.overflow_to = list(overflow_to) if overflow_to is not None else None
+
+
+class SiteLink:
+    """Link of a site process to the hub, used by the event engine of the site.
+
+    Attributes:
+        first_sync_time (float): Simulated time of the first synchronization.
+        overflow_calls (list): (arrival_time, loop_number, call_number, skills, call_duration) of the calls passed
+            on since the last synchronization, None when the site drops the calls it cannot answer.
+        overflowed_out (int): Calls passed to other sites.
+        overflowed_in (int): Calls received from other sites.
+    """
+    def __init__(self, connection, first_sync_time, overflow=True):
+        self.first_sync_time = first_sync_time
+        self.overflow_calls = [] if overflow else None
+        self.overflowed_out = 0
+        self.overflowed_in = 0
+        self._connection = connection
+
+    def synchronize(self, now, next_event_time):
+        """Sends the calls passed on during the window and receives the calls of the other sites.
+
+        Args:
+            now (float): End of the window.
+            next_event_time (float): Time of the next event of the site, None if it has none.
+
+        Returns:
+            tuple: The (delivery_time, call) pairs of the received calls and the end of the next window,
+                None once every site is done.
+        """
+        outgoing_calls = self.overflow_calls or []
+        self._connection.send((outgoing_calls, next_event_time))
+        self.overflowed_out += len(outgoing_calls)
+        # Cleared in place, the engine holds the list
+        outgoing_calls.clear()
+        incoming_calls, next_sync_time = self._connection.recv()
+        self.overflowed_in += len(incoming_calls)
+        return incoming_calls, next_sync_time
+
+
+class MultiSiteResult:
+    """Statistics of a multi-site run.
+
+    Attributes:
+        site_statistics (dict): CallStatistics of every site, mapped by site name.
+        overflowed_out (dict): Calls each site passed to other sites.
+        overflowed_in (dict): Calls each site received from other sites.
+        call_statistics (CallStatistics): The statistics of all sites added up.
+    """
+    def __init__(self):
+        self.site_statistics = {}
+        self.overflowed_out = {}
+        self.overflowed_in = {}
+        self.call_statistics = None
+
+    def print_summary(self):
+        """Prints the summary of every site, then the one of all sites."""
+        for name, call_statistics in self.site_statistics.items():
+            print(f"Site {name}: {self.overflowed_out[name]} calls passed to other sites, "
+                  f"{self.overflowed_in[name]} calls taken from them.")
+            call_statistics.print_summary()
+        print("All sites:")
+        self.call_statistics.print_summary()
+
+
+def _run_site(site, seed, connection, first_sync_time, overflow):
+    """Runs a site in a worker process and sends its statistics back to the hub.
+
+    Args:
+        site (Site): The site.
+        seed (int): Seed of the random streams of the site.
+        connection (Connection): End of the pipe to the hub.
+        first_sync_time (float): Simulated time of the first synchronization.
+        overflow (bool): Whether the site passes the calls it cannot answer to the hub.
+    """
+    call_center_simulation = CallCenterSimulation(NullEventSink())
+    call_center_simulation.set(*site.parameters, seed=seed, **site.options)
+    site_link = SiteLink(connection, first_sync_time, overflow)
+    call_center_simulation.site_link = site_link
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        call_center_simulation.run_simulation("event")
+    connection.send((call_center_simulation.call_statistics, site_link.overflowed_out, site_link.overflowed_in))
+    connection.close()
+
+
+def _receive(connection, site_name):
+    """Receives the next message of a site, raising an error if its process ended."""
+    try:
+        return connection.recv()
+    except EOFError:
+        raise RuntimeError(f"site {site_name} stopped before the end of the run") from None
+
+
+def run_multisite(sites, seed=0, sync_interval=DEFAULT_SYNC_INTERVAL, transfer_delay=None):
+    """Runs the sites in worker processes, passing the calls a site cannot answer to the others.
+
+    Site i is seeded with seed + i.
+
+    Args:
+        sites (list): The Site instances.
+        seed (int): Seed of the first site.
+        sync_interval (float): Simulated seconds between two synchronizations of the sites.
+        transfer_delay (float): Simulated seconds a passed on call takes to reach the other site, at least
+            sync_interval. Defaults to sync_interval.
+
+    Returns:
+        MultiSiteResult: The statistics of every site and of all sites.
+    """
+    transfer_delay = sync_interval if transfer_delay is None else transfer_delay
+    if not sync_interval > 0:
+        raise ValueError("sync_interval must be positive")
+    if transfer_delay < sync_interval:
+        raise ValueError("transfer_delay must be at least sync_interval, a call would reach a site in its past")
+    names = [site.name for site in sites]
+    if not names or len(set(names)) != len(names):
+        raise ValueError("the sites must have unique names")
+    targets = {}
+    for site in sites:
+        targets[site.name] = [name for name in names if name != site.name] if site.overflow_to is None else site.overflow_to
+        if site.name in targets[site.name] or not set(targets[site.name]) <= set(names):
+            raise ValueError(f"site {site.name} must overflow to other sites of the run")
+
+    connections = []
+    processes = []
+    try:
+        for index, site in enumerate(sites):
+            parent_connection, child_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_run_site, name=f"site {site.name}", daemon=True,
+                                              args=(site, seed + index, child_connection, sync_interval, bool(targets[site.name])))
+            process.start()
+            child_connection.close()
+            connections.append(parent_connection)
+            processes.append(process)
+
+        # Every site passes its calls to its targets in turn
+        turns = dict.fromkeys(names, 0)
+        sync_time = sync_interval
+        while True:
+            deliveries = {name: [] for name in names}
+            next_times = []
+            for site, connection in zip(sites, connections):
+                outgoing_calls, next_event_time = _receive(connection, site.name)
+                if next_event_time is not None:
+                    next_times.append(next_event_time)
+                site_targets = targets[site.name]
+                for call in outgoing_calls:
+                    target = site_targets[turns[site.name] % len(site_targets)]
+                    turns[site.name] += 1
+                    deliveries[target].append((call[0] + transfer_delay, call))
+                    next_times.append(call[0] + transfer_delay)
+            if not next_times:
+                for connection in connections:
+                    connection.send(([], None))
+                break
+            # No site has an event before min(next_times), the windows up to it are skipped
+            sync_time = max(sync_time, min(next_times)) + sync_interval
+            for name, connection in zip(names, connections):
+                connection.send((deliveries[name], sync_time))
+
+        result = MultiSiteResult()
+        for site, connection in zip(sites, connections):
+            call_statistics, overflowed_out, overflowed_in = _receive(connection, site.name)
+            result.site_statistics[site.name] = call_statistics
+            result.overflowed_out[site.name] = overflowed_out
+            result.overflowed_in[site.name] = overflowed_in
+        result.call_statistics = CallStatistics.merged(result.site_statistics.values())
+        for process in processes:
+            process.join()
+        return result
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for connection in connections:
+            connection.close()
+
+
+def parse_values(text):
+    """Parses "a,b,c" into a list of ints."""
+    return [int(part) for part in text.split(",")]
+
+
+def main():
+    """Runs a multi-site simulation, one site per number of freshers."""
+    parser = argparse.ArgumentParser(description="Call Center Multi-Site Simulation")
+    parser.add_argument("number_of_freshers", type=parse_values, help='Numbers of freshers of the sites, "a,b,c"')
+    parser.add_argument("run_time", type=int, help="Total run time of the simulation")
+    parser.add_argument("min_calls_per_wave", type=int, help="Minimum number of calls per wave")
+    parser.add_argument("max_calls_per_wave", type=int, help="Maximum number of calls per wave")
+    parser.add_argument("min_sleep_interval", type=int, help="Minimum sleep interval between waves")
+    parser.add_argument("max_sleep_interval", type=int, help="Maximum sleep interval between waves")
+    parser.add_argument("min_call_duration", type=int, help="Minimum call duration")
+    parser.add_argument("max_call_duration", type=int, help="Maximum call duration")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the first site")
+    parser.add_argument("--sync-interval", type=float, default=DEFAULT_SYNC_INTERVAL, help="Simulated seconds between two synchronizations")
+    parser.add_argument("--transfer-delay", type=float, default=None, help="Simulated seconds a call takes to reach another site")
+    parser.add_argument("--queue-capacity", type=int, default=0, help="Calls that may wait for a free employee at each site")
+    args = parser.parse_args()
+
+    sites = [Site(f"{index + 1}", (number_of_freshers, args.run_time, (args.min_calls_per_wave, args.max_calls_per_wave),
+                                   (args.min_sleep_interval, args.max_sleep_interval),
+                                   (args.min_call_duration, args.max_call_duration)),
+                  {"queue_capacity": args.queue_capacity})
+             for index, number_of_freshers in enumerate(args.number_of_freshers)]
+    run_multisite(sites, args.seed, args.sync_interval, args.transfer_delay).print_summary()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
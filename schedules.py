@@ -0,0 +1,148 @@
+"""Shift schedules, breaks and availability states of the agents of the event mode."""
+"""
+    Design:
+        - An agent with a schedule is off shift until its first shift starts, available during its shifts
+          and on break during the breaks of a shift. Agents without a schedule are always available.
+        - A schedule is turned into a sorted list of (time, state) transitions per agent. The event engine
+          keeps the next transition of every scheduled agent in its event heap, so a state change costs one
+          heap operation and the dispatch of a call never looks at the schedules.
+        - An agent leaving during a call finishes it, see IdleAgentIndex.set_available.
+ """
+# Imports
+import csv
+
+# Availability states of an agent
+AVAILABLE = "available"
+ON_BREAK = "on break"
+OFF_SHIFT = "off shift"
+AVAILABILITY_STATES = (AVAILABLE, ON_BREAK, OFF_SHIFT)
+
+
+class Shift:
+    """A working period of an agent, with its breaks.
+
+    Attributes:
+        start (float): Simulated second the shift starts at.
+        end (float): Simulated second the shift ends at.
+        breaks (tuple): (start, end) pairs of the breaks, increasing and within the shift.
+    """
+    __slots__ = ('start', 'end', 'breaks')
+
+    def __init__(self, start, end, breaks=()):
+        if not 0 <= start < end:
+            raise ValueError("a shift must start at a non-negative time before its end")
+        breaks = tuple((break_start, break_end) for break_start, break_end in breaks)
+        previous_end = start
+        for break_start, break_end in breaks:
+            if not previous_end <= break_start < break_end <= end:
+                raise ValueError("breaks must be increasing, non-overlapping and within the shift")
+            previous_end = break_end
+        self.start = start
+        self.end = end
+        self.breaks = breaks
+
+    def transitions(self):
+        """Returns the (time, state) transitions of the shift, from its start to its end."""
+        transitions = [(self.start, AVAILABLE)]
+        for break_start, break_end in self.breaks:
+            transitions.append((break_start, ON_BREAK))
+            transitions.append((break_end, AVAILABLE))
+        transitions.append((self.end, OFF_SHIFT))
+        return transitions
+
+    def state_at(self, time):
+        """Returns the state of the agent at a time, OFF_SHIFT outside the shift."""
+        if not self.start <= time < self.end:
+            return OFF_SHIFT
+        for break_start, break_end in self.breaks:
+            if break_start <= time < break_end:
+                return ON_BREAK
+        return AVAILABLE
+
+
+class ShiftSchedule:
+    """Shifts of the agents of the routing tiers.
+
+    Attributes:
+        shifts (dict): Shift lists sorted by start, mapped by (tier name, agent index).
+    """
+    def __init__(self):
+        self.shifts = {}
+
+    def add(self, tier_name, index, shift):
+        """Adds a shift to an agent.
+
+        Args:
+            tier_name (str): Name of the routing tier of the agent.
+            index (int): Index of the agent in the tier, from 0.
+            shift (Shift): The shift, not overlapping the other shifts of the agent.
+
+        Returns:
+            ShiftSchedule: The schedule, so additions can be chained.
+        """
+        if index < 0:
+            raise ValueError("index must be non-negative")
+        shifts = self.shifts.setdefault((tier_name, index), [])
+        for other in shifts:
+            if shift.start < other.end and other.start < shift.end:
+                raise ValueError(f"the shifts of agent {index} of {tier_name} overlap")
+        shifts.append(shift)
+        shifts.sort(key=lambda other: other.start)
+        return self
+
+    def state_at(self, tier_name, index, time):
+        """Returns the availability state of an agent at a time."""
+        shifts = self.shifts.get((tier_name, index))
+        if shifts is None:
+            return AVAILABLE
+        for shift in shifts:
+            state = shift.state_at(time)
+            if state != OFF_SHIFT:
+                return state
+        return OFF_SHIFT
+
+    def available_agents(self, tier_name, size, time):
+        """Returns the number of available agents of a tier at a time, a point of its staffing curve."""
+        return sum(self.state_at(tier_name, index, time) == AVAILABLE for index in range(size))
+
+    def transitions(self, tiers):
+        """Returns the transitions of the scheduled agents of the routing tiers.
+
+        Args:
+            tiers (list): The RoutingTier instances of the run, in escalation order.
+
+        Returns:
+            dict: Time sorted (time, state) transitions, mapped by (tier position, agent index).
+        """
+        positions = {tier.name: position for position, tier in enumerate(tiers)}
+        agent_transitions = {}
+        for (tier_name, index), shifts in self.shifts.items():
+            if tier_name not in positions or index >= tiers[positions[tier_name]].size:
+                raise ValueError(f"the schedule has shifts for agent {index} of {tier_name}, which is not in the routing tiers")
+            agent_transitions[positions[tier_name], index] = [transition for shift in shifts for transition in shift.transitions()]
+        return agent_transitions
+
+
+def read_shift_schedule(path):
+    """Reads a shift schedule from a CSV file.
+
+    Each line holds a tier name, an agent number (from 1, as in the agent names), the start and end of
+    the shift, then the start and end of each break. Empty lines and lines starting with "#" are skipped.
+
+    Args:
+        path (str): Path of the schedule file.
+
+    Returns:
+        ShiftSchedule: The schedule.
+    """
+    shift_schedule = ShiftSchedule()
+    with open(path, newline="") as file:
+        for row in csv.reader(file):
+            if not row or row[0].lstrip().startswith("#"):
+                continue
+            times = [float(value) for value in row[2:]]
+            if len(times) < 2 or len(times) % 2:
+                raise ValueError(f"{path}: a shift needs a start, an end and a start and end per break")
+            breaks = list(zip(times[2::2], times[3::2]))
+            shift_schedule.add(row[0].strip(), int(row[1]) - 1, Shift(times[0], times[1], breaks))
+    return shift_schedule
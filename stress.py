@@ -1,17 +1,31 @@
+import os
 import sys
-from call_center_simulation import CallCenterSimulation
+import math
+import argparse
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from call_center_simulation import CallCenterSimulation, NullEventSink, SIMULATION_MODES
 
 # The code for Employee, Fresher, TechnicalLead, ProductManager, find_free_fresher_index, CallStatistics, and CallCenterSimulation remains the same as in the original code.
 
+# Parameters of the stress test
+NUMBER_OF_SIMULATIONS = 100
+STRESS_PARAMETERS = (
+    100,        # number_of_freshers
+    60,         # run_time
+    (50, 100),  # min_max_calls_per_wave
+    (0, 1),     # min_max_sleep_interval
+    (10, 30),   # min_max_call_duration
+)
+
+# z value of a two-sided 95% confidence interval (normal approximation)
+CONFIDENCE_Z = 1.96
+
 def stress_test_call_center():
     try:
         # Set the parameters for the stress test
-        number_of_simulations = 100
-        number_of_freshers = 100
-        run_time = 60
-        min_max_calls_per_wave = (50, 100)
-        min_max_sleep_interval = (0, 1)
-        min_max_call_duration = (10, 30)
+        number_of_simulations = NUMBER_OF_SIMULATIONS
 
         for i in range(number_of_simulations):
             print(f"Running call center simulation #{i + 1}")
@@ -19,13 +33,7 @@ def stress_test_call_center():
             # Run the call center simulation
             call_center = CallCenterSimulation()
             # Set the parameters of the call center simulation
-            call_center.set(
-                number_of_freshers,
-                run_time,
-                min_max_calls_per_wave,
-                min_max_sleep_interval,
-                min_max_call_duration
-            )
+            call_center.set(*STRESS_PARAMETERS)
             # Run the call center simulation
             call_center.run_simulation()
 
@@ -35,6 +43,93 @@ def stress_test_call_center():
         print(f"An error occurred during the execution of the call center simulation: {str(e)}")
         sys.exit(1)
 
+def run_replication(parameters, mode, seed):
+    """Runs one replication in a worker process with a deterministic seed.
+
+    The per call events are discarded, only the compact statistics go back to the parent.
+
+    Args:
+        parameters (tuple): Arguments of CallCenterSimulation.set.
+        mode (str): Mode passed to CallCenterSimulation.run_simulation.
+        seed (int): Seed of the random streams of this replication.
+
+    Returns:
+        dict: The CallStatistics.summary of the replication.
+    """
+    call_center = CallCenterSimulation(NullEventSink())
+    call_center.set(*parameters, seed=seed)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        call_center.run_simulation(mode)
+    return call_center.call_statistics.summary()
+
+def merge_summaries(summaries):
+    """Merges the summaries of several replications.
+
+    Args:
+        summaries (list): CallStatistics.summary dicts, one per replication.
+
+    Returns:
+        dict: For each figure, a dict with the 'mean', the 'half_width' of its 95% confidence
+            interval (normal approximation, 0 for a single replication) and the 'total'.
+    """
+    merged = {}
+    number_of_replications = len(summaries)
+    for key in summaries[0]:
+        values = [summary[key] for summary in summaries]
+        mean = sum(values) / number_of_replications
+        half_width = 0.0
+        if number_of_replications > 1:
+            variance = sum((value - mean) ** 2 for value in values) / (number_of_replications - 1)
+            half_width = CONFIDENCE_Z * math.sqrt(variance / number_of_replications)
+        merged[key] = {'mean': mean, 'half_width': half_width, 'total': sum(values)}
+    return merged
+
+def parallel_stress_test_call_center(parameters=STRESS_PARAMETERS, number_of_simulations=NUMBER_OF_SIMULATIONS, mode="event", seed=0, max_workers=None):
+    """Runs the stress test replications in parallel worker processes.
+
+    Replication i is seeded with seed + i, so the results do not depend on the number of
+    workers or on the order in which the replications finish.
+
+    Args:
+        parameters (tuple): Arguments of CallCenterSimulation.set.
+        number_of_simulations (int): Number of replications.
+        mode (str): Mode passed to CallCenterSimulation.run_simulation.
+        seed (int): Seed of the first replication.
+        max_workers (int): Number of worker processes, defaults to the number of cores.
+
+    Returns:
+        dict: The merged statistics, see merge_summaries.
+    """
+    if number_of_simulations <= 0:
+        raise ValueError("number_of_simulations must be greater than 0")
+    seeds = range(seed, seed + number_of_simulations)
+    max_workers = max_workers or os.cpu_count()
+    chunksize = max(1, number_of_simulations // (max_workers * 4))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        summaries = list(executor.map(run_replication, repeat(parameters), repeat(mode), seeds, chunksize=chunksize))
+    return merge_summaries(summaries)
+
+def print_merged_summary(merged):
+    """Prints the merged statistics of parallel replications.
+
+    Args:
+        merged (dict): The merged statistics returned by merge_summaries.
+    """
+    print("----------------------------------------------")
+    print('Summary over all simulations (mean +/- 95% confidence interval):')
+    for key, stats in merged.items():
+        print(f'{key}: {stats["mean"]:.2f} +/- {stats["half_width"]:.2f}')
+
 
 if __name__ == '__main__':
-    stress_test_call_center()
+    parser = argparse.ArgumentParser(description="Call Center Simulation Stress Test")
+    parser.add_argument("--parallel", action="store_true", help="Run the simulations in parallel worker processes")
+    parser.add_argument("--mode", choices=SIMULATION_MODES, default="event", help="Simulation mode of the parallel run")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the first parallel simulation")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes")
+    args = parser.parse_args()
+
+    if args.parallel:
+        print_merged_summary(parallel_stress_test_call_center(mode=args.mode, seed=args.seed, max_workers=args.workers))
+    else:
+        stress_test_call_center()
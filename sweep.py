@@ -0,0 +1,285 @@
+"""Parameter sweeps and staffing optimization of the call center simulation, with results cached on disk."""
+"""
+    Design:
+        - A sweep runs the stress test replications of every point of a grid of CallCenterSimulation.set
+          parameters, all replications of the uncached points sharing one pool of worker processes.
+        - The merged statistics of a point are cached as a JSON file named after a hash of the parameters,
+          the mode, the seed, the number of replications and ENGINE_VERSION, so rerunning a sweep or an
+          overlapping grid only computes the new points.
+        - The optimizer looks for the fewest freshers meeting a target drop rate: it starts from the Erlang B
+          estimate, doubles the step until the target is bracketed and bisects, every evaluation being cached.
+ """
+# Imports
+import os
+import sys
+import json
+import hashlib
+import argparse
+import itertools
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from call_center_simulation import CallCenterSimulation, NullEventSink, SIMULATION_MODES, ENGINE_VERSION, MAX_FRESHERS
+from erlang import minimum_freshers
+from stress import run_replication, merge_summaries, print_merged_summary
+
+# Order of the CallCenterSimulation.set parameters of a point
+PARAMETER_NAMES = ("number_of_freshers", "run_time", "min_max_calls_per_wave", "min_max_sleep_interval", "min_max_call_duration")
+# Default directory of the result cache
+DEFAULT_CACHE_DIRECTORY = ".sweep_cache"
+
+
+class ResultCache:
+    """Merged statistics of sweep points stored as JSON files, one per point.
+
+    Attributes:
+        directory (str): Directory of the cache files.
+    """
+    def __init__(self, directory=DEFAULT_CACHE_DIRECTORY):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """Returns the cached value of key, None if it is not cached."""
+        try:
+            with open(self._path(key)) as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def put(self, key, value):
+        """Stores the value of key, replacing the file at once so a reader never sees half of it."""
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(file_descriptor, "w") as file:
+            json.dump(value, file)
+        os.replace(temporary_path, self._path(key))
+
+
+def point_key(parameters, mode, seed, number_of_simulations):
+    """Returns the cache key of a sweep point.
+
+    Args:
+        parameters (tuple): Arguments of CallCenterSimulation.set.
+        mode (str): Mode passed to CallCenterSimulation.run_simulation.
+        seed (int): Seed of the first replication.
+        number_of_simulations (int): Number of replications.
+
+    Returns:
+        str: A SHA-256 hex digest.
+    """
+    description = json.dumps({"parameters": parameters, "mode": mode, "seed": seed,
+                              "number_of_simulations": number_of_simulations, "engine_version": ENGINE_VERSION},
+                             sort_keys=True)
+    return hashlib.sha256(description.encode()).hexdigest()
+
+
+def grid_points(grid):
+    """Returns the points of a parameter grid.
+
+    Args:
+        grid (dict): Lists of values mapped by PARAMETER_NAMES, a missing name or a single value
+            being a list of one value.
+
+    Returns:
+        list: Tuples of CallCenterSimulation.set arguments, in PARAMETER_NAMES order.
+    """
+    missing_names = [name for name in PARAMETER_NAMES if name not in grid]
+    if missing_names:
+        raise ValueError(f"the grid has no values for {', '.join(missing_names)}")
+    values = []
+    for name in PARAMETER_NAMES:
+        name_values = grid[name]
+        if name.startswith("min_max"):
+            name_values = [tuple(value) for value in ([name_values] if isinstance(name_values, tuple) else name_values)]
+        elif isinstance(name_values, int):
+            name_values = [name_values]
+        values.append(name_values)
+    return list(itertools.product(*values))
+
+
+def sweep(grid, number_of_simulations=10, mode="event", seed=0, cache=None, max_workers=None):
+    """Runs the replications of every point of a grid, reusing the cached points.
+
+    Replication i of every point is seeded with seed + i, as in parallel_stress_test_call_center.
+
+    Args:
+        grid (dict): The parameter grid, see grid_points.
+        number_of_simulations (int): Number of replications of each point.
+        mode (str): Mode passed to CallCenterSimulation.run_simulation.
+        seed (int): Seed of the first replication.
+        cache (ResultCache): Cache of the merged statistics, None to compute every point.
+        max_workers (int): Number of worker processes, defaults to the number of cores.
+
+    Returns:
+        list: (parameters, merged) pairs in grid order, merged being the merge_summaries of the point.
+    """
+    if number_of_simulations <= 0:
+        raise ValueError("number_of_simulations must be greater than 0")
+    points = grid_points(grid)
+    results = {}
+    missing_points = []
+    for parameters in points:
+        merged = cache.get(point_key(parameters, mode, seed, number_of_simulations)) if cache is not None else None
+        if merged is None:
+            missing_points.append(parameters)
+        else:
+            results[parameters] = merged
+
+    if missing_points:
+        # One pool for the replications of every new point
+        jobs = [(parameters, replication_seed) for parameters in missing_points
+                for replication_seed in range(seed, seed + number_of_simulations)]
+        with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+            summaries = list(executor.map(run_replication, [parameters for parameters, _ in jobs],
+                                          itertools.repeat(mode), [replication_seed for _, replication_seed in jobs]))
+        for index, parameters in enumerate(missing_points):
+            merged = merge_summaries(summaries[index * number_of_simulations:(index + 1) * number_of_simulations])
+            results[parameters] = merged
+            if cache is not None:
+                cache.put(point_key(parameters, mode, seed, number_of_simulations), merged)
+    return [(parameters, results[parameters]) for parameters in points]
+
+
+def drop_rate(merged):
+    """Returns the mean share of incoming calls that found all lines busy.
+
+    Args:
+        merged (dict): The merged statistics of a point, see merge_summaries.
+
+    Returns:
+        float: Mean dropped calls over mean incoming calls, 0 without calls.
+    """
+    answered_calls = sum(merged[key]["mean"] for key in ("fresher_counter", "technical_lead_counter", "project_manager_counter"))
+    total_calls = answered_calls + merged["dropped_calls"]["mean"] + merged.get("abandoned_calls", {"mean": 0})["mean"]
+    return merged["dropped_calls"]["mean"] / total_calls if total_calls else 0.0
+
+
+def optimize_staffing(parameters, target_drop_rate=0.01, number_of_simulations=10, mode="event", seed=0,
+                      cache=None, max_workers=None, max_freshers=MAX_FRESHERS):
+    """Finds the fewest freshers whose simulated drop rate meets a target.
+
+    Starts from the Erlang B staffing, doubles the step up or down until the target is bracketed and
+    bisects the bracket, so only a few staffings are simulated.
+
+    Args:
+        parameters (tuple): Arguments of CallCenterSimulation.set, the number of freshers being the starting guess
+            when the Erlang estimate is not available.
+        target_drop_rate (float): Highest acceptable drop rate.
+        number_of_simulations (int): Number of replications of each staffing.
+        mode (str): Mode passed to CallCenterSimulation.run_simulation.
+        seed (int): Seed of the first replication.
+        cache (ResultCache): Cache of the merged statistics.
+        max_workers (int): Number of worker processes.
+        max_freshers (int): Largest staffing searched.
+
+    Returns:
+        tuple: The number of freshers and a dict of the drop rate of every simulated staffing.
+    """
+    if not 0 < target_drop_rate <= 1:
+        raise ValueError("target_drop_rate must be in (0, 1]")
+    drop_rates = {}
+
+    def meets_target(number_of_freshers):
+        if number_of_freshers not in drop_rates:
+            grid = dict(zip(PARAMETER_NAMES, ([number_of_freshers],) + tuple([value] for value in parameters[1:])))
+            merged = sweep(grid, number_of_simulations, mode, seed, cache, max_workers)[0][1]
+            drop_rates[number_of_freshers] = drop_rate(merged)
+        return drop_rates[number_of_freshers] <= target_drop_rate
+
+    call_center_simulation = CallCenterSimulation(NullEventSink())
+    call_center_simulation.set(*parameters)
+    try:
+        guess = min(minimum_freshers(call_center_simulation, target_drop_rate, max_freshers), max_freshers)
+    except ValueError:
+        guess = parameters[0]
+
+    # Bracket the staffing: low fails the target (or is 0), high meets it
+    step = 1
+    if meets_target(guess):
+        high = guess
+        low = max(guess - step, 0)
+        while low > 0 and meets_target(low):
+            high = low
+            step *= 2
+            low = max(high - step, 0)
+        if low == 0 and meets_target(0):
+            return 0, drop_rates
+    else:
+        low = guess
+        high = min(guess + step, max_freshers)
+        while not meets_target(high):
+            if high >= max_freshers:
+                raise ValueError(f"more than {max_freshers} freshers are needed")
+            low = high
+            step *= 2
+            high = min(low + step, max_freshers)
+
+    while high - low > 1:
+        middle = (low + high) // 2
+        if meets_target(middle):
+            high = middle
+        else:
+            low = middle
+    return high, drop_rates
+
+
+def parse_values(text):
+    """Parses "a,b,c" or "start:stop:step" (stop included) into a list of ints."""
+    if ":" in text:
+        start, stop, step = (int(part) for part in text.split(":"))
+        return list(range(start, stop + 1, step))
+    return [int(part) for part in text.split(",")]
+
+
+def parse_ranges(text):
+    """Parses "min-max,min-max" into a list of (min, max) tuples."""
+    return [tuple(int(part) for part in pair.split("-")) for pair in text.split(",")]
+
+
+def main():
+    """Runs the sweep and optimize subcommands."""
+    parser = argparse.ArgumentParser(description="Call Center Simulation Parameter Sweep")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for command in ("sweep", "optimize"):
+        subparser = subparsers.add_parser(command)
+        subparser.add_argument("--freshers", type=parse_values, default=[10], help='Numbers of freshers, "a,b,c" or "start:stop:step"')
+        subparser.add_argument("--run-time", type=parse_values, default=[60], help="Run times")
+        subparser.add_argument("--calls-per-wave", type=parse_ranges, default=[(1, 5)], help='Wave size ranges, "min-max,min-max"')
+        subparser.add_argument("--sleep-interval", type=parse_ranges, default=[(1, 3)], help="Interval ranges between waves")
+        subparser.add_argument("--call-duration", type=parse_ranges, default=[(5, 20)], help="Call duration ranges")
+        subparser.add_argument("--simulations", type=int, default=10, help="Replications per point")
+        subparser.add_argument("--mode", choices=SIMULATION_MODES, default="event", help="Simulation mode")
+        subparser.add_argument("--seed", type=int, default=0, help="Seed of the first replication")
+        subparser.add_argument("--workers", type=int, default=None, help="Number of worker processes")
+        subparser.add_argument("--cache", default=DEFAULT_CACHE_DIRECTORY, help="Directory of the result cache")
+        subparser.add_argument("--no-cache", action="store_true", help="Compute every point")
+    subparsers.choices["optimize"].add_argument("--target", type=float, default=0.01, help="Acceptable drop rate")
+    args = parser.parse_args()
+
+    cache = None if args.no_cache else ResultCache(args.cache)
+    grid = {
+        "number_of_freshers": args.freshers,
+        "run_time": args.run_time,
+        "min_max_calls_per_wave": args.calls_per_wave,
+        "min_max_sleep_interval": args.sleep_interval,
+        "min_max_call_duration": args.call_duration,
+    }
+    if args.command == "sweep":
+        for parameters, merged in sweep(grid, args.simulations, args.mode, args.seed, cache, args.workers):
+            print(f"Parameters: {parameters}, drop rate {drop_rate(merged):.4f}")
+            print_merged_summary(merged)
+        return 0
+
+    # The numbers of freshers of the grid are only starting guesses, every other point is optimized once
+    for parameters in dict.fromkeys((args.freshers[0],) + parameters[1:] for parameters in grid_points(grid)):
+        number_of_freshers, drop_rates = optimize_staffing(parameters, args.target, args.simulations, args.mode,
+                                                           args.seed, cache, args.workers)
+        print(f"Parameters: {parameters[1:]}, minimum freshers {number_of_freshers} "
+              f"(drop rate {drop_rates[number_of_freshers]:.4f}, {len(drop_rates)} staffings simulated)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+"""Streaming export of the per call trace of a simulation to CSV or Parquet."""
+"""
+    Design:
+        - Every call (answered, dropped or abandoned) is one row of the trace.
+        - The rows are buffered column by column in a batch of fixed size, numbers in typed arrays.
+        - A full batch is written out and cleared, so memory does not grow with the run length.
+        - CSV needs only the standard library, Parquet needs pyarrow (an optional dependency).
+ """
+# Imports
+import abc
+import csv
+from array import array
+
+# Outcomes of a traced call
+OUTCOME_ANSWERED = "answered"
+OUTCOME_DROPPED = "dropped"
+OUTCOME_ABANDONED = "abandoned"
+
+# Columns of the trace and the typecode of their array, None for text columns
+TRACE_COLUMNS = (
+    ("arrival_time", "d"),
+    ("loop_number", "q"),
+    ("call_number", "q"),
+    ("outcome", None),
+    ("role", None),
+    ("agent", None),
+    ("wait_time", "d"),
+    ("call_duration", "d"),
+    ("escalations", "q"),
+)
+
+
+class CallTraceWriter(abc.ABC):
+    """Buffers the per call trace in columnar batches and writes each batch when it is full.
+
+    Subclasses implement _write_batch and may override close.
+
+    Attributes:
+        path (str): Path of the trace file.
+        batch_size (int): Number of calls buffered before a batch is written.
+        rows_written (int): Number of calls written so far.
+    """
+    def __init__(self, path, batch_size=65536):
+        if batch_size <= 0:
+            raise ValueError("batch_size must be greater than 0")
+        self.path = path
+        self.batch_size = batch_size
+        self.rows_written = 0
+        self._columns = self._new_batch()
+
+    @staticmethod
+    def _new_batch():
+        return {name: array(typecode) if typecode else [] for name, typecode in TRACE_COLUMNS}
+
+    def __len__(self):
+        return len(self._columns["loop_number"])
+
+    def add(self, arrival_time, loop_number, call_number, outcome, role="", agent="", wait_time=0, call_duration=0, escalations=0):
+        """Adds a call to the trace.
+
+        Args:
+            arrival_time (float): Simulated time at which the call arrived.
+            loop_number (int): Number of the call wave.
+            call_number (int): Number of the call in its wave.
+            outcome (str): OUTCOME_ANSWERED, OUTCOME_DROPPED or OUTCOME_ABANDONED.
+            role (str): Role, or routing tier, of the employee who answered.
+            agent (str): Name of the employee who answered.
+            wait_time (float): Seconds the call waited before it was answered, dropped or abandoned.
+            call_duration (float): Seconds on the phone, 0 for an unanswered call.
+            escalations (int): Number of tiers the call was escalated past, or tried when unanswered.
+        """
+        columns = self._columns
+        columns["arrival_time"].append(arrival_time)
+        columns["loop_number"].append(loop_number)
+        columns["call_number"].append(call_number)
+        columns["outcome"].append(outcome)
+        columns["role"].append(role)
+        columns["agent"].append(agent)
+        columns["wait_time"].append(wait_time)
+        columns["call_duration"].append(call_duration)
+        columns["escalations"].append(escalations)
+        if len(columns["loop_number"]) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered calls."""
+        if len(self):
+            self._write_batch(self._columns)
+            self.rows_written += len(self)
+            self._columns = self._new_batch()
+
+    @abc.abstractmethod
+    def _write_batch(self, columns):
+        """Writes a batch of calls.
+
+        Args:
+            columns (dict): The columns of the batch mapped by TRACE_COLUMNS name.
+        """
+
+    def close(self):
+        """Writes the buffered calls and releases the file."""
+        self.flush()
+
+
+class CsvTraceWriter(CallTraceWriter):
+    """Writes the trace as CSV rows with a header line."""
+    def __init__(self, path, batch_size=65536):
+        super().__init__(path, batch_size)
+        self._file = open(path, "w", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow([name for name, _ in TRACE_COLUMNS])
+
+    def _write_batch(self, columns):
+        self._writer.writerows(zip(*(columns[name] for name, _ in TRACE_COLUMNS)))
+
+    def close(self):
+        if self._file.closed:
+            return
+        try:
+            self.flush()
+        finally:
+            self._file.close()
+
+
+class ParquetTraceWriter(CallTraceWriter):
+    """Writes the trace as a Parquet file, one row group per batch. Requires pyarrow."""
+    def __init__(self, path, batch_size=65536):
+        # pyarrow is optional and slow to import, it is only loaded for Parquet traces
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise ImportError("Parquet traces require pyarrow, install it or write a CSV trace") from e
+        super().__init__(path, batch_size)
+        self._pyarrow = pyarrow
+        types = {"d": pyarrow.float64(), "q": pyarrow.int64(), None: pyarrow.string()}
+        self._schema = pyarrow.schema([(name, types[typecode]) for name, typecode in TRACE_COLUMNS])
+        self._writer = pyarrow.parquet.ParquetWriter(path, self._schema)
+        self._closed = False
+
+    def _write_batch(self, columns):
+        table = self._pyarrow.Table.from_pydict({name: columns[name] for name, _ in TRACE_COLUMNS}, schema=self._schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._closed:
+            return
+        try:
+            self.flush()
+        finally:
+            self._writer.close()
+            self._closed = True
+
+
+def open_trace_writer(path, batch_size=65536):
+    """Opens the trace writer matching the extension of path.
+
+    Args:
+        path (str): Path of the trace file, ".parquet" for Parquet, CSV otherwise.
+        batch_size (int): Number of calls buffered before a batch is written.
+
+    Returns:
+        CallTraceWriter: The trace writer.
+    """
+    if path.endswith(".parquet"):
+        return ParquetTraceWriter(path, batch_size)
+    return CsvTraceWriter(path, batch_size)
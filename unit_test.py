@@ -1,6 +1,42 @@
+import io
+import sys
+import asyncio
+import os
+import time
+import tempfile
+import threading
+import csv
+import random
+import itertools
 import unittest
-from unittest.mock import patch
-from call_center_simulation import Employee, Fresher, CallStatistics, CallCenterSimulation, TechnicalLead, ProjectManager, find_free_fresher_index
+import json
+import math
+import pickle
+import urllib.request
+import urllib.error
+from unittest.mock import patch, MagicMock
+try:
+    import numpy
+    from monte_carlo import run_monte_carlo
+except ImportError:
+    numpy = None
+try:
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+from arrivals import poisson_arrivals, piecewise_poisson_arrivals, replay_arrivals, replay_process, poisson_process, call_detail_record_process, read_call_detail_records
+from instrumentation import Metrics, InstrumentedLock
+from trace_export import CallTraceWriter, CsvTraceWriter, ParquetTraceWriter, TRACE_COLUMNS
+from erlang import erlang_b, erlang_c, estimate, minimum_freshers, cross_check
+from sweep import ResultCache, grid_points, sweep, optimize_staffing, drop_rate
+from benchmark_suite import compare_to_baseline, bench_statistics_updates
+from monitor import SimulationMonitor, MonitorServer
+from multisite import Site, run_multisite
+from checkpoint import FRAME_HEADER, CheckpointWriter, read_last_checkpoint
+from histograms import StreamingHistogram
+from schedules import Shift, ShiftSchedule, read_shift_schedule, AVAILABLE, ON_BREAK, OFF_SHIFT
+from stress import merge_summaries, parallel_stress_test_call_center
+from call_center_simulation import Employee, Fresher, CallStatistics, CallCenterSimulation, TechnicalLead, ProjectManager, find_free_fresher_index, EmployeeState, WorkerPool, IdleAgentIndex, OutstandingCalls, NullEventSink, BufferedEventSink, BatchedFileEventSink, ConsoleEventSink, create_random_streams, Clock, CallQueue, RoutingTier, SkillRouter, default_routing_tiers, FRESHER, TECHNICAL_LEAD, MAX_LISTED_FRESHERS
 
 class EmployeeTest(unittest.TestCase):
 
@@ -220,6 +256,30 @@ class CallStatisticsTest(unittest.TestCase):
         self.assertEqual(mock_stdout.getvalue(), expected_output)
         sys.__stdout__.write('CallStatistics.print_summary... passed\n\n')
 
+    @patch('sys.stdout', new_callable=io.StringIO)
+    def test_print_summary_of_many_freshers(self, mock_stdout):
+        """
+        Test that print_summary adds up the freshers of a large team.
+
+        Assertions:
+            - Beyond MAX_LISTED_FRESHERS freshers, one line gives their total.
+            - per_agent=True lists every fresher.
+        """
+        call_statistics = CallStatistics(MAX_LISTED_FRESHERS + 1)
+        call_statistics.add_fresher_call(0, 30)
+        call_statistics.add_fresher_call(5, 20)
+        call_statistics.print_summary()
+        lines = mock_stdout.getvalue().splitlines()
+        self.assertIn(f"{MAX_LISTED_FRESHERS + 1} freshers: answered 2 calls and spent 50 seconds on the phone.", lines)
+        self.assertFalse(any(line.startswith("fresher ") for line in lines))
+
+        mock_stdout.truncate(0)
+        mock_stdout.seek(0)
+        call_statistics.print_summary(per_agent=True)
+        self.assertEqual(sum(line.startswith("fresher ") for line in mock_stdout.getvalue().splitlines()),
+                         MAX_LISTED_FRESHERS + 1)
+        sys.__stdout__.write('CallStatistics.print_summary of many freshers... passed\n\n')
+
     def test_prtest_run_simulation(self):
 
         """
@@ -259,6 +319,1633 @@ class CallStatisticsTest(unittest.TestCase):
         pass
 
 
+class ShardedCallStatisticsTest(unittest.TestCase):
+
+    def test_shards_merged_on_read(self):
+
+        """
+        Test that the updates of several threads are kept in separate shards and merged on read.
+
+        Assertions:
+            - Each thread got its own shard.
+            - The merged counters add up the updates of every thread.
+        """
+        call_statistics = CallStatistics(2)
+
+        def add_calls():
+            for _ in range(1000):
+                call_statistics.add_fresher_call(1, 2)
+                call_statistics.add_technical_lead_call(3)
+
+        threads = [threading.Thread(target=add_calls) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        call_statistics.add_dropped_call()
+
+        self.assertEqual(len(call_statistics._shards), 5)
+        self.assertEqual(call_statistics.fresher_statistics[0], {'counter': 0, 'call_duration': 0})
+        self.assertEqual(call_statistics.fresher_statistics[1], {'counter': 4000, 'call_duration': 8000})
+        self.assertEqual(call_statistics.technical_lead_counter, 4000)
+        self.assertEqual(call_statistics.technical_lead_call_duration, 12000)
+        self.assertEqual(call_statistics.dropped_calls, 1)
+        print('CallStatistics shards... passed\n')
+
+    def test_call_records(self):
+
+        """
+        Test the columnar per call records of the CallStatistics class.
+
+        Assertions:
+            - Role, wait time and handle time are kept for every call when enabled.
+            - The counters grow past the preallocated freshers.
+        """
+        call_statistics = CallStatistics(1, record_calls=True)
+        call_statistics.add_fresher_call(3, 10, wait_time=1.5)
+        call_statistics.add_project_manager_call(20)
+        call_statistics.add_dropped_call(wait_time=4)
+        records = call_statistics.call_records()
+        self.assertEqual(list(records['role']), [0, 2, -1])
+        self.assertEqual(list(records['wait_time']), [1.5, 0, 4])
+        self.assertEqual(list(records['handle_time']), [10, 20, 0])
+        self.assertEqual(call_statistics.fresher_statistics[3]['counter'], 1)
+        self.assertEqual(len(CallStatistics(1).call_records()['role']), 0)
+        print('CallStatistics.call_records... passed\n')
+
+
+class EventDrivenSimulationTest(unittest.TestCase):
+
+    def test_run_simulation_event_mode(self):
+
+        """
+        Test the event mode of the run_simulation method.
+
+        It ensures that a full simulated day is processed on the virtual clock and that
+        a fresher who hangs up at the start of a wave can take a call of that wave.
+
+        Assertions:
+            - The fresher answered one call per simulated second.
+            - The technical lead and the project manager were never needed.
+        """
+        call_center_simulation = CallCenterSimulation(NullEventSink())
+        call_center_simulation.set(1, 86400, (1, 1), (1, 1), (1, 1))
+        self.assertTrue(call_center_simulation.run_simulation("event"))
+        self.assertEqual(call_center_simulation.call_statistics.fresher_statistics[0]['counter'], 86400)
+        self.assertEqual(call_center_simulation.call_statistics.technical_lead_counter, 0)
+        self.assertEqual(call_center_simulation.call_statistics.project_manager_counter, 0)
+        print('CallCenterSimulation.run_simulation (event)... passed\n')
+
+    def test_event_mode_escalation(self):
+
+        """
+        Test the escalation of the event mode.
+
+        It ensures that calls overflow from the fresher to the technical lead and the
+        project manager, and that further calls are dropped.
+
+        Assertions:
+            - Each employee answered one call per wave.
+        """
+        call_center_simulation = CallCenterSimulation()
+        call_center_simulation.set(1, 30, (4, 4), (10, 10), (10, 10))
+        call_center_simulation.run_simulation("event")
+        self.assertEqual(call_center_simulation.call_statistics.fresher_statistics[0]['call_duration'], 30)
+        self.assertEqual(call_center_simulation.call_statistics.technical_lead_counter, 3)
+        self.assertEqual(call_center_simulation.call_statistics.project_manager_counter, 3)
+        self.assertEqual(call_center_simulation.simulated_time, 30)
+        print('CallCenterSimulation.run_simulation (event escalation)... passed\n')
+
+    def test_event_mode_zero_interval(self):
+
+        """
+        Test that the event mode rejects a zero sleep interval, which would never advance the clock.
+        """
+        call_center_simulation = CallCenterSimulation()
+        call_center_simulation.set(1, 10, (1, 1), (0, 0), (1, 1))
+        with self.assertRaises(ValueError):
+            call_center_simulation.run_simulation("event")
+        print('CallCenterSimulation.run_simulation (event zero interval)... passed\n')
+
+
+class WorkerPoolTest(unittest.TestCase):
+
+    @patch('call_center_simulation.time.sleep')
+    def test_submit(self, mock_sleep):
+
+        """
+        Test that a worker pool handles a queued call and frees the employee.
+
+        Assertions:
+            - The call slept for its duration on a pool worker.
+            - The employee record is free again after the call.
+        """
+        employee = EmployeeState("fresher 1")
+        employee.busy = True
+        pool = WorkerPool(2)
+        pool.submit(employee, 7)
+        pool.join()
+        pool.shutdown()
+        mock_sleep.assert_called_once_with(7)
+        self.assertFalse(employee.busy)
+        self.assertFalse(any(worker.is_alive() for worker in pool.workers))
+        print('WorkerPool.submit... passed\n')
+
+    def test_run_simulation_pool_mode(self):
+
+        """
+        Test the pool mode of the run_simulation method.
+
+        Assertions:
+            - The wave escalated from the fresher to the technical lead and the project manager.
+        """
+        call_center_simulation = CallCenterSimulation()
+        call_center_simulation.set(1, 1, (3, 3), (1, 1), (1, 1))
+        self.assertTrue(call_center_simulation.run_simulation("pool"))
+        self.assertEqual(call_center_simulation.call_statistics.fresher_statistics[0]['counter'], 1)
+        self.assertEqual(call_center_simulation.call_statistics.technical_lead_counter, 1)
+        self.assertEqual(call_center_simulation.call_statistics.project_manager_counter, 1)
+        print('CallCenterSimulation.run_simulation (pool)... passed\n')
+
+
+class IdleAgentIndexTest(unittest.TestCase):
+
+    def test_first_free(self):
+
+        """
+        Test the "first_free" policy of the IdleAgentIndex class.
+
+        Assertions:
+            - The lowest idle index is picked, also after a release.
+            - -1 is returned when every agent is busy.
+        """
+        idle = IdleAgentIndex(3)
+        self.assertEqual([idle.acquire(), idle.acquire(), idle.acquire(), idle.acquire()], [0, 1, 2, -1])
+        idle.release(2)
+        idle.release(0)
+        self.assertEqual(idle.acquire(), 0)
+        self.assertEqual(len(idle), 1)
+        print('IdleAgentIndex first_free... passed\n')
+
+    def test_longest_idle(self):
+
+        """
+        Test the "longest_idle" policy of the IdleAgentIndex class.
+
+        Assertions:
+            - The agent who hung up first is picked first.
+        """
+        idle = IdleAgentIndex(3, "longest_idle")
+        for _ in range(3):
+            idle.acquire()
+        idle.release(2)
+        idle.release(0)
+        self.assertEqual(idle.acquire(), 2)
+        self.assertEqual(idle.acquire(), 0)
+        print('IdleAgentIndex longest_idle... passed\n')
+
+    def test_least_calls(self):
+
+        """
+        Test the "least_calls" policy of the IdleAgentIndex class.
+
+        Assertions:
+            - The idle agent with the fewest handled calls is picked.
+        """
+        idle = IdleAgentIndex(2, "least_calls")
+        idle.release(idle.acquire())
+        self.assertEqual(idle.acquire(), 1)
+        idle.release(1)
+        self.assertEqual(idle.calls_handled, [1, 1])
+        self.assertEqual(idle.acquire(), 0)
+        print('IdleAgentIndex least_calls... passed\n')
+
+    def test_find_free_fresher_index(self):
+
+        """
+        Test that find_free_fresher_index takes the fresher from an IdleAgentIndex.
+        """
+        idle = IdleAgentIndex(1)
+        self.assertEqual(find_free_fresher_index(idle), 0)
+        self.assertEqual(find_free_fresher_index(idle), -1)
+        print('find_free_fresher_index (IdleAgentIndex)... passed\n')
+
+    def test_invalid_policy(self):
+
+        """
+        Test that an unknown policy is rejected by IdleAgentIndex and CallCenterSimulation.set.
+        """
+        with self.assertRaises(ValueError):
+            IdleAgentIndex(1, "random")
+        with self.assertRaises(ValueError):
+            CallCenterSimulation().set(1, 1, (1, 1), (1, 1), (1, 1), "random")
+        print('IdleAgentIndex invalid policy... passed\n')
+
+    def test_set_available(self):
+
+        """
+        Test taking agents out of the IdleAgentIndex for a break or the end of a shift.
+
+        Assertions:
+            - An idle agent made unavailable is not picked until it is available again.
+            - An agent made unavailable during a call leaves the index when it hangs up.
+            - An agent available again before hanging up is released as usual.
+            - Agents unavailable at creation are left out, and an agent away and back is not indexed twice.
+            - An agent back from a break is the last longest idle agent.
+        """
+        for policy in ("first_free", "longest_idle", "least_calls"):
+            idle = IdleAgentIndex(3, policy)
+            idle.set_available(1, False)
+            picked = {idle.acquire(), idle.acquire()}
+            self.assertEqual(picked, {0, 2})
+            self.assertEqual(idle.acquire(), -1)
+            idle.set_available(0, False)
+            idle.set_available(2, False)
+            idle.set_available(2, True)
+            idle.release(0)
+            idle.release(2)
+            self.assertEqual(len(idle), 1)
+            self.assertEqual(idle.busy_flags(), [False, False, False])
+            idle.set_available(1, True)
+            self.assertEqual(sorted([idle.acquire(), idle.acquire()]), [1, 2])
+            idle = IdleAgentIndex(3, policy, unavailable={0, 2})
+            self.assertEqual(len(idle), 1)
+            idle.set_available(1, False)
+            idle.set_available(1, True)
+            idle.set_available(2, True)
+            self.assertEqual(len(idle), 2)
+            self.assertEqual(sorted([idle.acquire(), idle.acquire(), idle.acquire()]), [-1, 1, 2])
+        idle = IdleAgentIndex(3, "longest_idle")
+        idle.set_available(0, False)
+        idle.set_available(0, True)
+        self.assertEqual(len(idle), 3)
+        self.assertEqual([idle.acquire() for _ in range(4)], [1, 2, 0, -1])
+        print('IdleAgentIndex set_available... passed\n')
+
+
+class AsyncSimulationTest(unittest.TestCase):
+
+    def test_run_simulation_async(self):
+
+        """
+        Test the run_simulation_async method of the CallCenterSimulation class.
+
+        Assertions:
+            - The wave escalated from the fresher to the technical lead and the project manager.
+        """
+        call_center_simulation = CallCenterSimulation()
+        call_center_simulation.set(1, 1, (3, 3), (1, 1), (1, 1))
+        self.assertTrue(asyncio.run(call_center_simulation.run_simulation_async()))
+        self.assertEqual(call_center_simulation.call_statistics.fresher_statistics[0]['counter'], 1)
+        self.assertEqual(call_center_simulation.call_statistics.technical_lead_counter, 1)
+        self.assertEqual(call_center_simulation.call_statistics.project_manager_counter, 1)
+        print('CallCenterSimulation.run_simulation_async... passed\n')
+
+    def test_async_mode_many_freshers(self):
+
+        """
+        Test that the async mode handles more concurrent calls than the threaded modes allow.
+
+        Assertions:
+            - Every call of the wave is answered by a fresher.
+            - The threaded modes reject the same number of freshers.
+        """
+        call_center_simulation = CallCenterSimulation(NullEventSink())
+        call_center_simulation.set(10000, 1, (10000, 10000), (1, 1), (1, 1))
+        self.assertTrue(call_center_simulation.run_simulation("async"))
+        self.assertEqual(sum(stats['counter'] for stats in call_center_simulation.call_statistics.fresher_statistics.values()), 10000)
+        with self.assertRaises(ValueError):
+            call_center_simulation.run_simulation("thread")
+        print('CallCenterSimulation.run_simulation (async)... passed\n')
+
+    def test_cancelled_call(self):
+
+        """
+        Test that a call coroutine of the async mode frees its employee when it does not complete.
+
+        Assertions:
+            - The hang-up callback runs when the coroutine is cancelled.
+            - The hang-up callback runs when the event sink raises.
+        """
+        call_center_simulation = CallCenterSimulation(NullEventSink())
+        call_center_simulation.set(1, 1, (1, 1), (1, 1), (1, 1))
+        hung_up = []
+
+        async def cancel_call():
+            call = asyncio.ensure_future(call_center_simulation._handle_call_async("fresher 1", 60, lambda: hung_up.append(1)))
+            await asyncio.sleep(0)
+            call.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await call
+
+        asyncio.run(cancel_call())
+        self.assertEqual(hung_up, [1])
+
+        with patch.object(NullEventSink, 'hung_up', side_effect=RuntimeError("sink failed")):
+            with self.assertRaises(RuntimeError):
+                asyncio.run(call_center_simulation._handle_call_async("fresher 1", 0, lambda: hung_up.append(2)))
+        self.assertEqual(hung_up, [1, 2])
+        print('CallCenterSimulation cancelled async call... passed\n')
+
+
+class OutstandingCallsTest(unittest.TestCase):
+
+    def test_wait(self):
+
+        """
+        Test the wait method of the OutstandingCalls class.
+
+        Assertions:
+            - wait times out while a call is in progress.
+            - wait returns once the last call hangs up.
+        """
+        outstanding_calls = OutstandingCalls()
+        self.assertTrue(outstanding_calls.wait(0))
+        outstanding_calls.start()
+        outstanding_calls.start()
+        self.assertFalse(outstanding_calls.wait(0))
+        outstanding_calls.finish()
+        threading.Timer(0.1, outstanding_calls.finish).start()
+        self.assertTrue(outstanding_calls.wait(5))
+        self.assertEqual(outstanding_calls.count, 0)
+        print('OutstandingCalls.wait... passed\n')
+
+    def test_run_simulation_shutdown(self):
+
+        """
+        Test that the thread mode returns as soon as the last call hangs up.
+
+        Assertions:
+            - The run takes about run_time plus the last call, without a safety margin.
+            - The wave escalated from the fresher to the technical lead and the project manager.
+        """
+        call_center_simulation = CallCenterSimulation()
+        call_center_simulation.set(1, 1, (3, 3), (1, 1), (1, 1))
+        start = time.time()
+        self.assertTrue(call_center_simulation.run_simulation())
+        self.assertLess(time.time() - start, 5)
+        self.assertEqual(call_center_simulation.call_statistics.technical_lead_counter, 1)
+        self.assertEqual(call_center_simulation.call_statistics.project_manager_counter, 1)
+        self.assertEqual(call_center_simulation.outstanding_calls.count, 0)
+        print('CallCenterSimulation._finish_remaining_calls... passed\n')
+
+    def test_failed_assignment(self):
+
+        """
+        Test that a call whose employee thread cannot be started is not left in progress.
+
+        Assertions:
+            - The exception of the assignment is passed on.
+            - The call is closed and the fresher is idle again, so waiting for the calls returns.
+            - A call whose thread started is only closed by the thread when the assignment raises afterwards.
+        """
+        call_center_simulation = CallCenterSimulation(NullEventSink())
+        call_center_simulation.set(1, 1, (1, 1), (1, 1), (1, 1))
+        call_center_simulation.random_streams = call_center_simulation._create_random_streams()
+        freshers, technical_lead, project_manager = call_center_simulation._initialize_employees()
+        idle_freshers = IdleAgentIndex(1)
+        with patch.object(Fresher, 'start', side_effect=RuntimeError("can't start new thread")):
+            with self.assertRaises(RuntimeError):
+                call_center_simulation._process_call_wave(1, freshers, idle_freshers, technical_lead, project_manager)
+        self.assertEqual(call_center_simulation.outstanding_calls.count, 0)
+        self.assertTrue(call_center_simulation.outstanding_calls.wait(0))
+        self.assertEqual(len(idle_freshers), 1)
+
+        with patch.object(CallStatistics, 'add_fresher_call', side_effect=RuntimeError("statistics failed")):
+            with self.assertRaises(RuntimeError):
+                call_center_simulation._process_call_wave(2, freshers, idle_freshers, technical_lead, project_manager)
+        self.assertTrue(call_center_simulation.outstanding_calls.wait(5))
+        freshers[0].join()
+        self.assertEqual(call_center_simulation.outstanding_calls.count, 0)
+        self.assertEqual(len(idle_freshers), 1)
+        print('CallCenterSimulation failed assignment... passed\n')
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class MonteCarloTest(unittest.TestCase):
+
+    def test_run_monte_carlo(self):
+
+        """
+        Test the run_monte_carlo function against the event mode.
+
+        It ensures that every replication of a configuration without randomness gives the
+        statistics of the event mode, including the dropped calls.
+
+        Assertions:
+            - The per role arrays match the CallStatistics of the event mode.
+        """
+        call_center_simulation = CallCenterSimulation()
+        call_center_simulation.set(2, 30, (5, 5), (10, 10), (10, 10))
+        call_center_simulation.run_simulation("event")
+        call_statistics = call_center_simulation.call_statistics
+
+        result = run_monte_carlo(call_center_simulation, 4, seed=1)
+        for replication in range(4):
+            self.assertEqual(list(result.fresher_counter[replication]), [stats['counter'] for stats in call_statistics.fresher_statistics.values()])
+            self.assertEqual(list(result.fresher_call_duration[replication]), [stats['call_duration'] for stats in call_statistics.fresher_statistics.values()])
+        self.assertTrue((result.technical_lead_counter == call_statistics.technical_lead_counter).all())
+        self.assertTrue((result.project_manager_call_duration == call_statistics.project_manager_call_duration).all())
+        self.assertTrue((result.dropped_calls == call_statistics.dropped_calls).all())
+        self.assertTrue((result.drop_rate() == 0.2).all())
+        print('run_monte_carlo... passed\n')
+
+    def test_run_monte_carlo_seed(self):
+
+        """
+        Test that run_monte_carlo is reproducible with a seed.
+        """
+        call_center_simulation = CallCenterSimulation()
+        call_center_simulation.set(10, 60, (1, 20), (1, 5), (5, 30))
+        first = run_monte_carlo(call_center_simulation, 50, seed=7)
+        second = run_monte_carlo(call_center_simulation, 50, seed=7)
+        self.assertTrue((first.fresher_call_duration == second.fresher_call_duration).all())
+        self.assertTrue((first.dropped_calls == second.dropped_calls).all())
+        print('run_monte_carlo (seed)... passed\n')
+
+
+class ParallelStressTest(unittest.TestCase):
+
+    def test_merge_summaries(self):
+
+        """
+        Test the merge_summaries function.
+
+        Assertions:
+            - The mean, total and 95% confidence half width are computed per figure.
+        """
+        merged = merge_summaries([{'dropped_calls': 1}, {'dropped_calls': 3}])
+        self.assertEqual(merged['dropped_calls']['mean'], 2)
+        self.assertEqual(merged['dropped_calls']['total'], 4)
+        self.assertAlmostEqual(merged['dropped_calls']['half_width'], 1.96)
+        self.assertEqual(merge_summaries([{'dropped_calls': 5}])['dropped_calls']['half_width'], 0)
+        print('merge_summaries... passed\n')
+
+    def test_parallel_stress_test_call_center(self):
+
+        """
+        Test that the parallel replications are reproducible whatever the number of workers.
+        """
+        parameters = (5, 60, (1, 10), (1, 5), (5, 20))
+        first = parallel_stress_test_call_center(parameters, 6, seed=3, max_workers=2)
+        second = parallel_stress_test_call_center(parameters, 6, seed=3, max_workers=1)
+        self.assertEqual(first, second)
+        self.assertGreater(first['fresher_counter']['total'], 0)
+        print('parallel_stress_test_call_center... passed\n')
+
+
+class EventSinkTest(unittest.TestCase):
+
+    def test_buffered_event_sink(self):
+
+        """
+        Test the events of a run recorded by the BufferedEventSink class.
+
+        Assertions:
+            - The wave, the arrivals, the escalations, the rejection and the hang-ups are recorded in order.
+        """
+        event_sink = BufferedEventSink()
+        call_center_simulation = CallCenterSimulation(event_sink)
+        call_center_simulation.set(1, 1, (4, 4), (1, 1), (1, 1))
+        call_center_simulation.run_simulation("event")
+        self.assertEqual(list(event_sink.events), [
+            ("wave_arrived", 1, 4),
+            ("call_arrived", 1, 1),
+            ("assigned", "fresher 1", 1),
+            ("call_arrived", 1, 2),
+            ("escalated", "technical lead", None),
+            ("assigned", "technical lead", 1),
+            ("call_arrived", 1, 3),
+            ("escalated", "project manager", "technical lead"),
+            ("assigned", "project manager", 1),
+            ("call_arrived", 1, 4),
+            ("rejected", "project manager"),
+            ("next_wave", 1),
+            ("hung_up", "fresher 1"),
+            ("hung_up", "technical lead"),
+            ("hung_up", "project manager"),
+        ])
+        print('BufferedEventSink... passed\n')
+
+    def test_batched_file_event_sink(self):
+
+        """
+        Test that the BatchedFileEventSink class writes the events in batches.
+
+        Assertions:
+            - Nothing is written before a batch is full.
+            - Every event is written once the sink is closed.
+        """
+        path = os.path.join(tempfile.mkdtemp(), "events.csv")
+        event_sink = BatchedFileEventSink(path, batch_size=3)
+        event_sink.hung_up("fresher 1")
+        event_sink.hung_up("fresher 2")
+        with open(path) as events_file:
+            self.assertEqual(events_file.read(), "")
+        event_sink.rejected("project manager")
+        event_sink.next_wave(5)
+        event_sink.close()
+        with open(path) as events_file:
+            self.assertEqual(events_file.read().splitlines(), ["hung_up,fresher 1", "hung_up,fresher 2", "rejected,project manager", "next_wave,5"])
+        print('BatchedFileEventSink... passed\n')
+
+    @patch('sys.stdout', new_callable=io.StringIO)
+    def test_console_event_sink(self, mock_stdout):
+
+        """
+        Test the human readable log of the ConsoleEventSink class.
+        """
+        event_sink = ConsoleEventSink()
+        event_sink.escalated("technical lead")
+        event_sink.rejected("project manager")
+        self.assertEqual(mock_stdout.getvalue(), (
+            "All freshers are busy, call is being forwarded to the technical lead.\n"
+            "project manager is busy.\n"
+            "All lines are busy. Please try again later.\n"
+            "----------------------------------------------\n"
+        ))
+        sys.__stdout__.write('ConsoleEventSink... passed\n\n')
+
+
+class RandomStreamsTest(unittest.TestCase):
+
+    def test_seeded_runs_are_reproducible(self):
+
+        """
+        Test that the seed of CallCenterSimulation.set reproduces a run.
+
+        Assertions:
+            - Two runs with the same seed give the same statistics and events.
+            - Running a simulation again starts its streams over.
+            - Another seed gives another run.
+        """
+        runs = []
+        for seed in (42, 42, 43):
+            event_sink = BufferedEventSink()
+            call_center_simulation = CallCenterSimulation(event_sink)
+            call_center_simulation.set(5, 600, (1, 10), (1, 20), (5, 60), seed=seed)
+            call_center_simulation.run_simulation("event")
+            runs.append((call_center_simulation.call_statistics.summary(), list(event_sink.events)))
+        self.assertEqual(runs[0], runs[1])
+        self.assertNotEqual(runs[0][1], runs[2][1])
+
+        call_center_simulation.event_sink = BufferedEventSink()
+        call_center_simulation.set(5, 600, (1, 10), (1, 20), (5, 60), seed=42)
+        call_center_simulation.run_simulation("event")
+        self.assertEqual(list(call_center_simulation.event_sink.events), runs[0][1])
+        print('CallCenterSimulation seed... passed\n')
+
+    def test_role_streams_are_independent(self):
+
+        """
+        Test that the streams of create_random_streams are independent.
+
+        Assertions:
+            - Drawing from one role stream does not change the draws of another.
+        """
+        first = create_random_streams(7)
+        second = create_random_streams(7)
+        for _ in range(100):
+            first[FRESHER].random()
+        self.assertEqual(first[TECHNICAL_LEAD].random(), second[TECHNICAL_LEAD].random())
+        self.assertNotEqual(first[FRESHER].random(), first[TECHNICAL_LEAD].random())
+        print('create_random_streams... passed\n')
+
+
+class CallQueueTest(unittest.TestCase):
+
+    def test_disciplines(self):
+
+        """
+        Test the order in which CallQueue hands out waiting calls.
+
+        Assertions:
+            - The fifo discipline answers the oldest call first.
+            - The priority discipline answers the lowest priority class first.
+            - A removed call is skipped and the queue reports its length and capacity.
+        """
+        call_queue = CallQueue(3)
+        for call_id in range(3):
+            call_queue.put(call_id, (call_id, call_id, 1, call_id + 1))
+        self.assertTrue(call_queue.is_full())
+        self.assertEqual(call_queue.remove(3, 0)[0], 0)
+        self.assertEqual(len(call_queue), 2)
+        self.assertEqual(call_queue.get(4)[0], 1)
+
+        call_queue = CallQueue(3, "priority")
+        for call_id, priority in enumerate((1, 0, 1)):
+            call_queue.put(0, (call_id, 0, 1, call_id + 1), priority)
+        self.assertEqual([call_queue.get(1)[0] for _ in range(3)], [1, 0, 2])
+        self.assertIsNone(call_queue.get(1))
+        call_queue.close(2)
+        self.assertEqual(call_queue.length_time, {0: 1, 1: 0, 2: 0, 3: 1})
+        print('CallQueue... passed\n')
+
+    def test_skills(self):
+
+        """
+        Test that a free employee gets the first waiting call it has the skills for.
+
+        Assertions:
+            - A call behind one needing other skills is taken, the other call keeps its place.
+            - An employee without the skills of any waiting call gets nothing.
+            - Abandoned calls are skipped in every set of skills.
+        """
+        for discipline in ("fifo", "priority"):
+            call_queue = CallQueue(4, discipline)
+            call_queue.put(0, (0, 0, 1, 1), 0, frozenset({"y"}))
+            call_queue.put(1, (1, 1, 1, 2), 0, frozenset({"x"}))
+            call_queue.put(2, (2, 2, 1, 3), 0, frozenset())
+            call_queue.put(3, (3, 3, 1, 4), 0, frozenset({"x"}))
+            self.assertEqual(call_queue.get(4, frozenset({"x"}))[0], 1)
+            self.assertEqual(call_queue.get(4, frozenset({"x"}))[0], 2)
+            self.assertIsNone(call_queue.get(4, frozenset({"z"})))
+            self.assertEqual(call_queue.remove(5, 0)[0], 0)
+            self.assertIsNone(call_queue.get(6, frozenset({"y"})))
+            self.assertEqual(call_queue.get(6)[0], 3)
+            self.assertEqual(len(call_queue), 0)
+        print('CallQueue skills... passed\n')
+
+    def test_queued_calls_are_answered(self):
+
+        """
+        Test the waiting queue of the event mode.
+
+        Assertions:
+            - Calls that find all lines busy wait instead of being dropped.
+            - Every call is answered or abandoned, and answered calls report their wait.
+            - Without a queue the same overflow is dropped.
+        """
+        call_center_simulation = CallCenterSimulation(NullEventSink())
+        call_center_simulation.set(1, 10, (5, 5), (20, 20), (4, 4), queue_capacity=10, seed=1)
+        call_center_simulation.run_simulation("event")
+        call_statistics = call_center_simulation.call_statistics
+        self.assertEqual(call_statistics.dropped_calls, 0)
+        self.assertEqual(call_statistics.answered_calls(), 5)
+        # The two queued calls wait until the three employees hang up at 4 seconds
+        self.assertAlmostEqual(call_statistics.average_speed_of_answer(), 8 / 5)
+        self.assertEqual(call_statistics.queue_length_percentile(0), 0)
+        self.assertEqual(call_statistics.queue_length_percentile(100), 2)
+
+        call_center_simulation.set(1, 10, (5, 5), (20, 20), (4, 4), seed=1)
+        call_center_simulation.run_simulation("event")
+        self.assertEqual(call_center_simulation.call_statistics.dropped_calls, 2)
+        print('CallCenterSimulation queue... passed\n')
+
+    def test_abandonment(self):
+
+        """
+        Test that impatient callers leave the queue.
+
+        Assertions:
+            - A caller whose patience runs out is counted as abandoned with its wait.
+            - Incoming calls add up to answered, dropped and abandoned calls.
+            - The waiting queue is refused by the real time modes.
+        """
+        event_sink = BufferedEventSink()
+        call_center_simulation = CallCenterSimulation(event_sink)
+        call_center_simulation.set(1, 10, (5, 5), (20, 20), (4, 4), queue_capacity=1, patience=lambda random_stream: 2, seed=1)
+        call_center_simulation.run_simulation("event")
+        call_statistics = call_center_simulation.call_statistics
+        self.assertEqual(call_statistics.abandoned_calls, 1)
+        self.assertEqual(call_statistics.dropped_calls, 1)
+        self.assertEqual(call_statistics.answered_calls(), 3)
+        self.assertAlmostEqual(call_statistics.abandonment_rate(), 1 / 5)
+        self.assertIn(("abandoned", 1, 4, 2), event_sink.events)
+
+        with self.assertRaises(ValueError):
+            call_center_simulation.run_simulation("pool")
+        with self.assertRaises(ValueError):
+            call_center_simulation.set(1, 10, (5, 5), (20, 20), (4, 4), queue_capacity=1, patience=0)
+        print('CallCenterSimulation abandonment... passed\n')
+
+
+class SkillRouterTest(unittest.TestCase):
+
+    def test_eligible_tiers(self):
+
+        """
+        Test the routing decisions of SkillRouter.
+
+        Assertions:
+            - A call goes to the first tier, in escalation order, having every required skill.
+            - A busy tier escalates the call to the next eligible tier.
+            - A call nobody can answer is not routed.
+        """
+        router = SkillRouter([RoutingTier("billing", 1, {"billing"}), RoutingTier("support", 2, {"billing", "network"})])
+        self.assertEqual(router.eligible_tiers(frozenset({"network"})), (1,))
+        self.assertEqual(router.acquire(frozenset({"billing"})), (0, 0))
+        self.assertEqual(router.acquire(frozenset({"billing"})), (1, 0))
+        self.assertEqual(router.acquire(frozenset({"network"})), (1, 1))
+        self.assertEqual(router.acquire(frozenset()), (-1, -1))
+        router.release(1, 0)
+        self.assertEqual(router.acquire(frozenset({"network"})), (1, 0))
+        self.assertEqual(router.acquire(frozenset({"legal"})), (-1, -1))
+        self.assertEqual(router.agent_names, [["billing"], ["support 1", "support 2"]])
+        self.assertEqual([tier.name for tier in default_routing_tiers(3)], [FRESHER, TECHNICAL_LEAD, "project manager"])
+        print('SkillRouter... passed\n')
+
+    def test_custom_tiers(self):
+
+        """
+        Test the event mode with custom routing tiers and call skills.
+
+        Assertions:
+            - Calls are only answered by tiers having their skills and counted per tier.
+            - Incoming calls add up to answered and dropped calls.
+            - The summary lists the custom tiers and not the built-in roles they replace.
+            - Custom routing is refused by the real time modes.
+        """
+        call_center_simulation = CallCenterSimulation(NullEventSink())
+        call_center_simulation.set(0, 200, (1, 5), (1, 5), (2, 8), seed=4,
+                                   routing_tiers=[RoutingTier("billing", 2, {"billing"}), RoutingTier("network", 3, {"network"})],
+                                   call_skills=[({"billing"}, 1), ({"network"}, 3)])
+        call_center_simulation.run_simulation("event")
+        call_statistics = call_center_simulation.call_statistics
+        tier_statistics = call_statistics.tier_statistics
+        self.assertEqual(set(tier_statistics), {"billing", "network"})
+        self.assertGreater(tier_statistics["network"]["counter"], tier_statistics["billing"]["counter"])
+        self.assertEqual(call_statistics.answered_calls(), tier_statistics["billing"]["counter"] + tier_statistics["network"]["counter"])
+        self.assertEqual(call_statistics.technical_lead_counter, 0)
+
+        with patch('sys.stdout', new_callable=io.StringIO) as mock_stdout:
+            call_statistics.print_summary()
+        summary = mock_stdout.getvalue()
+        self.assertIn(f'billing: answered {tier_statistics["billing"]["counter"]} calls', summary)
+        self.assertIn(f'network: answered {tier_statistics["network"]["counter"]} calls', summary)
+        self.assertNotIn('fresher', summary)
+        self.assertNotIn('Technical lead', summary)
+        self.assertNotIn('Project manager', summary)
+
+        with self.assertRaises(ValueError):
+            call_center_simulation.run_simulation("thread")
+        print('CallCenterSimulation routing tiers... passed\n')
+
+    def test_unanswerable_calls_are_dropped(self):
+
+        """
+        Test that a call no tier has the skills for is dropped rather than queued.
+
+        Assertions:
+            - Every arrived call is answered, dropped or abandoned.
+            - The calls needing a skill no tier has are all dropped.
+        """
+        event_sink = BufferedEventSink()
+        call_center_simulation = CallCenterSimulation(event_sink)
+        call_center_simulation.set(0, 100, (1, 1), (10, 10), (5, 5), seed=2, queue_capacity=5,
+                                   routing_tiers=[RoutingTier("billing", 1, {"billing"})],
+                                   call_skills=[({"billing"}, 1), ({"legal"}, 1)])
+        with patch('sys.stdout', new_callable=io.StringIO):
+            call_center_simulation.run_simulation("event")
+        call_statistics = call_center_simulation.call_statistics
+        arrived_calls = sum(event[0] == "call_arrived" for event in event_sink.events)
+        self.assertEqual(arrived_calls, 10)
+        self.assertEqual(call_statistics.answered_calls() + call_statistics.dropped_calls + call_statistics.abandoned_calls,
+                         arrived_calls)
+        self.assertGreater(call_statistics.dropped_calls, 0)
+        self.assertEqual(call_statistics.answered_calls(), call_statistics.tier_statistics["billing"]["counter"])
+        print('CallCenterSimulation unanswerable calls... passed\n')
+
+
+class TraceExportTest(unittest.TestCase):
+
+    def test_csv_batches(self):
+
+        """
+        Test that CsvTraceWriter writes its batches incrementally.
+
+        Assertions:
+            - A full batch is written and cleared from memory.
+            - Closing writes the remaining calls after the header line.
+            - A writer without _write_batch cannot be created.
+        """
+        path = os.path.join(tempfile.mkdtemp(), "trace.csv")
+        call_trace = CsvTraceWriter(path, batch_size=2)
+        for call_number in range(1, 4):
+            call_trace.add(0.0, 1, call_number, "answered", FRESHER, f"fresher {call_number}", 0.0, 5.0, 0)
+            self.assertLessEqual(len(call_trace), 1)
+        self.assertEqual(call_trace.rows_written, 2)
+        call_trace.close()
+        with open(path, newline="") as file:
+            rows = list(csv.reader(file))
+        self.assertEqual(rows[0], [name for name, _ in TRACE_COLUMNS])
+        self.assertEqual(rows[3][:6], ["0.0", "1", "3", "answered", FRESHER, "fresher 3"])
+
+        class UnwrittenTraceWriter(CallTraceWriter):
+            pass
+
+        with self.assertRaises(TypeError):
+            UnwrittenTraceWriter(path)
+        print('CsvTraceWriter... passed\n')
+
+    def test_event_mode_trace(self):
+
+        """
+        Test the call trace of the event mode.
+
+        Assertions:
+            - Every incoming call is traced once with its outcome.
+            - The trace is refused by the real time modes.
+        """
+        path = os.path.join(tempfile.mkdtemp(), "trace.csv")
+        call_trace = CsvTraceWriter(path, batch_size=16)
+        call_center_simulation = CallCenterSimulation(NullEventSink(), call_trace)
+        call_center_simulation.set(2, 300, (1, 6), (1, 5), (3, 9), seed=5, queue_capacity=2, patience=2)
+        call_center_simulation.run_simulation("event")
+        call_trace.close()
+        with open(path, newline="") as file:
+            outcomes = [row["outcome"] for row in csv.DictReader(file)]
+        call_statistics = call_center_simulation.call_statistics
+        self.assertEqual(outcomes.count("answered"), call_statistics.answered_calls())
+        self.assertEqual(outcomes.count("dropped"), call_statistics.dropped_calls)
+        self.assertEqual(outcomes.count("abandoned"), call_statistics.abandoned_calls)
+
+        with self.assertRaises(ValueError):
+            call_center_simulation.run_simulation("async")
+        print('CallCenterSimulation call trace... passed\n')
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_parquet(self):
+
+        """
+        Test that ParquetTraceWriter writes a row group per batch.
+
+        Assertions:
+            - The Parquet file holds every call with the trace columns.
+        """
+        path = os.path.join(tempfile.mkdtemp(), "trace.parquet")
+        call_trace = ParquetTraceWriter(path, batch_size=2)
+        for call_number in range(1, 4):
+            call_trace.add(0.0, 1, call_number, "dropped")
+        call_trace.close()
+        table = pyarrow.parquet.read_table(path)
+        self.assertEqual(table.num_rows, 3)
+        self.assertEqual(table.column_names, [name for name, _ in TRACE_COLUMNS])
+        print('ParquetTraceWriter... passed\n')
+
+
+class ArrivalsTest(unittest.TestCase):
+
+    def test_poisson_arrivals(self):
+
+        """
+        Test the Poisson arrival processes.
+
+        Assertions:
+            - Homogeneous arrivals are increasing with the requested mean rate.
+            - A piecewise schedule has no arrival during a segment of rate 0.
+            - The schedule is consumed lazily, an endless schedule can be used.
+        """
+        arrival_times = list(itertools.islice(poisson_arrivals(random.Random(1), 2.0), 20000))
+        self.assertEqual(arrival_times, sorted(arrival_times))
+        self.assertAlmostEqual(len(arrival_times) / arrival_times[-1], 2.0, delta=0.1)
+
+        schedule = [(0, 1.0), (10, 0), (20, 5.0)]
+        arrival_times = list(itertools.takewhile(lambda t: t < 30, piecewise_poisson_arrivals(random.Random(2), schedule)))
+        self.assertFalse([t for t in arrival_times if 10 <= t < 20])
+        self.assertGreater(len([t for t in arrival_times if t >= 20]), len([t for t in arrival_times if t < 10]))
+
+        endless_schedule = ((hour * 3600, 1.0 + hour % 2) for hour in itertools.count())
+        self.assertEqual(len(list(itertools.islice(piecewise_poisson_arrivals(random.Random(3), endless_schedule), 100))), 100)
+        print('Poisson arrivals... passed\n')
+
+    def test_replayed_arrivals(self):
+
+        """
+        Test the event mode with replayed arrival times.
+
+        Assertions:
+            - Every replayed arrival before the end of the run is one call.
+            - Arrival times going back in time are refused.
+        """
+        path = os.path.join(tempfile.mkdtemp(), "arrivals.csv")
+        with open(path, "w") as file:
+            file.write("# arrival_time\n0\n0\n1.5\n2\n9\n")
+        call_center_simulation = CallCenterSimulation(NullEventSink())
+        call_center_simulation.set(1, 5, (0, 0), (0, 0), (10, 10), arrival_process=replay_process(path))
+        call_center_simulation.run_simulation("event")
+        call_statistics = call_center_simulation.call_statistics
+        self.assertEqual(call_statistics.answered_calls(), 3)
+        self.assertEqual(call_statistics.dropped_calls, 1)
+
+        with self.assertRaises(ValueError):
+            list(replay_arrivals(None, [1, 0]))
+        print('Replayed arrivals... passed\n')
+
+    def test_call_detail_records(self):
+
+        """
+        Test the event mode replaying call detail records.
+
+        Assertions:
+            - Timestamps are measured from the first record and read across chunks.
+            - A row missing the handle time column is refused with its line number.
+            - Every answered call keeps its recorded handle time, a missing one is drawn.
+            - A queued call keeps its handle time, and a call trace replays as records.
+            - The replay may run for a month, and is refused by the other modes.
+        """
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "calls.csv")
+        with open(path, "w") as file:
+            file.write("arrival_time,handle_time,outcome\n2024-03-01T08:00:00,30,answered\n2024-03-01T08:00:10,45.5,answered\n"
+                       "2024-03-01T08:00:20,,abandoned\n2024-03-01T08:00:25,12,answered\n")
+        self.assertEqual(list(read_call_detail_records(path, chunk_size=1)),
+                         [(0.0, 30.0), (10.0, 45.5), (20.0, None), (25.0, 12.0)])
+        short_path = os.path.join(directory, "short.csv")
+        with open(short_path, "w") as file:
+            file.write("arrival_time,outcome,handle_time\n0,answered,30\n\n10,abandoned\n")
+        with self.assertRaisesRegex(ValueError, "line 4 has 2 columns"):
+            list(read_call_detail_records(short_path, chunk_size=1))
+
+        call_center_simulation = CallCenterSimulation(NullEventSink())
+        call_center_simulation.set(0, 100, (0, 0), (0, 0), (7, 7), record_calls=True, queue_capacity=5,
+                                   call_detail_records=call_detail_record_process(path, chunk_size=2))
+        call_center_simulation.run_simulation("event")
+        records = call_center_simulation.call_statistics.call_records()
+        self.assertEqual(sorted(records['handle_time']), [7.0, 12.0, 30.0, 45.5])
+        # The technical lead and the project manager answer the first two calls, the others wait
+        self.assertEqual(sorted(records['wait_time']), [0.0, 0.0, 10.0, 12.0])
+
+        trace_path = os.path.join(directory, "trace.csv")
+        call_trace = CsvTraceWriter(trace_path)
+        call_center_simulation = CallCenterSimulation(NullEventSink(), call_trace)
+        call_center_simulation.set(1, 2 * 86400, (0, 0), (0, 0), (1, 1), call_detail_records=call_detail_record_process(path))
+        call_center_simulation.run_simulation("event")
+        call_trace.close()
+        self.assertEqual([handle_time for _, handle_time in read_call_detail_records(trace_path)], [30.0, 45.5, 1.0, 12.0])
+
+        with self.assertRaises(ValueError):
+            call_center_simulation.run_simulation("pool")
+        with self.assertRaises(ValueError):
+            call_center_simulation.set(1, 2 * 86400, (0, 0), (0, 0), (1, 1))
+        with self.assertRaises(ValueError):
+            call_center_simulation.set(1, 100, (0, 0), (0, 0), (1, 1), arrival_process=replay_process(path),
+                                       call_detail_records=call_detail_record_process(path))
+        print('Call detail records... passed\n')
+
+
+class BenchmarkSuiteTest(unittest.TestCase):
+
+    def test_compare_to_baseline(self):
+
+        """
+        Test the regression check of the benchmark suite.
+
+        Assertions:
+            - A throughput falling past the threshold is a regression.
+            - Small losses, gains, memory figures and new benchmarks are not.
+        """
+        baseline = {"results": {
+            "event_mode[10]": {"value": 1000.0, "unit": "calls/s"},
+            "assign_calls[10]": {"value": 1000.0, "unit": "calls/s"},
+            "event_mode_peak_rss[10]": {"value": 1000, "unit": "KiB"},
+        }}
+        results = {"results": {
+            "event_mode[10]": {"value": 700.0, "unit": "calls/s"},
+            "assign_calls[10]": {"value": 900.0, "unit": "calls/s"},
+            "event_mode_peak_rss[10]": {"value": 5000, "unit": "KiB"},
+            "statistics_updates[10]": {"value": 1.0, "unit": "updates/s"},
+        }}
+        regressions = compare_to_baseline(results, baseline, threshold=0.2)
+        self.assertEqual([regression[0] for regression in regressions], ["event_mode[10]"])
+        self.assertAlmostEqual(regressions[0][3], -0.3)
+        self.assertGreater(bench_statistics_updates(10, operations=300), 0)
+        print('compare_to_baseline... passed\n')
+
+
+class InstrumentationTest(unittest.TestCase):
+
+    def test_instrumented_lock(self):
+
+        """
+        Test that InstrumentedLock observes the wait and hold times.
+
+        Assertions:
+            - Every acquisition is observed by the wait and hold histograms.
+            - The hold time covers the time the lock was held.
+        """
+        metrics = Metrics()
+        lock = InstrumentedLock(threading.Lock(), metrics, "test")
+        with lock:
+            time.sleep(0.01)
+        lock.acquire()
+        self.assertTrue(lock.locked())
+        lock.release()
+        self.assertEqual(metrics.histogram("lock_wait_seconds", lock="test").count, 2)
+        self.assertGreaterEqual(metrics.histogram("lock_hold_seconds", lock="test").sum, 0.01)
+        print('InstrumentedLock... passed\n')
+
+    @patch('call_center_simulation.time.sleep')
+    def test_simulation_metrics(self, mock_sleep):
+
+        """
+        Test the metrics of an instrumented threaded run and their export.
+
+        Assertions:
+            - The dispatch phases, the locks and the thread counts are measured.
+            - An uninstrumented simulation keeps its plain lock and sink.
+            - The metrics are exported as JSON and Prometheus text.
+        """
+        metrics = Metrics()
+        event_sink = BufferedEventSink()
+        call_center_simulation = CallCenterSimulation(event_sink, metrics=metrics)
+        call_center_simulation.set(3, 1, (5, 5), (1, 1), (0, 0))
+        with patch('call_center_simulation.time.time', side_effect=[0, 0, 2]):
+            call_center_simulation.run_simulation()
+        self.assertEqual(metrics.histogram("phase_seconds", phase="process_call_wave").count, 1)
+        self.assertEqual(metrics.histogram("phase_seconds", phase="find_free_fresher_index").count, 5)
+        assigned_calls = sum(metrics.histogram("phase_seconds", phase=phase).count
+                             for phase in ("assign_freshers", "assign_technical_lead", "assign_project_manager"))
+        self.assertEqual(assigned_calls + call_center_simulation.call_statistics.dropped_calls, 5)
+        self.assertEqual(metrics.histogram("lock_wait_seconds", lock="simulation").count, assigned_calls)
+        self.assertGreater(metrics.histogram("lock_hold_seconds", lock="employee").count, 0)
+        self.assertTrue(call_center_simulation.event_sink.events)
+        self.assertIs(CallCenterSimulation().event_sink.__class__, ConsoleEventSink)
+
+        snapshot = metrics.snapshot()
+        self.assertIn("threads_peak", [gauge["name"] for gauge in snapshot["gauges"]])
+        path = os.path.join(tempfile.mkdtemp(), "metrics.prom")
+        metrics.write(path)
+        with open(path) as file:
+            prometheus_text = file.read()
+        self.assertIn('call_center_phase_seconds_count{phase="process_call_wave"} 1', prometheus_text)
+        self.assertIn(f'call_center_lock_wait_seconds_bucket{{lock="simulation",le="+Inf"}} {assigned_calls}', prometheus_text)
+        print('CallCenterSimulation metrics... passed\n')
+
+
+class ErlangTest(unittest.TestCase):
+
+    def test_erlang_formulas(self):
+
+        """
+        Test the Erlang B and C formulas against hand computed values.
+
+        Assertions:
+            - Erlang B of one and two servers with one Erlang are 1/2 and 1/5.
+            - Erlang C of two servers with one Erlang is 1/3, and 1 for an overloaded system.
+        """
+        self.assertAlmostEqual(erlang_b(1, 1.0), 1 / 2)
+        self.assertAlmostEqual(erlang_b(2, 1.0), 1 / 5)
+        self.assertAlmostEqual(erlang_c(2, 1.0), 1 / 3)
+        self.assertEqual(erlang_c(2, 3.0), 1.0)
+        print('erlang_b, erlang_c... passed\n')
+
+    def test_staffing_and_cross_check(self):
+
+        """
+        Test the minimum staffing search and the cross check against the simulator.
+
+        Assertions:
+            - The minimum staffing meets the target and one fresher less does not.
+            - The analytic blocking is close to the simulated share of dropped calls.
+        """
+        call_center_simulation = CallCenterSimulation(NullEventSink())
+        call_center_simulation.set(20, 20000, (1, 5), (1, 3), (5, 20))
+        self.assertAlmostEqual(estimate(call_center_simulation)['offered_load'], 18.75)
+        number_of_freshers = minimum_freshers(call_center_simulation, 0.01)
+        self.assertLessEqual(erlang_b(number_of_freshers + 2, 18.75), 0.01)
+        self.assertGreater(erlang_b(number_of_freshers + 1, 18.75), 0.01)
+
+        analytic_blocking, simulated_blocking = cross_check(call_center_simulation, seed=1)
+        self.assertAlmostEqual(analytic_blocking, simulated_blocking, delta=0.02)
+        print('minimum_freshers, cross_check... passed\n')
+
+
+class SweepTest(unittest.TestCase):
+
+    def test_cached_sweep(self):
+
+        """
+        Test that a sweep reuses the cached points.
+
+        Assertions:
+            - Every point of the grid is returned in grid order.
+            - Rerunning an overlapping grid only simulates the new points.
+        """
+        cache = ResultCache(tempfile.mkdtemp())
+        grid = {"number_of_freshers": [2, 4], "run_time": 100, "min_max_calls_per_wave": (1, 3),
+                "min_max_sleep_interval": [(1, 2)], "min_max_call_duration": [(5, 10)]}
+        self.assertEqual(grid_points(grid), [(2, 100, (1, 3), (1, 2), (5, 10)), (4, 100, (1, 3), (1, 2), (5, 10))])
+        first_results = sweep(grid, number_of_simulations=2, cache=cache, max_workers=1)
+        self.assertGreater(drop_rate(first_results[0][1]), drop_rate(first_results[1][1]))
+
+        grid["number_of_freshers"] = [4, 6]
+        with patch('sweep.ProcessPoolExecutor') as mock_executor:
+            mock_executor.return_value.__enter__.return_value.map.side_effect = lambda function, parameters, modes, seeds: [
+                {"fresher_counter": 1, "technical_lead_counter": 0, "project_manager_counter": 0, "dropped_calls": 0}
+                for _ in parameters]
+            results = sweep(grid, number_of_simulations=2, cache=cache, max_workers=1)
+            jobs = mock_executor.return_value.__enter__.return_value.map.call_args[0][1]
+        self.assertEqual([parameters[0] for parameters in jobs], [6, 6])
+        self.assertEqual(results[0][1], first_results[1][1])
+        print('sweep cache... passed\n')
+
+    def test_optimize_staffing(self):
+
+        """
+        Test the staffing optimizer.
+
+        Assertions:
+            - The staffing found meets the target and one fresher less does not.
+        """
+        parameters = (1, 300, (1, 5), (1, 3), (5, 20))
+        number_of_freshers, drop_rates = optimize_staffing(parameters, 0.05, number_of_simulations=2,
+                                                           cache=ResultCache(tempfile.mkdtemp()), max_workers=1)
+        self.assertLessEqual(drop_rates[number_of_freshers], 0.05)
+        self.assertGreater(drop_rates[number_of_freshers - 1], 0.05)
+        print('optimize_staffing... passed\n')
+
+
+def record_checkpoints(checkpoints):
+    """Returns a patch of CheckpointWriter.write appending a copy of every (checkpoint, records) written to a list."""
+    write = CheckpointWriter.write
+
+    def record(checkpoint_writer, checkpoint, records=()):
+        checkpoints.append(pickle.loads(pickle.dumps((checkpoint, records))))
+        write(checkpoint_writer, checkpoint, records)
+    return patch.object(CheckpointWriter, "write", record)
+
+
+class CheckpointTest(unittest.TestCase):
+
+    def run_quietly(self, function, *args):
+        with patch('sys.stdout', new_callable=io.StringIO):
+            function(*args)
+
+    def test_resume_matches_uninterrupted_run(self):
+
+        """
+        Test that a run resumed from a checkpoint ends with the statistics of the uninterrupted run.
+
+        Assertions:
+            - A checkpoint is appended every checkpoint_interval simulated seconds, each call record being written once.
+            - The last checkpoint is read with the records recorded up to it.
+            - Resuming from an early checkpoint, with queued callers and Poisson arrivals, gives the same summary,
+              queue length times and call records as the full run.
+            - A frame cut short is ignored and replaced by the checkpoints of the resumed run.
+        """
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "run.checkpoint")
+        call_center_simulation = CallCenterSimulation(NullEventSink())
+        call_center_simulation.set(3, 2000, (1, 1), (1, 1), (5, 40), seed=7, record_calls=True, queue_capacity=3,
+                                   patience=10.0, arrival_process=poisson_process(0.5), checkpoint_path=path,
+                                   checkpoint_interval=200)
+        checkpoints = []
+        with record_checkpoints(checkpoints):
+            self.run_quietly(call_center_simulation.run_simulation, "event")
+        # The calls answered before the end of the run may still be completing past it
+        self.assertGreaterEqual(len(checkpoints), 2000 // 200 - 1)
+        checkpoint, records = read_last_checkpoint(path)
+        self.assertEqual(checkpoint["simulated_time"], checkpoints[-1][0]["simulated_time"])
+        self.assertEqual(records, checkpoints[-1][1])
+        self.assertGreater(len(records[0]), 500)
+        # The checkpoints hold no record, the records are written once
+        self.assertEqual(len(checkpoint["call_statistics"].call_records()["role"]), 0)
+        self.assertLess(os.path.getsize(path), len(pickle.dumps(records)) + sum(
+            len(pickle.dumps(checkpoint)) + 200 for checkpoint, _ in checkpoints))
+
+        # A crash after the third checkpoint, in the middle of writing the fourth one
+        interrupted_path = os.path.join(directory, "interrupted.checkpoint")
+        checkpoint_writer = CheckpointWriter(interrupted_path)
+        for checkpoint, records in checkpoints[:3]:
+            checkpoint_writer.write(checkpoint, records)
+        checkpoint_writer.close()
+        with open(interrupted_path, "ab") as file:
+            file.write(FRAME_HEADER.pack(8, 1 << 20) + b"partial")
+        checkpoint, records = read_last_checkpoint(interrupted_path)
+        self.assertEqual(checkpoint["simulated_time"], checkpoints[2][0]["simulated_time"])
+        self.assertEqual(records, checkpoints[2][1])
+
+        resumed_simulation = CallCenterSimulation(NullEventSink())
+        self.run_quietly(resumed_simulation.resume_simulation, interrupted_path)
+        self.assertEqual(resumed_simulation.call_statistics.summary(), call_center_simulation.call_statistics.summary())
+        self.assertEqual(resumed_simulation.call_statistics.queue_length_time(),
+                         call_center_simulation.call_statistics.queue_length_time())
+        self.assertEqual(resumed_simulation.call_statistics.call_records(), call_center_simulation.call_statistics.call_records())
+        checkpoint, records = read_last_checkpoint(interrupted_path)
+        self.assertEqual(checkpoint["simulated_time"], checkpoints[-1][0]["simulated_time"])
+        self.assertEqual(records, checkpoints[-1][1])
+        print('checkpoint resume... passed\n')
+
+    def test_checkpoint_validation(self):
+
+        """
+        Test the checkpoint parameters.
+
+        Assertions:
+            - Parameters that cannot be pickled, such as a lambda patience, are refused by set().
+            - Checkpoints are refused outside the event mode.
+            - A checkpoint whose parameters were damaged is refused before resuming.
+        """
+        path = os.path.join(tempfile.mkdtemp(), "run.checkpoint")
+        call_center_simulation = CallCenterSimulation(NullEventSink())
+        with self.assertRaises(ValueError):
+            call_center_simulation.set(2, 10, (1, 2), (1, 2), (1, 2), queue_capacity=2,
+                                       patience=lambda random_stream: 5, checkpoint_path=path)
+        with self.assertRaises(ValueError):
+            call_center_simulation.set(2, 10, (1, 2), (1, 2), (1, 2), checkpoint_interval=0)
+        call_center_simulation.set(2, 10, (1, 2), (1, 2), (1, 2), checkpoint_path=path)
+        with self.assertRaises(ValueError):
+            call_center_simulation.run_simulation("pool")
+
+        call_center_simulation.set(2, 100, (1, 2), (1, 2), (1, 2), seed=1, checkpoint_path=path, checkpoint_interval=10)
+        self.run_quietly(call_center_simulation.run_simulation, "event")
+        checkpoint, _ = read_last_checkpoint(path)
+        for name, value in (("run_time", -1), ("min_max_sleep_interval", (0, 0)), ("queue_discipline", "random"),
+                            ("unknown", 1)):
+            damaged_checkpoint = pickle.loads(pickle.dumps(checkpoint))
+            damaged_checkpoint["configuration"][name] = value
+            checkpoint_writer = CheckpointWriter(path)
+            checkpoint_writer.write(damaged_checkpoint)
+            checkpoint_writer.close()
+            with self.assertRaises(ValueError):
+                CallCenterSimulation(NullEventSink()).resume_simulation(path)
+        print('checkpoint validation... passed\n')
+
+
+class MonitorTest(unittest.TestCase):
+
+    def test_snapshots_of_event_mode(self):
+
+        """
+        Test the snapshots published by an event mode run and served over HTTP.
+
+        Assertions:
+            - Snapshots are published during the run, each one a new dict.
+            - The final snapshot holds the final statistics, the queue length and every agent idle.
+            - /snapshot serves it as JSON and /events streams it before an end event.
+        """
+        monitor = SimulationMonitor(publish_interval=0)
+        published = []
+        publish = monitor.publish
+        monitor.publish = lambda snapshot, final=False: (published.append(snapshot), publish(snapshot, final))
+        call_center_simulation = CallCenterSimulation(NullEventSink(), monitor=monitor)
+        call_center_simulation.set(3, 100, (1, 4), (1, 3), (5, 20), seed=1, queue_capacity=2)
+        with patch('sys.stdout', new_callable=io.StringIO):
+            call_center_simulation.run_simulation("event")
+        self.assertGreater(len(published), 2)
+        self.assertEqual(len({id(snapshot) for snapshot in published}), len(published))
+        self.assertTrue(any(snapshot["busy_agents"] for snapshot in published))
+        snapshot = monitor.snapshot
+        self.assertTrue(snapshot["finished"] and monitor.finished)
+        self.assertEqual(snapshot["statistics"], call_center_simulation.call_statistics.summary())
+        self.assertEqual((snapshot["busy_agents"], snapshot["idle_agents"], snapshot["queue_length"]), (0, 5, 0))
+        self.assertEqual([agent["name"] for agent in snapshot["agents"]][-2:], [TECHNICAL_LEAD, "project manager"])
+
+        monitor_server = MonitorServer(monitor).start()
+        try:
+            with urllib.request.urlopen(monitor_server.url + "/snapshot") as response:
+                self.assertEqual(json.loads(response.read())["sequence"], snapshot["sequence"])
+            with urllib.request.urlopen(monitor_server.url + "/events") as response:
+                lines = response.read().decode().splitlines()
+            self.assertEqual([line for line in lines if line.startswith("event:")], ["event: snapshot", "event: end"])
+            self.assertEqual(json.loads(lines[1][len("data: "):])["clock"], snapshot["clock"])
+            with self.assertRaises(urllib.error.HTTPError):
+                urllib.request.urlopen(monitor_server.url + "/unknown")
+        finally:
+            monitor_server.close()
+        print('monitor snapshots... passed\n')
+
+    def test_local_only(self):
+
+        """
+        Test that the monitor server only listens on a loopback address.
+
+        Assertions:
+            - A non loopback host is refused.
+            - /snapshot answers 503 before the first snapshot.
+        """
+        with self.assertRaises(ValueError):
+            MonitorServer(SimulationMonitor(), host="0.0.0.0")
+        monitor_server = MonitorServer(SimulationMonitor()).start()
+        try:
+            with self.assertRaises(urllib.error.HTTPError) as context:
+                urllib.request.urlopen(monitor_server.url + "/snapshot")
+            self.assertEqual(context.exception.code, 503)
+        finally:
+            monitor_server.close()
+        print('monitor local only... passed\n')
+
+
+class ClockTest(unittest.TestCase):
+
+    def test_speedup_of_real_time_modes(self):
+
+        """
+        Test the real-time modes on a clock running 1000 times faster than the wall clock.
+
+        Assertions:
+            - The 20 simulated seconds of test.py, with calls of 5 to 10 seconds, last well under a second
+              in the thread, pool and async modes.
+            - The calls still overlap: the freshers are busy when the later calls of a wave arrive.
+        """
+        for mode in ("thread", "pool", "async"):
+            call_center_simulation = CallCenterSimulation(NullEventSink(), clock=Clock(1000))
+            call_center_simulation.set(3, 20, (4, 4), (5, 6), (5, 10), seed=1)
+            start = time.perf_counter()
+            with patch('sys.stdout', new_callable=io.StringIO):
+                call_center_simulation.run_simulation(mode)
+            self.assertLess(time.perf_counter() - start, 1)
+            call_statistics = call_center_simulation.call_statistics
+            self.assertGreater(call_statistics.technical_lead_counter, 0, mode)
+        print('Clock speedup... passed\n')
+
+    def test_clock(self):
+
+        """
+        Test the scaling of the clock.
+
+        Assertions:
+            - Simulated seconds last 1 / speedup wall clock seconds.
+            - The speedup must be positive.
+        """
+        clock = Clock(100)
+        self.assertEqual(clock.wall_seconds(5), 0.05)
+        with patch('call_center_simulation.time.time', return_value=2):
+            self.assertEqual(clock.time(), 200)
+        with patch('call_center_simulation.time.sleep') as mock_sleep:
+            clock.sleep(5)
+        mock_sleep.assert_called_once_with(0.05)
+        with self.assertRaises(ValueError):
+            Clock(0)
+        print('Clock... passed\n')
+
+
+class MultiSiteTest(unittest.TestCase):
+
+    def test_overflow_between_sites(self):
+
+        """
+        Test a run of a small busy site overflowing to a large one.
+
+        Assertions:
+            - The small site answers the calls it answers alone and passes on the calls it would drop.
+            - The large site, which drops its own overflow, takes every call passed on.
+            - The statistics of all sites add up the ones of the sites, and a rerun is identical.
+        """
+        small_parameters = (1, 300, (1, 4), (1, 3), (10, 30))
+        large_parameters = (30, 300, (1, 2), (1, 3), (10, 30))
+        sites = [Site("small", small_parameters), Site("large", large_parameters, overflow_to=[])]
+        result = run_multisite(sites, seed=5, sync_interval=2, transfer_delay=3)
+
+        alone = CallCenterSimulation(NullEventSink())
+        alone.set(*small_parameters, seed=5)
+        with patch('sys.stdout', new_callable=io.StringIO):
+            alone.run_simulation("event")
+        small_statistics = result.site_statistics["small"]
+        self.assertGreater(alone.call_statistics.dropped_calls, 0)
+        self.assertEqual(small_statistics.answered_calls(), alone.call_statistics.answered_calls())
+        self.assertEqual(small_statistics.dropped_calls, 0)
+        self.assertEqual(result.overflowed_out["small"], alone.call_statistics.dropped_calls)
+        self.assertEqual(result.overflowed_in["large"], result.overflowed_out["small"])
+
+        large_statistics = result.site_statistics["large"]
+        self.assertEqual(result.call_statistics.answered_calls(), small_statistics.answered_calls() + large_statistics.answered_calls())
+        self.assertEqual(result.call_statistics.dropped_calls, large_statistics.dropped_calls)
+        rerun = run_multisite(sites, seed=5, sync_interval=2, transfer_delay=3)
+        self.assertEqual(rerun.call_statistics.summary(), result.call_statistics.summary())
+        print('multi-site overflow... passed\n')
+
+    def test_validation(self):
+
+        """
+        Test the parameters of a multi-site run.
+
+        Assertions:
+            - A transfer delay shorter than the synchronization interval is refused.
+            - Site names must be unique and sites overflow to other sites of the run.
+        """
+        parameters = (1, 10, (1, 2), (1, 2), (1, 2))
+        with self.assertRaises(ValueError):
+            run_multisite([Site("a", parameters), Site("b", parameters)], sync_interval=2, transfer_delay=1)
+        with self.assertRaises(ValueError):
+            run_multisite([Site("a", parameters), Site("a", parameters)])
+        with self.assertRaises(ValueError):
+            run_multisite([Site("a", parameters, overflow_to=["c"]), Site("b", parameters)])
+        print('multi-site validation... passed\n')
+
+
+class ShiftScheduleTest(unittest.TestCase):
+
+    def test_schedule(self):
+
+        """
+        Test the shifts, breaks and staffing curve of a ShiftSchedule.
+
+        Assertions:
+            - Breaks outside their shift and overlapping shifts are refused.
+            - The state of an agent follows its shifts and breaks.
+            - A schedule file names the agents from 1, as the agent names do.
+        """
+        with self.assertRaises(ValueError):
+            Shift(0, 100, [(90, 110)])
+        shift_schedule = ShiftSchedule().add(FRESHER, 0, Shift(0, 100, [(40, 50)])).add(FRESHER, 0, Shift(200, 300))
+        with self.assertRaises(ValueError):
+            shift_schedule.add(FRESHER, 0, Shift(250, 350))
+        self.assertEqual([shift_schedule.state_at(FRESHER, 0, time) for time in (0, 45, 100, 250)],
+                         [AVAILABLE, ON_BREAK, OFF_SHIFT, AVAILABLE])
+        self.assertEqual(shift_schedule.state_at(FRESHER, 1, 150), AVAILABLE)
+        self.assertEqual([shift_schedule.available_agents(FRESHER, 2, time) for time in (10, 45, 150)], [2, 1, 1])
+
+        path = os.path.join(tempfile.mkdtemp(), "shifts.csv")
+        with open(path, "w") as file:
+            file.write("# tier,agent,start,end,breaks\nfresher,2,0,100,40,50\ntechnical lead,1,50,150\n")
+        shift_schedule = read_shift_schedule(path)
+        self.assertEqual(shift_schedule.state_at(FRESHER, 1, 45), ON_BREAK)
+        self.assertEqual(shift_schedule.state_at(TECHNICAL_LEAD, 0, 10), OFF_SHIFT)
+        print('ShiftSchedule... passed\n')
+
+    def test_event_mode_shifts(self):
+
+        """
+        Test the event mode following a shift schedule.
+
+        Assertions:
+            - Every call goes to the first available agent, escalating while the freshers are away.
+            - Every state change before the end of the run is reported once.
+            - A run resumed from a checkpoint taken during a break ends as the full run.
+            - Schedules of unknown agents, and the other modes, are refused.
+        """
+        shift_schedule = ShiftSchedule()
+        shift_schedule.add(FRESHER, 0, Shift(0, 50, [(10, 20)]))
+        shift_schedule.add(FRESHER, 1, Shift(30, 100))
+        directory = tempfile.mkdtemp()
+        trace_path = os.path.join(directory, "trace.csv")
+        checkpoint_path = os.path.join(directory, "run.checkpoint")
+        call_trace = CsvTraceWriter(trace_path)
+        event_sink = BufferedEventSink()
+        call_center_simulation = CallCenterSimulation(event_sink, call_trace)
+        call_center_simulation.set(2, 60, (1, 1), (1, 1), (1, 1), seed=1, shift_schedule=shift_schedule,
+                                   checkpoint_path=checkpoint_path, checkpoint_interval=15)
+        checkpoints = []
+        with patch('sys.stdout', new_callable=io.StringIO), record_checkpoints(checkpoints):
+            call_center_simulation.run_simulation("event")
+        call_trace.close()
+        with open(trace_path, newline="") as file:
+            agents = {float(row["arrival_time"]): row["agent"] for row in csv.DictReader(file)}
+        expected_agents = {0: "fresher 1", 15: "technical lead", 25: "fresher 1", 45: "fresher 1", 55: "fresher 2"}
+        self.assertEqual({time: agents[time] for time in expected_agents}, expected_agents)
+        changes = [event[1:] for event in event_sink.events if event[0] == "availability_changed"]
+        self.assertEqual(changes, [("fresher 1", AVAILABLE), ("fresher 1", ON_BREAK), ("fresher 1", AVAILABLE),
+                                   ("fresher 2", AVAILABLE), ("fresher 1", OFF_SHIFT)])
+
+        self.assertEqual(checkpoints[0][0]["engine"]["agent_states"], {(0, 0): ON_BREAK, (0, 1): OFF_SHIFT})
+        checkpoint_writer = CheckpointWriter(checkpoint_path)
+        checkpoint_writer.write(*checkpoints[0])
+        checkpoint_writer.close()
+        resumed_simulation = CallCenterSimulation(NullEventSink())
+        with patch('sys.stdout', new_callable=io.StringIO):
+            resumed_simulation.resume_simulation(checkpoint_path)
+        self.assertEqual(resumed_simulation.call_statistics.summary(), call_center_simulation.call_statistics.summary())
+
+        with self.assertRaises(ValueError):
+            call_center_simulation.run_simulation("async")
+        with self.assertRaises(ValueError):
+            call_center_simulation.set(1, 60, (1, 1), (1, 1), (1, 1), shift_schedule=shift_schedule)
+        print('CallCenterSimulation shift schedule... passed\n')
+
+    def test_queue_after_last_shift(self):
+
+        """
+        Test the waiting queue when every agent has left.
+
+        Assertions:
+            - Every arrived call is answered, dropped or abandoned, calls still waiting at the end being dropped.
+            - Calls arriving once every agent has left are dropped, none is answered after the last shift.
+        """
+        shift_schedule = ShiftSchedule()
+        shift_schedule.add("support", 0, Shift(0, 30))
+        shift_schedule.add("support", 1, Shift(10, 40))
+        directory = tempfile.mkdtemp()
+        trace_path = os.path.join(directory, "trace.csv")
+        call_trace = CsvTraceWriter(trace_path)
+        event_sink = BufferedEventSink()
+        call_center_simulation = CallCenterSimulation(event_sink, call_trace)
+        call_center_simulation.set(0, 100, (2, 2), (5, 5), (20, 20), seed=1, queue_capacity=50,
+                                   routing_tiers=[RoutingTier("support", 2)], shift_schedule=shift_schedule)
+        with patch('sys.stdout', new_callable=io.StringIO):
+            call_center_simulation.run_simulation("event")
+        call_trace.close()
+        call_statistics = call_center_simulation.call_statistics
+        arrived_calls = sum(event[0] == "call_arrived" for event in event_sink.events)
+        self.assertEqual(arrived_calls, 40)
+        self.assertEqual(call_statistics.answered_calls() + call_statistics.dropped_calls + call_statistics.abandoned_calls,
+                         arrived_calls)
+        self.assertEqual(call_statistics.abandoned_calls, 0)
+        with open(trace_path, newline="") as file:
+            rows = list(csv.DictReader(file))
+        self.assertEqual(len(rows), arrived_calls)
+        answered = [row for row in rows if row["outcome"] == "answered"]
+        self.assertTrue(all(float(row["arrival_time"]) + float(row["wait_time"]) < 40 for row in answered))
+        self.assertTrue(all(row["outcome"] == "dropped" for row in rows if float(row["arrival_time"]) >= 40))
+        print('CallCenterSimulation queue after the last shift... passed\n')
+
+
+class DistributionsTest(unittest.TestCase):
+
+    def test_streaming_histogram(self):
+
+        """
+        Test the percentiles of a StreamingHistogram.
+
+        Assertions:
+            - Percentiles are within the relative precision of the buckets.
+            - The number of buckets stays bounded while values are added.
+            - Merging two histograms gives the histogram of all their values.
+        """
+        values = [random.Random(1).lognormvariate(3, 1) for _ in range(20000)]
+        histogram = StreamingHistogram()
+        for value in values[:10000]:
+            histogram.add(value)
+        other = StreamingHistogram()
+        for value in values[10000:]:
+            other.add(value)
+        self.assertLess(len(histogram.counts), 10000)
+        histogram.merge(other)
+        self.assertEqual(histogram.count, 20000)
+        values.sort()
+        for percentile in (50, 95, 99):
+            exact = values[int(len(values) * percentile / 100) - 1]
+            self.assertAlmostEqual(histogram.percentile(percentile), exact, delta=exact * 0.002)
+        self.assertEqual(histogram.percentile(100), values[-1])
+        self.assertEqual(StreamingHistogram().percentile(50), 0.0)
+        with self.assertRaises(ValueError):
+            histogram.merge(StreamingHistogram(precision_bits=7))
+        print('StreamingHistogram... passed\n')
+
+    def test_call_statistics_distributions(self):
+
+        """
+        Test the distributions of CallStatistics per role and per interval of arrival.
+
+        Assertions:
+            - The calls are put in the interval they arrived in, their wait time included.
+            - The service level of an interval counts the offered calls answered within the threshold.
+            - Merged statistics add up the distributions, the clock of the run is not pickled.
+            - A routing tier named after an outcome is not counted as lost calls.
+        """
+        now = [0]
+        call_statistics = CallStatistics(1, record_distributions=True, distribution_interval=60)
+        call_statistics.elapsed = lambda: now[0]
+        for time_now, wait_time in ((10, 0), (30, 25), (70, 5)):
+            now[0] = time_now
+            call_statistics.add_fresher_call(0, 100, wait_time)
+        now[0] = 65
+        call_statistics.add_technical_lead_call(300, 10)
+        call_statistics.add_abandoned_call(40)
+        call_statistics.add_dropped_call()
+
+        intervals = call_statistics.interval_statistics(service_level_threshold=20)
+        self.assertEqual([interval['start'] for interval in intervals], [0, 60])
+        self.assertEqual([(interval['offered'], interval['answered']) for interval in intervals], [(4, 3), (2, 1)])
+        self.assertAlmostEqual(intervals[0]['service_level'], 2 / 4)
+        self.assertAlmostEqual(intervals[1]['service_level'], 1 / 2)
+        self.assertEqual(call_statistics.call_duration_percentile(100), 300)
+        self.assertEqual(call_statistics.call_duration_percentile(50, FRESHER), 100)
+        self.assertEqual(call_statistics.wait_time_percentile(100, FRESHER), 25)
+
+        restored = pickle.loads(pickle.dumps(call_statistics))
+        self.assertIsNone(restored.elapsed)
+        merged = CallStatistics.merged([call_statistics, restored])
+        self.assertEqual(merged.interval_statistics()[0]['offered'], 8)
+
+        call_statistics = CallStatistics(0, record_distributions=True)
+        call_statistics.elapsed = lambda: 0
+        call_statistics.add_tier_call("dropped", 50)
+        call_statistics.add_dropped_call()
+        interval = call_statistics.interval_statistics()[0]
+        self.assertEqual((interval['offered'], interval['answered'], interval['dropped']), (2, 1, 1))
+        self.assertEqual(call_statistics.call_duration_percentile(100, "dropped"), 50)
+        self.assertEqual(set(call_statistics.distributions()), {("dropped", 0)})
+        self.assertEqual(set(call_statistics.lost_distributions()), {("dropped", 0)})
+        print('CallStatistics distributions... passed\n')
+
+    def test_event_mode_distributions(self):
+
+        """
+        Test the distributions recorded by the event mode.
+
+        Assertions:
+            - Every answered call is counted once, with the percentiles of the recorded calls.
+            - The intervals cover the run.
+        """
+        call_center_simulation = CallCenterSimulation(NullEventSink())
+        call_center_simulation.set(3, 600, (1, 4), (1, 3), (5, 40), record_calls=True, seed=3, queue_capacity=5,
+                                   record_distributions=True, distribution_interval=100)
+        with patch('sys.stdout', new_callable=io.StringIO) as output:
+            call_center_simulation.run_simulation("event")
+        self.assertIn("service level", output.getvalue())
+        call_statistics = call_center_simulation.call_statistics
+        intervals = call_statistics.interval_statistics()
+        self.assertEqual(sum(interval['answered'] for interval in intervals), call_statistics.answered_calls())
+        self.assertEqual([interval['start'] for interval in intervals], [0, 100, 200, 300, 400, 500])
+        handle_times = sorted(handle_time for role, handle_time in zip(call_statistics.call_records()['role'],
+                                                                       call_statistics.call_records()['handle_time']) if role >= 0)
+        exact = handle_times[math.ceil(len(handle_times) * 0.95) - 1]
+        self.assertAlmostEqual(call_statistics.call_duration_percentile(95), exact, delta=exact * 0.001)
+        print('CallCenterSimulation distributions... passed\n')
+
+
 class OtherTest(unittest.TestCase):
 
     def test_find_free_fresher_index(self):